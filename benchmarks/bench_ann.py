@@ -0,0 +1,86 @@
+"""
+Recall@k and query latency of the approximate IVF vector store against exact search with the flat
+NumPy store, at several corpus sizes and numbers of probed lists.
+
+Embeddings of real chunks are clustered by topic, so the corpus is drawn from a mixture of
+Gaussians, and the queries are noisy copies of corpus vectors. The IVF store is filled in batches,
+like the ingestion pipeline does, so the timings include the incremental inserts and retrainings.
+
+Usage (from the root dir):
+    python -m benchmarks.bench_ann [--sizes 10000 100000] [--dim 384] [--k 10] [--noise 2.0] [--nprobe 1 4 8 16 32]
+"""
+import argparse
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.vectorstores.ivf_store import IVFVectorStore
+from rag.vectorstores.numpy_store import NumpyVectorStore
+
+
+def make_corpus(size, dim, noise, rng):
+    n_topics = max(10, size // 200)
+    topics = rng.normal(size=(n_topics, dim))
+    return (topics[rng.integers(n_topics, size=size)] + noise * rng.normal(size=(size, dim))).astype(np.float32)
+
+
+def fill(store, vectors, batch_size=5000):
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        docs = [Document(page_content="", id=str(j)) for j in range(i, min(i + batch_size, len(vectors)))]
+        store.add_embeddings(docs, vectors[i : i + batch_size])
+    return time.perf_counter() - start
+
+
+def search(store, queries, k):
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = store.similarity_search_by_vector(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        results.append({doc.id for doc in docs})
+    return results, np.array(latencies) * 1000
+
+
+def report(name, latencies, recall=None):
+    recall = f"recall@k {recall:.3f}" if recall is not None else "recall@k 1.000 (exact)"
+    print(
+        f"  {name:<12} p50 {np.percentile(latencies, 50):7.3f} ms  "
+        f"p99 {np.percentile(latencies, 99):7.3f} ms  {recall}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark approximate against exact search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--noise", type=float, default=2.0, help="Spread of the vectors around their topic, higher is harder"
+    )
+    parser.add_argument("--nlist", type=int, help="Number of lists, defaults to 4 * sqrt(n)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        vectors = make_corpus(size, args.dim, args.noise, rng)
+        queries = vectors[rng.choice(size, args.queries)] + args.noise * rng.normal(size=(args.queries, args.dim))
+        queries = queries.astype(np.float32).tolist()
+
+        flat = NumpyVectorStore(embedding_function=None)
+        flat_fill = fill(flat, vectors)
+        ivf = IVFVectorStore(embedding_function=None, nlist=args.nlist)
+        ivf_fill = fill(ivf, vectors)
+        nlist = len(ivf._snapshot.index.centroids)
+        print(f"{size} vectors of dim {args.dim}: fill flat {flat_fill:.2f} s, ivf {ivf_fill:.2f} s ({nlist} lists)")
+
+        exact, latencies = search(flat, queries, args.k)
+        report("flat", latencies)
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            approximate, latencies = search(ivf, queries, args.k)
+            recall = np.mean([len(a & e) / args.k for a, e in zip(approximate, exact)])
+            report(f"ivf nprobe={nprobe}", latencies, recall)
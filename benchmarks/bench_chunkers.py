@@ -0,0 +1,51 @@
+"""
+Time spent chunking the corpus by the unstructured based chunkers, which convert the documents
+to unstructured elements and back, against the native chunkers working on the documents.
+
+Usage (from the root dir):
+    python -m benchmarks.bench_chunkers [--dir corpus/intro-to-ml-notes] [--repeat 5]
+"""
+import argparse
+import os
+import time
+
+from rag.chunkers.native_chunker import NativeBasicChunking, NativeByTitleChunking
+from rag.chunkers.unstructured_chunker import BasicChunking, ByTitleChunking
+from rag.ingestors.ingestor import FastIngestor
+
+
+def bench(chunker, docs, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        chunks = chunker.chunk(docs)
+    return (time.perf_counter() - start) / repeat, chunks
+
+
+if __name__ == "__main__":
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Benchmark the chunkers.")
+    parser.add_argument(
+        "--dir", type=str, default=os.path.join(root_dir, "corpus", "intro-to-ml-notes")
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = FastIngestor(num_workers=1).load_dir(args.dir)
+    print(f"{len(docs)} documents")
+
+    params = dict(max_characters=1500, new_after_n_chars=1000, combine_text_under_n_characters=300)
+    pairs = [
+        ("basic", BasicChunking(max_characters=250), NativeBasicChunking(max_characters=250)),
+        ("by_title", ByTitleChunking(**params), NativeByTitleChunking(**params)),
+    ]
+    for name, unstructured_chunker, native_chunker in pairs:
+        unstructured_time, unstructured_chunks = bench(unstructured_chunker, docs, args.repeat)
+        native_time, native_chunks = bench(native_chunker, docs, args.repeat)
+        same_text = sum(
+            a.page_content == b.page_content for a, b in zip(unstructured_chunks, native_chunks)
+        )
+        print(
+            f"{name:<9} unstructured {unstructured_time * 1000:8.1f} ms ({len(unstructured_chunks)} chunks)  "
+            f"native {native_time * 1000:8.1f} ms ({len(native_chunks)} chunks)  "
+            f"speedup x{unstructured_time / native_time:.1f}  identical chunks {same_text}/{len(native_chunks)}"
+        )
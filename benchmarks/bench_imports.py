@@ -0,0 +1,87 @@
+"""
+Startup time of the entry points: time to import them and, for the evaluation, to resolve the
+components of its config through the registry, which imports only their modules. `evaluate
+(eager)` additionally imports all the components like `setup_imports` did before, for comparison.
+Each measure runs in a new interpreter, the median of the runs is reported.
+
+Usage (from the root dir):
+    python -m benchmarks.bench_imports [--config rag/configs/evaluate.yaml] [--repeat 5] [--importtime 10]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+RESOLVE_COMPONENTS = """
+import yaml
+from rag.common.registry import registry
+with open({config!r}) as stream:
+    config = yaml.safe_load(stream)
+registry.get_generator(config['generator']['name'])
+registry.get_ingestor(config['ingestor']['name'])
+registry.get_retriever(config['retriever']['name'])
+registry.get_chunker(config['retriever']['params']['chunker']['name'])
+registry.get_vectorstore(config['retriever']['params'].get('vector_store', 'chroma'))
+"""
+
+TARGETS = {
+    "evaluate": "import rag.evaluation.evaluate{resolve}",
+    "evaluate (eager)": (
+        "import rag.evaluation.evaluate\n"
+        "from rag.common.setup_imports import setup_imports\n"
+        "setup_imports(exclude_modules=['rag.scorers.ragas_scorers']){resolve}"
+    ),
+    "chat": "import chat",
+    "ui": "import ui.init_rag",
+}
+
+
+def run(code, root_dir, importtime=False):
+    script = f"import time\nstart = time.perf_counter()\n{code}\nprint(time.perf_counter() - start)"
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    return subprocess.run(command, cwd=root_dir, capture_output=True, text=True)
+
+
+def slowest_packages(stderr, top):
+    """Packages with the largest import time (of all their modules), from the output of
+    -X importtime"""
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+    return sorted(((microseconds, package) for package, microseconds in packages.items()), reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the entry points.")
+    parser.add_argument(
+        "--config", default="rag/configs/evaluate.yaml", help="Config of the evaluation, relative to the root dir"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--importtime", type=int, default=0, help="Number of slowest packages to list")
+    args = parser.parse_args()
+
+    # Builds the cached index of the components, as a first run would
+    run("from rag.common.registry import registry; registry.index.load()", root_dir)
+    resolve = RESOLVE_COMPONENTS.format(config=args.config)
+    for name, code in TARGETS.items():
+        code = code.format(resolve=resolve)
+        times = []
+        for _ in range(args.repeat):
+            result = run(code, root_dir)
+            if result.returncode != 0:
+                break
+            times.append(float(result.stdout.strip().splitlines()[-1]))
+        if not times:
+            error = (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{name:<17} failed: {error}")
+            continue
+        print(f"{name:<17} {statistics.median(times) * 1000:8.1f} ms  (min {min(times) * 1000:.1f} ms)")
+        if args.importtime:
+            for microseconds, package in slowest_packages(run(code, root_dir, importtime=True).stderr, args.importtime):
+                print(f"    {microseconds / 1000:8.1f} ms  {package}")
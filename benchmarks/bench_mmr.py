@@ -0,0 +1,40 @@
+"""
+Latency of the MMR selection (`rag.vectorstores.mmr`) against LangChain's implementation, on random
+candidate embeddings, for increasing numbers of candidates (`fetch_k`).
+
+Usage (from the root dir):
+    python -m benchmarks.bench_mmr [--fetch-k 20 100 500] [--k 5] [--dim 768] [--repeat 20]
+"""
+import argparse
+import time
+
+import numpy as np
+from langchain_core.vectorstores.utils import maximal_marginal_relevance as langchain_mmr
+
+from rag.vectorstores.mmr import maximal_marginal_relevance
+
+
+def latency(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return np.median(latencies) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the MMR selection.")
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[20, 100, 500])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for fetch_k in args.fetch_k:
+        query = rng.normal(size=args.dim).astype(np.float32)
+        candidates = rng.normal(size=(fetch_k, args.dim)).astype(np.float32)
+        ours = latency(lambda: maximal_marginal_relevance(query, candidates, k=args.k), args.repeat)
+        reference = latency(lambda: langchain_mmr(query, candidates, k=args.k), args.repeat)
+        print(f"fetch_k {fetch_k:>5}  vectorized {ours:8.3f} ms  langchain {reference:8.3f} ms")
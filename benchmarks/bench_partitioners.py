@@ -0,0 +1,57 @@
+"""
+Throughput of the native Markdown/text partitioners against unstructured's auto partition.
+
+Usage (from the root dir):
+    python -m benchmarks.bench_partitioners [--dir corpus/intro-to-ml-notes] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import time
+
+from rag.ingestors.partitioners import NATIVE_PARTITIONERS
+
+
+def bench(partition_fn, files, repeat):
+    start = time.perf_counter()
+    n_elements = 0
+    for _ in range(repeat):
+        for file in files:
+            n_elements += len(partition_fn(file))
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, n_elements // repeat
+
+
+def report(name, elapsed, n_elements, files, n_bytes):
+    print(
+        f"{name:<12} {elapsed * 1000:9.1f} ms  {len(files) / elapsed:8.1f} files/s  "
+        f"{n_bytes / elapsed / 1e6:7.2f} MB/s  {n_elements:6d} elements"
+    )
+
+
+if __name__ == "__main__":
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Benchmark the native partitioners.")
+    parser.add_argument("--dir", type=str, default=os.path.join(root_dir, "corpus"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    files = [
+        f
+        for ext in NATIVE_PARTITIONERS
+        for f in glob.glob(os.path.join(args.dir, "**", f"*.{ext}"), recursive=True)
+    ]
+    n_bytes = sum(os.path.getsize(f) for f in files)
+    print(f"{len(files)} files, {n_bytes / 1e6:.2f} MB")
+
+    def native(file):
+        return NATIVE_PARTITIONERS[file.split(".")[-1]](filename=file)
+
+    report("native", *bench(native, files, args.repeat), files, n_bytes)
+
+    start = time.perf_counter()
+    from unstructured.partition.auto import partition
+
+    print(f"unstructured import: {(time.perf_counter() - start) * 1000:.1f} ms")
+    partition(files[0])  # Exclude lazily loaded models/resources from the timing
+    report("unstructured", *bench(partition, files, args.repeat), files, n_bytes)
@@ -0,0 +1,73 @@
+"""
+Query latency of the Chroma and NumPy vector stores on random embeddings, searching by vector so
+that only the stores are measured (not the embedding model). Filtered queries are restricted to
+the chunks of one of 100 source files.
+
+Usage (from the root dir):
+    python -m benchmarks.bench_vectorstores [--sizes 1000 10000 50000] [--dim 768] [--queries 200] [--k 5]
+"""
+import argparse
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.vectorstores.chroma_store import ChromaStore
+from rag.vectorstores.numpy_store import NumpyVectorStore
+
+
+class _NoEmbeddings:
+    """The stores are filled and queried with precomputed vectors"""
+
+    def embed_documents(self, texts):
+        raise NotImplementedError
+
+    def embed_query(self, text):
+        raise NotImplementedError
+
+
+def fill(store, vectors, batch_size=1000):
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        docs = [
+            Document(page_content=f"chunk {j}", metadata={"filename": f"{j % 100}.md"}, id=str(j))
+            for j in range(i, min(i + batch_size, len(vectors)))
+        ]
+        store.add_embeddings(docs, vectors[i : i + batch_size].tolist())
+    return time.perf_counter() - start
+
+
+def query_latencies(store, queries, k, filter=None):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        store.similarity_search_by_vector(query, k=k, filter=filter)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vector stores.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        vectors = rng.normal(size=(size, args.dim)).astype(np.float32)
+        queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32).tolist()
+        stores = [
+            ("chroma", ChromaStore(embedding_function=_NoEmbeddings(), collection_name=f"bench_{size}")),
+            ("numpy", NumpyVectorStore(embedding_function=_NoEmbeddings())),
+        ]
+        for name, store in stores:
+            fill_time = fill(store, vectors)
+            latencies = query_latencies(store, queries, args.k)
+            filtered = query_latencies(store, queries, args.k, store.translate_filter({"filename": "7.md"}))
+            print(
+                f"{size:>8} vectors  {name:<7} fill {fill_time:7.2f} s  "
+                f"p50 {np.percentile(latencies, 50):7.3f} ms  p99 {np.percentile(latencies, 99):7.3f} ms  "
+                f"filtered p50 {np.percentile(filtered, 50):7.3f} ms"
+            )
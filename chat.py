@@ -1,30 +1,46 @@
-import sys
-from rag import initialize, ask
-
-def chat_with_model():
-    def get_dirname():
-        length = len(sys.argv)
-        dirname = 'notes' # default dir to use
-        if length > 1:
-            dirname = sys.argv[1]
-
-        return dirname
-            
-    dirname = get_dirname()
-    initialize(dirname)
+import argparse
+import os
+
+import yaml
+
+from rag.rag import RAG
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_rag(config_path: str, dirname: str) -> RAG:
+    with open(config_path) as stream:
+        rag = RAG.from_config(yaml.safe_load(stream))
+    rag.ingest(dir=dirname)
+    return rag
+
+
+def chat_with_model(rag: RAG, input=input):
     print("Hello, I am here to answer your queries based on your notes.")
     print("Type 'exit' to quit.")
     print()
-    
+
     while True:
         user_query = input("You: ")
         if user_query.lower() == 'exit':
             print("Exiting chat...")
             break
-            
-        # Simulate a response from an open-source model
-        response = ask(user_query)
-        print(f'Assistant: {response}')
+
+        # The sources are retrieved first, the answer is printed as it is generated
+        tokens, docs = rag.stream_query(user_query, return_documents=True)
+        print('Assistant: ', end='', flush=True)
+        for token in tokens:
+            print(token, end='', flush=True)
+        print()
+        sources = sorted({doc.metadata.get('filename') for doc in docs if doc.metadata.get('filename')})
+        if sources:
+            print(f"Sources: {', '.join(sources)}")
+        print()
+
 
 if __name__ == "__main__":
-    chat_with_model()
+    parser = argparse.ArgumentParser(description='Chat with your notes.')
+    parser.add_argument('dirname', nargs='?', default='notes', help='Directory of the notes to ingest')
+    parser.add_argument('-f', '--file', default='rag/configs/chat.yaml', help='Path of the configuration file relative to root dir')
+    args = parser.parse_args()
+    chat_with_model(load_rag(os.path.join(ROOT_DIR, args.file), args.dirname))
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, Dict, List
 
 from langchain_core.documents.base import Document
 
@@ -10,3 +10,7 @@ class BaseChunkingStrategy(ABC):
         # """Split text into chunks using the implemented strategy."""
         pass
 
+    def get_params(self) -> Dict[str, Any]:
+        """Identifies the strategy and its parameters, used to detect when the chunks of
+        already ingested files are outdated"""
+        return {'name': type(self).__name__, **vars(self)}
@@ -0,0 +1,195 @@
+"""
+Pure Python implementations of unstructured's `basic` and `by_title` chunking strategies.
+
+They operate on a compact representation of the elements, `(text, element_type, metadata)`
+tuples, instead of unstructured `Element` objects, so documents can be chunked without converting
+them to element dicts and back. The behaviour follows unstructured's chunkers:
+
+- Elements are combined into pre-chunks, separated by a blank line, up to `max_characters` (hard
+  maximum). A new pre-chunk is started once a pre-chunk reaches `new_after_n_chars` (soft maximum).
+- Tables are never combined with other elements.
+- Elements larger than `max_characters` are split, preferably on a newline or space, and each split
+  after the first is prefixed with the last `overlap` characters of the previous one.
+- By title, a Title element always starts a new section (as does a change of source file), and
+  sections smaller than `combine_text_under_n_chars` are combined with the following ones as long
+  as the result fits in `max_characters`.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+ChunkElement = Tuple[str, str, Dict[str, Any]]  # (text, element type, metadata)
+
+TEXT_SEPARATOR = '\n\n'
+_SPLIT_SEPARATORS = ('\n', ' ')
+
+# Metadata which only makes sense for individual elements, dropped from the chunks like unstructured
+_DROPPED_METADATA = ('category_depth', 'parent_id', 'detection_class_prob', 'element_id')
+# List metadata concatenated across the elements of a chunk, the other fields are taken from the first
+_CONCATENATED_METADATA = (
+    'emphasized_text_contents',
+    'emphasized_text_tags',
+    'link_texts',
+    'link_urls',
+    'link_start_indexes',
+)
+
+
+def _is_table(element: ChunkElement) -> bool:
+    return element[1] == 'Table'
+
+
+def _source(element: ChunkElement) -> Optional[str]:
+    metadata = element[2]
+    return metadata.get('filename') or metadata.get('source')
+
+
+def _split_text(text: str, max_characters: int, overlap: int) -> Iterator[str]:
+    """Split text longer than max_characters, preferably on a separator"""
+    while len(text) > max_characters:
+        split_at = -1
+        for separator in _SPLIT_SEPARATORS:
+            # Do not accept a separator so early that the fragment would be mostly empty
+            idx = text.rfind(separator, max(overlap, 1), max_characters + 1)
+            if idx > 0:
+                split_at, skip = idx, len(separator)
+                break
+        if split_at < 0:
+            split_at, skip = max_characters, 0
+
+        fragment = text[:split_at].rstrip()
+        yield fragment
+        remainder_start = split_at + skip
+        if overlap:
+            remainder_start = max(min(remainder_start, len(fragment)) - overlap, 1)
+        text = text[remainder_start:].lstrip()
+    if text:
+        yield text
+
+
+def _consolidate_metadata(elements: List[ChunkElement]) -> Dict[str, Any]:
+    metadata = {k: v for k, v in elements[0][2].items() if k not in _DROPPED_METADATA}
+    for _, _, element_metadata in elements[1:]:
+        for key in _CONCATENATED_METADATA:
+            if key in element_metadata:
+                metadata[key] = list(metadata.get(key, [])) + list(element_metadata[key])
+        languages = element_metadata.get('languages')
+        if languages:
+            merged = list(metadata.get('languages', []))
+            metadata['languages'] = merged + [l for l in languages if l not in merged]
+    return metadata
+
+
+def _chunks_from_pre_chunk(
+    pre_chunk: List[ChunkElement], max_characters: int, overlap: int
+) -> Iterator[ChunkElement]:
+    metadata = _consolidate_metadata(pre_chunk)
+    if _is_table(pre_chunk[0]):
+        splits = list(_split_text(pre_chunk[0][0], max_characters, overlap))
+        element_type = 'Table' if len(splits) == 1 else 'TableChunk'
+    else:
+        text = TEXT_SEPARATOR.join(element[0] for element in pre_chunk)
+        splits = list(_split_text(text, max_characters, overlap))
+        element_type = 'CompositeElement'
+    for split in splits:
+        yield split, element_type, dict(metadata)
+
+
+def _pre_chunks(
+    sections: Iterator[List[ChunkElement]], max_characters: int, new_after_n_chars: int
+) -> Iterator[List[ChunkElement]]:
+    """Combine the elements of each section into pre-chunks fitting the size limits"""
+    sep_len = len(TEXT_SEPARATOR)
+    for section in sections:
+        pre_chunk: List[ChunkElement] = []
+        length = 0
+        for element in section:
+            text_len = len(element[0])
+            if pre_chunk and (
+                _is_table(element)
+                or _is_table(pre_chunk[0])
+                or length + sep_len + text_len > max_characters
+                or length >= new_after_n_chars
+            ):
+                yield pre_chunk
+                pre_chunk, length = [], 0
+            length += (sep_len if pre_chunk else 0) + text_len
+            pre_chunk.append(element)
+        if pre_chunk:
+            yield pre_chunk
+
+
+def _pre_chunk_length(pre_chunk: List[ChunkElement]) -> int:
+    return sum(len(text) for text, _, _ in pre_chunk) + len(TEXT_SEPARATOR) * (len(pre_chunk) - 1)
+
+
+def _combine_small_pre_chunks(
+    pre_chunks: Iterator[List[ChunkElement]], max_characters: int, combine_text_under_n_chars: int
+) -> Iterator[List[ChunkElement]]:
+    combined: List[ChunkElement] = []
+    for pre_chunk in pre_chunks:
+        if combined and (
+            _is_table(pre_chunk[0])
+            or _is_table(combined[0])
+            or _pre_chunk_length(combined) >= combine_text_under_n_chars
+            or _pre_chunk_length(combined) + len(TEXT_SEPARATOR) + _pre_chunk_length(pre_chunk)
+            > max_characters
+        ):
+            yield combined
+            combined = []
+        combined = combined + pre_chunk
+    if combined:
+        yield combined
+
+
+def _title_sections(elements: List[ChunkElement]) -> Iterator[List[ChunkElement]]:
+    section: List[ChunkElement] = []
+    for element in elements:
+        if section and (element[1] == 'Title' or _source(element) != _source(section[-1])):
+            yield section
+            section = []
+        section.append(element)
+    if section:
+        yield section
+
+
+def _validate(max_characters: int, overlap: int):
+    if max_characters <= 0:
+        raise ValueError(f"max_characters must be > 0, got {max_characters}")
+    if not 0 <= overlap < max_characters:
+        raise ValueError(f"overlap must be >= 0 and < max_characters, got {overlap}")
+
+
+def chunk_basic(
+    elements: List[ChunkElement],
+    max_characters: int = 500,
+    new_after_n_chars: Optional[int] = None,
+    overlap: int = 0,
+) -> List[ChunkElement]:
+    _validate(max_characters, overlap)
+    new_after_n_chars = max_characters if new_after_n_chars is None else new_after_n_chars
+    pre_chunks = _pre_chunks(iter([elements]), max_characters, new_after_n_chars)
+    return [
+        chunk
+        for pre_chunk in pre_chunks
+        for chunk in _chunks_from_pre_chunk(pre_chunk, max_characters, overlap)
+    ]
+
+
+def chunk_by_title(
+    elements: List[ChunkElement],
+    max_characters: int = 500,
+    new_after_n_chars: Optional[int] = None,
+    overlap: int = 0,
+    combine_text_under_n_chars: Optional[int] = None,
+) -> List[ChunkElement]:
+    _validate(max_characters, overlap)
+    new_after_n_chars = max_characters if new_after_n_chars is None else new_after_n_chars
+    if combine_text_under_n_chars is None:
+        combine_text_under_n_chars = max_characters
+    pre_chunks = _pre_chunks(_title_sections(elements), max_characters, new_after_n_chars)
+    if combine_text_under_n_chars > 0:
+        pre_chunks = _combine_small_pre_chunks(pre_chunks, max_characters, combine_text_under_n_chars)
+    return [
+        chunk
+        for pre_chunk in pre_chunks
+        for chunk in _chunks_from_pre_chunk(pre_chunk, max_characters, overlap)
+    ]
@@ -0,0 +1,74 @@
+import uuid
+from typing import List
+
+from langchain_core.documents.base import Document
+
+from rag.chunkers.base import BaseChunkingStrategy
+from rag.chunkers.chunking import ChunkElement, chunk_basic, chunk_by_title
+from rag.common.registry import registry
+
+
+def _docs_to_elements(docs: List[Document]) -> List[ChunkElement]:
+    # The metadata is not modified by the chunking, so no copy is required
+    return [
+        (doc.page_content, doc.metadata.get('element_type', 'NarrativeText'), doc.metadata)
+        for doc in docs
+    ]
+
+
+def _elements_to_docs(chunks: List[ChunkElement]) -> List[Document]:
+    docs = []
+    for text, element_type, metadata in chunks:
+        metadata['element_type'] = element_type
+        docs.append(Document(id=str(uuid.uuid4()), page_content=text, metadata=metadata))
+    return docs
+
+
+@registry.register_chunker('native_basic_chunking')
+class NativeBasicChunking(BaseChunkingStrategy):
+    """Equivalent of BasicChunking working directly on the documents, without the conversion
+    to unstructured elements and back"""
+
+    def __init__(self, max_characters=250, overlap=40):
+        super().__init__()
+        self.max_characters = max_characters
+        self.overlap = overlap
+
+    def chunk(self, docs: List[Document]) -> List[Document]:
+        chunks = chunk_basic(
+            _docs_to_elements(docs), max_characters=self.max_characters, overlap=self.overlap
+        )
+        return _elements_to_docs(chunks)
+
+
+@registry.register_chunker('native_by_title_chunking')
+class NativeByTitleChunking(BaseChunkingStrategy):
+    """Equivalent of ByTitleChunking working directly on the documents, without the conversion
+    to unstructured elements and back"""
+
+    def __init__(
+        self,
+        combine_text_under_n_characters=None,
+        max_characters=250,
+        overlap=40,
+        new_after_n_chars=250,
+    ):
+        super().__init__()
+        self.max_characters = max_characters
+        self.overlap = overlap
+        self.combine_text_under_n_characters = (
+            combine_text_under_n_characters
+            if combine_text_under_n_characters is not None
+            else max_characters
+        )
+        self.new_after_n_chars = new_after_n_chars
+
+    def chunk(self, docs: List[Document]) -> List[Document]:
+        chunks = chunk_by_title(
+            _docs_to_elements(docs),
+            max_characters=self.max_characters,
+            overlap=self.overlap,
+            new_after_n_chars=self.new_after_n_chars,
+            combine_text_under_n_chars=self.combine_text_under_n_characters,
+        )
+        return _elements_to_docs(chunks)
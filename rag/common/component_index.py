@@ -0,0 +1,129 @@
+import ast
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Kinds of components, each registered by the modules of the package directory of the same name
+KINDS = ('scorers', 'retrievers', 'generators', 'chunkers', 'ingestors', 'vectorstores')
+
+
+def registered_components(source: str) -> List[Tuple[str, str]]:
+    """(kind, name) of the components registered in the module source by `registry.register_<kind>`
+    calls, as decorators or not. Only names given as string literals are found"""
+    components = []
+    for node in ast.walk(ast.parse(source)):
+        if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+            continue
+        if not node.func.attr.startswith('register_') or not node.args:
+            continue
+        kind = node.func.attr[len('register_'):] + 's'
+        name = node.args[0]
+        if kind in KINDS and isinstance(name, ast.Constant) and isinstance(name.value, str):
+            components.append((kind, name.value))
+    return components
+
+
+class ComponentIndex:
+    """
+    Maps the names of the components to the modules registering them, without importing the
+    modules: the registrations are read from their source. This lets the registry import only
+    the modules of the components a config uses, instead of all of them along with their
+    dependencies (chroma, unstructured, deepeval...).
+
+    The components found in each module are cached in a JSON file along with the modification
+    time and size of the module, so that the modules are parsed again only once changed.
+
+    Args:
+        package_dir: Directory of the package, containing a directory per kind of component
+        cache_path: JSON file caching the components of the modules, no cache if None
+    """
+
+    VERSION = 1
+
+    def __init__(self, package_dir: str, cache_path: Optional[str] = None):
+        self.package_dir = os.path.abspath(package_dir)
+        self.package = os.path.basename(self.package_dir)
+        self.cache_path = cache_path
+        self._index: Optional[Dict[str, Dict[str, str]]] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, str]]:
+        """Module of each component name, by kind. Built once per process"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._build()
+            return self._index
+
+    def module_of(self, kind: str, name: str) -> Optional[str]:
+        return self.load()[kind].get(name)
+
+    def modules(self) -> List[str]:
+        """Modules registering at least one component"""
+        return sorted({module for components in self.load().values() for module in components.values()})
+
+    def invalidate(self):
+        """Scan the modules again on the next lookup, e.g. after adding a component"""
+        with self._lock:
+            self._index = None
+
+    def _read_cache(self) -> dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cached.get('version') != self.VERSION or cached.get('package_dir') != self.package_dir:
+            return {}
+        return cached.get('files', {})
+
+    def _write_cache(self, files: dict):
+        if not self.cache_path:
+            return
+        tmp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'package_dir': self.package_dir, 'files': files}, f)
+            os.replace(tmp_path, self.cache_path)  # Atomic, concurrent processes read either index
+        except OSError as e:
+            # E.g. read-only install, the index is then rebuilt by each process
+            print(f'Warning: Could not cache the component index in {self.cache_path}: {e}')
+
+    def _build(self) -> Dict[str, Dict[str, str]]:
+        cached = self._read_cache()
+        files = {}
+        for kind in KINDS:
+            for root, dirs, filenames in os.walk(os.path.join(self.package_dir, kind)):
+                dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+                for filename in sorted(filenames):
+                    if not filename.endswith('.py') or filename == '__init__.py':
+                        continue
+                    path = os.path.join(root, filename)
+                    rel_path = os.path.relpath(path, self.package_dir)
+                    stat = os.stat(path)
+                    stamp = [stat.st_mtime_ns, stat.st_size]
+                    entry = cached.get(rel_path)
+                    if entry is None or entry['stamp'] != stamp:
+                        entry = {'stamp': stamp, 'components': self._scan(path)}
+                    files[rel_path] = entry
+        if files != cached:
+            self._write_cache(files)
+
+        index = {kind: {} for kind in KINDS}
+        for rel_path, entry in files.items():
+            module = '.'.join([self.package] + os.path.splitext(rel_path)[0].split(os.sep))
+            for kind, name in entry['components']:
+                index[kind][name] = module
+        return index
+
+    @staticmethod
+    def _scan(path: str) -> List[Tuple[str, str]]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return registered_components(f.read())
+        except (OSError, SyntaxError, UnicodeDecodeError) as e:
+            print(f'Warning: Could not scan {path} for components: {e}')
+            return []
@@ -0,0 +1,27 @@
+import hashlib
+import json
+from typing import Any
+
+_BLOCK_SIZE = 1 << 20
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_text(text: str) -> str:
+    return hash_bytes(text.encode('utf-8'))
+
+
+def hash_file(path: str) -> str:
+    """Content hash of the file, read in blocks so large PDFs are not loaded in memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_params(params: Any) -> str:
+    """Stable hash of JSON serializable parameters, independent of the ordering of dict keys"""
+    return hash_text(json.dumps(params, sort_keys=True, default=str))
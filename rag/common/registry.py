@@ -1,10 +1,28 @@
+import importlib
+import os
+
+from rag.common.component_index import ComponentIndex
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
 class Registry:
+    """
+    Components by kind and name. The components register themselves when their module is
+    imported, and `get_*` imports the module of a component not registered yet, found in the
+    index of the registrations of the component directories. So only the components in use, and
+    their dependencies, are imported.
+    """
+    index = ComponentIndex(
+        _PACKAGE_DIR, cache_path=os.path.join(os.path.dirname(_PACKAGE_DIR), '.cache', 'registry_index.json')
+    )
     mapping = {
         'scorers': {},
         'retrievers': {},
         'generators': {},
         'chunkers': {},
-        'ingestors': {}
+        'ingestors': {},
+        'vectorstores': {}
     }
 
     @classmethod
@@ -47,40 +65,50 @@ class Registry:
             return chunker
         return wrap
     
+    @classmethod
+    def register_vectorstore(cls, identifier: str):
+        def wrap(vectorstore: callable):
+            print(f'Registered vectorstore: {identifier}')
+            cls.mapping['vectorstores'][identifier] = vectorstore
+            return vectorstore
+        return wrap
+    
+    @classmethod
+    def _get(cls, kind: str, identifier: str, label: str):
+        component = cls.mapping[kind].get(identifier)
+        if component is None:
+            # Not imported yet, importing its module runs its registration
+            module = cls.index.module_of(kind, identifier)
+            if module is not None:
+                importlib.import_module(module)
+                component = cls.mapping[kind].get(identifier)
+        if component is None:
+            raise KeyError(f'{label} with the name- "{identifier}" not found.')
+        return component
+
     @classmethod
     def get_retriever(cls, identifier: str):
-        retriever_cls = cls.mapping['retrievers'].get(identifier)
-        if retriever_cls is None:
-            raise KeyError(f'Retriever with the name- "{identifier}" not found.')
-        return retriever_cls
+        return cls._get('retrievers', identifier, 'Retriever')
 
     @classmethod
     def get_generator(cls, identifier: str):
-        generator_cls = cls.mapping['generators'].get(identifier)
-        if generator_cls is None:
-            raise KeyError(f'Generator with the name- "{identifier}" not found.')
-        return generator_cls
+        return cls._get('generators', identifier, 'Generator')
 
     @classmethod
     def get_chunker(cls, identifier: str):
-        chunker_cls = cls.mapping['chunkers'].get(identifier)
-        if chunker_cls is None:
-            raise KeyError(f'Chunker with the name- "{identifier}" not found.')
-        return chunker_cls
+        return cls._get('chunkers', identifier, 'Chunker')
 
     @classmethod
     def get_ingestor(cls, identifier: str):
-        ingestor_cls = cls.mapping['ingestors'].get(identifier)
-        if ingestor_cls is None:
-            raise KeyError(f'Ingestor with the name- "{identifier}" not found.')
-        return ingestor_cls
+        return cls._get('ingestors', identifier, 'Ingestor')
+
+    @classmethod
+    def get_vectorstore(cls, identifier: str):
+        return cls._get('vectorstores', identifier, 'Vectorstore')
 
     @classmethod
     def get_scorer(cls, identifier: str):
-        scorer_cls = cls.mapping['scorers'].get(identifier)
-        if scorer_cls is None:
-            raise KeyError(f'Scorer with the name- "{identifier}" not found.')
-        return scorer_cls
-            
+        return cls._get('scorers', identifier, 'Scorer')
+
 
 registry = Registry()
\ No newline at end of file
@@ -0,0 +1,123 @@
+import threading
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from rag.common.hashing import hash_text
+from rag.common.lru import LRUCache
+from rag.embeddings.queries import aembed_queries, embed_queries
+from rag.embeddings.store import EmbeddingStore
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding function with a content addressed cache keyed by (model, hash of the text).
+    Lookups go through an in-memory LRU first, then the on-disk `EmbeddingStore` (if any), and
+    only the texts missing from both are sent to the wrapped embedding function, in one call.
+
+    Queries are cached separately from documents, as some models embed them differently.
+
+    Args:
+        embeddings: The embedding function to wrap
+        model: Name of the embedding model, part of the cache key
+        store: Optional persistent store, shared across processes and runs
+        lru_size: Maximum number of vectors kept in memory
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        store: Optional[EmbeddingStore] = None,
+        lru_size: int = 10_000,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.store = store
+        self._lru = LRUCache(lru_size)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, namespace: str, texts: List[str]) -> tuple:
+        """Returns the hashes of the texts, the cached vectors found and the missing texts by hash"""
+        hashes = [hash_text(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        for text_hash in hashes:
+            vector = self._lru.get((namespace, text_hash))
+            if vector is not None:
+                found[text_hash] = vector
+
+        not_in_lru = [h for h in dict.fromkeys(hashes) if h not in found]
+        if self.store is not None and not_in_lru:
+            from_store = self.store.get_many(namespace, not_in_lru)
+            for text_hash, vector in from_store.items():
+                self._lru.put((namespace, text_hash), vector)
+            found.update(from_store)
+
+        # Deduplicated, so repeated texts are only embedded once
+        missing = {h: text for h, text in zip(hashes, texts) if h not in found}
+        with self._lock:
+            self.hits += len(texts) - sum(1 for h in hashes if h in missing)
+            self.misses += sum(1 for h in hashes if h in missing)
+        return hashes, found, missing
+
+    def _save(self, namespace: str, found: Dict, missing: Dict[str, str], vectors: List[List[float]]):
+        new = dict(zip(missing.keys(), vectors))
+        for text_hash, vector in new.items():
+            self._lru.put((namespace, text_hash), vector)
+        if self.store is not None and new:
+            self.store.put_many(namespace, new.items())
+        found.update(new)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._lookup(self.model, texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            self._save(self.model, found, missing, vectors)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        namespace = f'{self.model}#query'
+        hashes, found, missing = self._lookup(namespace, [text])
+        if missing:
+            self._save(namespace, found, missing, [self.embeddings.embed_query(text)])
+        return found[hashes[0]]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings of several queries, the missing ones being embedded in one call"""
+        namespace = f'{self.model}#query'
+        hashes, found, missing = self._lookup(namespace, texts)
+        if missing:
+            self._save(namespace, found, missing, embed_queries(self.embeddings, list(missing.values())))
+        return [found[h] for h in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._lookup(self.model, texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            self._save(self.model, found, missing, vectors)
+        return [found[h] for h in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        namespace = f'{self.model}#query'
+        hashes, found, missing = self._lookup(namespace, [text])
+        if missing:
+            self._save(namespace, found, missing, [await self.embeddings.aembed_query(text)])
+        return found[hashes[0]]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        namespace = f'{self.model}#query'
+        hashes, found, missing = self._lookup(namespace, texts)
+        if missing:
+            vectors = await aembed_queries(self.embeddings, list(missing.values()))
+            self._save(namespace, found, missing, vectors)
+        return [found[h] for h in hashes]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,141 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Wraps an embedding function to embed large lists of texts in batches of `batch_size`, with at
+    most `max_concurrency` requests in flight. Failed batches are retried up to `max_retries`
+    times with exponential backoff (starting at `backoff` seconds, capped at `max_backoff`).
+
+    The requests are issued from the wrapped function's async API on an event loop owned by the
+    executor and running in a background thread. Async clients (like Ollama's, built on httpx)
+    are bound to the loop they first ran on, so both the sync and async methods go through that
+    loop, which also allows calling the sync methods while another event loop is running.
+
+    Args:
+        embeddings: The embedding function to wrap
+        batch_size: Maximum number of texts sent in one request
+        max_concurrency: Maximum number of requests in flight
+        max_retries: Number of retries of a failed batch before giving up
+        backoff: Delay in seconds before the first retry, doubled at each retry
+        max_backoff: Maximum delay in seconds between retries
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        batch_size: int = 64,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+    ):
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be > 0, got {batch_size}")
+        if max_concurrency <= 0:
+            raise ValueError(f"max_concurrency must be > 0, got {max_concurrency}")
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._loop = None
+        self._semaphore = None
+        self._loop_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.embedded = 0
+        self.requests = 0
+        self.retries = 0
+        self.busy_seconds = 0.0
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="embedding-executor", daemon=True
+                )
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # Created lazily so that it belongs to the executor's loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                try:
+                    vectors = await self.embeddings.aembed_documents(texts)
+                    with self._stats_lock:
+                        self.requests += 1
+                    return vectors
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    error = e
+            # Sleep outside the semaphore, so the other batches keep going
+            delay = min(self.max_backoff, self.backoff * 2**attempt)
+            delay *= 1 + random.random() * 0.1
+            print(f"Embedding request failed ({error!r}), retrying in {delay:.2f}s")
+            with self._stats_lock:
+                self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        batches = [texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch) for batch in batches))
+        with self._stats_lock:
+            self.embedded += len(texts)
+            self.busy_seconds += time.perf_counter() - start
+        return [vector for vectors in results for vector in vectors]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return asyncio.run_coroutine_threadsafe(self._embed(texts), self._get_loop()).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Queries are embedded like documents, so they are batched the same way"""
+        return self.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        future = asyncio.run_coroutine_threadsafe(self._embed(texts), self._get_loop())
+        return await asyncio.wrap_future(future)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        return await self.aembed_documents(texts)
+
+    def close(self):
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+                self._semaphore = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'embedded': self.embedded,
+            'requests': self.requests,
+            'retries': self.retries,
+            'embeddings_per_sec': self.embedded / self.busy_seconds if self.busy_seconds else 0.0,
+        }
@@ -0,0 +1,79 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+from rag.common.hashing import hash_params
+from rag.embeddings.cached import CachedEmbeddings
+from rag.embeddings.executor import BatchedEmbeddings
+from rag.embeddings.store import EmbeddingStore
+
+# Prefix of the `model` selecting the in-process sentence-transformers backend instead of Ollama,
+# e.g. "sentence-transformers:all-MiniLM-L6-v2"
+SENTENCE_TRANSFORMERS_PREFIX = 'sentence-transformers:'
+# Parameters of the backend changing the vectors, which are part of the cache key
+_OUTPUT_PARAMS = ('quantize', 'normalize_embeddings')
+
+# Embedding functions are shared process wide, so that all the retrievers (and evaluation
+# configs) using the same model and cache share one store connection, in-memory LRU and
+# embedding executor (so `max_concurrency` bounds the requests of the whole process)
+_embeddings: Dict[Tuple[str, Optional[str], str, str], Embeddings] = {}
+_stores: Dict[str, EmbeddingStore] = {}
+_lock = threading.Lock()
+
+
+def _backend_embeddings(model: str, params: Dict[str, Any]) -> Embeddings:
+    if model.startswith(SENTENCE_TRANSFORMERS_PREFIX):
+        from rag.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+
+        return SentenceTransformerEmbeddings(model[len(SENTENCE_TRANSFORMERS_PREFIX):], **params)
+    return OllamaEmbeddings(model=model, **params)
+
+
+def get_embeddings(
+    model: str,
+    cache_path: Optional[str] = None,
+    executor: Optional[Dict[str, Any]] = None,
+    params: Optional[Dict[str, Any]] = None,
+) -> Embeddings:
+    """
+    Embedding function used by the retrievers.
+
+    Args:
+        model: Name of the Ollama embedding model, or of a sentence-transformers model prefixed
+            with "sentence-transformers:" to embed in-process
+        cache_path: Path of the SQLite embedding cache. If None, embeddings are not cached
+        executor: Arguments of the `BatchedEmbeddings` executor (batch_size, max_concurrency,
+            max_retries, ...). If None, all the texts are sent in a single request
+        params: Extra arguments of the embedding backend, e.g. batch_size, num_threads and
+            quantize for `SentenceTransformerEmbeddings`
+    """
+    params = params or {}
+    in_process = model.startswith(SENTENCE_TRANSFORMERS_PREFIX)
+    if cache_path is None and executor is None and not in_process:
+        return _backend_embeddings(model, params)
+
+    cache_path = os.path.abspath(cache_path) if cache_path is not None else None
+    with _lock:
+        key = (
+            model,
+            cache_path,
+            hash_params(executor) if executor is not None else '',
+            hash_params(params),
+        )
+        # In-process models are loaded once, and shared like the cached embedding functions
+        if key not in _embeddings:
+            embeddings = _backend_embeddings(model, params)
+            # The cache goes in front of the executor, so that only the misses are batched
+            if executor is not None:
+                embeddings = BatchedEmbeddings(embeddings, **executor)
+            if cache_path is not None:
+                if cache_path not in _stores:
+                    _stores[cache_path] = EmbeddingStore(cache_path)
+                output_params = {k: params[k] for k in _OUTPUT_PARAMS if k in params}
+                cache_model = f'{model}#{hash_params(output_params)[:12]}' if output_params else model
+                embeddings = CachedEmbeddings(embeddings, model=cache_model, store=_stores[cache_path])
+            _embeddings[key] = embeddings
+        return _embeddings[key]
@@ -0,0 +1,35 @@
+import asyncio
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embeddings of several queries in one batched call when the embedding function supports it,
+    i.e. it defines `embed_queries` or embeds queries like documents (Ollama). Otherwise the
+    queries are embedded one at a time with `embed_query`.
+    """
+    if not texts:
+        return []
+    if hasattr(embeddings, 'embed_queries'):
+        return embeddings.embed_queries(texts)
+    if isinstance(embeddings, OllamaEmbeddings):
+        return embeddings.embed_documents(texts)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+async def aembed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """`embed_queries` with the async API of the embedding function, so that the event loop keeps
+    serving other queries while waiting for the embeddings. In-process embedding functions without
+    an async API run in a worker thread."""
+    if not texts:
+        return []
+    if hasattr(embeddings, 'aembed_queries'):
+        return await embeddings.aembed_queries(texts)
+    if isinstance(embeddings, OllamaEmbeddings):
+        return await embeddings.aembed_documents(texts)
+    if hasattr(embeddings, 'embed_queries'):
+        return await asyncio.to_thread(embeddings.embed_queries, texts)
+    return list(await asyncio.gather(*(embeddings.aembed_query(text) for text in texts)))
@@ -0,0 +1,74 @@
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    In-process embedding function running a sentence-transformers model on the CPU, which skips the
+    HTTP round trip (and JSON serialization of the vectors) of Ollama. Useful for small corpora,
+    per-query embedding and running tests without a server.
+
+    Args:
+        model_name: Name or path of the sentence-transformers model
+        batch_size: Number of texts encoded in one forward pass
+        num_threads: Number of threads used by torch for inference. If None, torch's default.
+            Note that this is a process wide torch setting
+        quantize: Apply int8 dynamic quantization to the linear layers, which is faster on CPU for a
+            small loss in accuracy
+        normalize_embeddings: Return unit length vectors
+        device: Device running the model
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        quantize: bool = False,
+        normalize_embeddings: bool = False,
+        device: str = 'cpu',
+    ):
+        # Imported lazily, torch is slow to import and only needed by this backend
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.normalize_embeddings = normalize_embeddings
+        self.model = SentenceTransformer(model_name, device=device)
+        self.model.eval()
+        if quantize:
+            self.model = torch.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self._torch = torch
+        # Encoding is CPU bound and already multithreaded by torch, running several at once only
+        # oversubscribes the cores
+        self._lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        with self._lock, self._torch.inference_mode():
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=self.normalize_embeddings,
+                show_progress_bar=False,
+            )
+        return vectors.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import threading
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+
+class EmbeddingStore:
+    """
+    On-disk store of embedding vectors in SQLite, keyed by (embedding model, text hash).
+    Vectors are stored as float32 blobs. The connection is shared between threads, guarded by a
+    lock, so a single store can back all the retrievers of a process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings ('
+                'model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, '
+                'PRIMARY KEY (model, text_hash))'
+            )
+
+    def get_many(self, model: str, text_hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        # Stay below SQLite's limit on the number of query parameters
+        for i in range(0, len(text_hashes), 500):
+            batch = text_hashes[i : i + 500]
+            placeholders = ','.join('?' * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f'SELECT text_hash, vector FROM embeddings '
+                    f'WHERE model = ? AND text_hash IN ({placeholders})',
+                    [model, *batch],
+                ).fetchall()
+            for text_hash, blob in rows:
+                found[text_hash] = array('f', blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[str, List[float]]]):
+        rows = [(model, text_hash, array('f', vector).tobytes()) for text_hash, vector in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)',
+                rows,
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,4 +1,5 @@
-from typing import Dict, Optional
+import dataclasses
+from typing import Any, Dict, Optional
 
 from pydantic import ConfigDict
 from pydantic.dataclasses import dataclass
@@ -15,9 +16,13 @@ class GeneratorConfig:
     params: GeneratorParams
 
 
-@dataclass
+@dataclass(config=ConfigDict(extra="allow"))  # allow for extra parameters
 class IngestorParams:
-    pass  # Add specific fields if needed in the future
+    num_workers: Optional[int] = None
+    max_pending: Optional[int] = None
+    cache_dir: Optional[str] = None
+    cache_max_bytes: Optional[int] = None
+    partition_kwargs: Optional[Dict[str, Any]] = None
 
 
 @dataclass(config=ConfigDict(extra="allow"))  # allow for extra parameters
@@ -74,6 +79,16 @@ class DatasetConfig:
 @dataclass
 class CorpusConfig:
     path: str | list[str]
+    manifest: Optional[str] = None  # Path of the ingestion manifest, enables incremental ingestion
+
+
+@dataclass
+class ExecutorConfig:
+    # Maximum number of concurrent calls of each stage, see EvaluationExecutor
+    retrieval_concurrency: int = 8
+    generation_concurrency: int = 4
+    scoring_concurrency: int = 8  # Rows scored at once by weave.Evaluation (WEAVE_PARALLELISM)
+    progress_interval: Optional[float] = 10.0  # Seconds between the progress reports
 
 
 @dataclass
@@ -85,3 +100,14 @@ class Config:
     dataset: DatasetConfig
     corpus: CorpusConfig
     evaluation_name: Optional[str] = None
+    executor: Optional[ExecutorConfig] = None
+
+
+def params_to_dict(params) -> Dict[str, Any]:
+    """Like dataclasses.asdict, but also includes the extra parameters allowed on the params
+    dataclasses, which asdict silently drops"""
+    params_dict = dataclasses.asdict(params)
+    for key, value in vars(params).items():
+        if key not in params_dict and not key.startswith('_'):
+            params_dict[key] = value
+    return params_dict
@@ -11,12 +11,32 @@ import yaml
 
 from rag.common.dataset import Dataset
 from rag.common.registry import registry
-from rag.common.setup_imports import setup_imports
-from rag.evaluation.config import Config
+from rag.embeddings.cached import CachedEmbeddings
+from rag.embeddings.executor import BatchedEmbeddings
+from rag.evaluation.config import Config, ExecutorConfig, params_to_dict
+from rag.evaluation.executor import EvaluationExecutor
+from rag.evaluation.precomputed import PrecomputedModel
 from rag.generators.base import BaseGenerator
+from rag.ingestors.manifest import IngestionManifest
+from rag.ingestors.pipeline import IngestionPipeline
+from rag.rerankers.engine import RerankEngine
 from rag.retrievers.base import BaseRetriever
 
 
+async def weave_evaluate(evaluation_name, model, results, scorers):
+    """Score the outputs computed by the executor with weave.Evaluation, which logs the evaluation"""
+    dataset = weave.Dataset(name="eval_data", rows=[result['row'] for result in results])
+    evaluation = weave.Evaluation(evaluation_name=evaluation_name, dataset=dataset, scorers=scorers)
+    return await evaluation.evaluate(PrecomputedModel(model, results))
+
+
+def print_stats(results, executor: EvaluationExecutor):
+    print(f"Stages: {json.dumps(executor.stats(), indent=4)}")
+    for result in results:
+        if result['error'] is not None:
+            print(f"Failed row {result['row'].get('input')!r}: {result['error']}")
+
+
 async def evaluate(config: Config):
     # Load Dataset from the provided jsonl filepath in config
     dataset_conf = config.dataset
@@ -40,16 +60,17 @@ async def evaluate(config: Config):
     Chunker = registry.get_chunker(retriever_config.params.chunker.name)
 
     # Initialize Retriver
-    ret_params = dataclasses.asdict(retriever_config.params)
-    chunker_params = ret_params.pop("chunker")["params"]
+    ret_params = params_to_dict(retriever_config.params)
+    ret_params.pop("chunker")
+    chunker_params = params_to_dict(retriever_config.params.chunker.params)
     retriever: BaseRetriever = Retriver(**ret_params, chunker=Chunker(**chunker_params))
 
     # Initialize Ingestor
-    ingestor_params = dataclasses.asdict(ingestor_config.params)
+    ingestor_params = params_to_dict(ingestor_config.params)
     ingestor = Ingestor(**ingestor_params)
 
     # Initialize Generator
-    generator_params = dataclasses.asdict(generator_config.params)
+    generator_params = params_to_dict(generator_config.params)
     generator: BaseGenerator = Generator(**generator_params)
 
     corpus_conf = config.corpus
@@ -63,11 +84,23 @@ async def evaluate(config: Config):
             os.path.dirname(__file__), "../../corpus", corpus_conf.path
         )
     print("Ingesting corpus...")
-    if os.path.isdir(corpus_path):
-        docs = ingestor.load_dir(dir_path=corpus_path)
+    manifest = IngestionManifest(corpus_conf.manifest) if corpus_conf.manifest else None
+    pipeline = IngestionPipeline(ingestor, retriever)
+    if isinstance(corpus_path, str) and os.path.isdir(corpus_path):
+        pipeline.run(corpus_path, manifest=manifest)
     else:
-        docs = ingestor.load_file(file_path=corpus_path)
-    retriever.add_docs(docs)
+        files = corpus_path if isinstance(corpus_path, list) else [corpus_path]
+        if manifest is not None:
+            pipeline.sync(files, manifest)
+        else:
+            pipeline.ingest_files(files)
+
+    embeddings = getattr(getattr(retriever, "vector_db", None), "embeddings", None)
+    if isinstance(embeddings, CachedEmbeddings):
+        print(f"Embedding cache: {embeddings.stats()}")
+        embeddings = embeddings.embeddings
+    if isinstance(embeddings, BatchedEmbeddings):
+        print(f"Embedding executor: {embeddings.stats()}")
 
     # Test
     # input = "Who is the Author and when was the article published?"
@@ -78,18 +111,18 @@ async def evaluate(config: Config):
 
     scorer_config = config.scorers
 
+    # The outputs are computed concurrently, with a limit per stage (retrieval, generation), then
+    # scored and logged by weave.Evaluation, WEAVE_PARALLELISM rows at once
+    executor_params = dataclasses.asdict(config.executor or ExecutorConfig())
+    os.environ["WEAVE_PARALLELISM"] = str(executor_params.pop("scoring_concurrency"))
+    executor = EvaluationExecutor(**executor_params)
+
     if scorer_config.retriever:
         print('Evaluating Retriver...')
-        ret_eval_dataset = weave.Dataset(name="eval_data", rows=dataset.data)
         ret_scorers = [registry.get_scorer(scorer) for scorer in scorer_config.retriever]
-        generator_evaluation = weave.Evaluation(
-            evaluation_name=f'(Ret) {config.evaluation_name}',
-            dataset=ret_eval_dataset,
-            scorers=ret_scorers
-        )
-
-        await generator_evaluation.evaluate(retriever)
-
+        results = await executor.predict_retriever(retriever, dataset.data)
+        print_stats(results, executor)
+        await weave_evaluate(f'(Ret) {config.evaluation_name}', retriever, results, ret_scorers)
 
     if scorer_config.generator:
         print('Evaluating Generator...')
@@ -97,19 +130,22 @@ async def evaluate(config: Config):
 
         # Add retriveal_context by dyamcially querying the retriever
         # TODO: Make this only excute for metrics that requires retrieval_context like 'faithfulness' through config 
-        for row in dataset.data:
-            if 'retrieval_context' not in row:
-                row['retrieval_context'] = [doc.page_content for doc in retriever.query(row['input'])]
-
-        gen_eval_dataset = weave.Dataset(name="eval_data", rows=dataset.data)
-
-        gen_evaluation = weave.Evaluation(
-            evaluation_name=f'(Gen) {config.evaluation_name}',
-            dataset=gen_eval_dataset,
-            scorers=gen_scorers
-        )
-
-        await gen_evaluation.evaluate(generator)
+        # The rows without a retrieval_context are retrieved by the executor, concurrently with
+        # the generation of the others
+        results = await executor.predict_generator(generator, dataset.data, retriever=retriever)
+        print_stats(results, executor)
+        await weave_evaluate(f'(Gen) {config.evaluation_name}', generator, results, gen_scorers)
+
+    for name, attr in (("Rerank first pass", "_first_pass_engine"), ("Rerank engine", "_engine")):
+        engine = getattr(retriever, attr, None)
+        if isinstance(engine, RerankEngine):
+            print(f"{name}: {engine.stats()}")
+    packer = getattr(generator, '_packer', None)
+    if packer is not None:
+        print(f"Context packing: {packer.stats()}")
+    query_cache = getattr(retriever, '_query_cache', None)
+    if query_cache is not None:
+        print(f"Query cache: {query_cache.stats()}")
 
 
 if __name__ == "__main__":
@@ -139,8 +175,6 @@ if __name__ == "__main__":
     if rel_file_path is not None:
         eval_path = Path(root_dir, rel_file_path)
 
-    setup_imports(exclude_modules=["rag.scorers.ragas_scorers"])
-
     with open(eval_path) as stream:
         try:
             yaml_config = yaml.safe_load(stream)
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+class StageStats:
+    """Concurrency limit and counters of one stage of the evaluation"""
+
+    def __init__(self, name: str, concurrency: int):
+        if concurrency <= 0:
+            raise ValueError(f"{name}_concurrency must be > 0, got {concurrency}")
+        self.name = name
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0  # Sum of the latencies of the calls
+
+    @property
+    def in_flight(self) -> int:
+        return self.started - self.completed - self.failed
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await the call once one of the `concurrency` slots of the stage is free"""
+        async with self.semaphore:
+            self.started += 1
+            start = time.perf_counter()
+            try:
+                result = await call()
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.busy_seconds += time.perf_counter() - start
+            self.completed += 1
+            return result
+
+    def stats(self, elapsed: float) -> Dict[str, float]:
+        calls = self.completed + self.failed
+        return {
+            'completed': self.completed,
+            'failed': self.failed,
+            'in_flight': self.in_flight,
+            'mean_latency': self.busy_seconds / calls if calls else 0.0,
+            'throughput': self.completed / elapsed if elapsed > 0 else 0.0,
+        }
+
+
+class EvaluationExecutor:
+    """
+    Computes the outputs of the models for the rows of a dataset concurrently, to be scored by
+    weave.Evaluation: each row goes through retrieval and generation as soon as the stage has a
+    free slot, so that a run takes about as long as its slowest stage rather than the sum of the
+    latencies of all the calls. Each stage has its own limit, as each calls its own dependency
+    (Ollama embeddings and reranking, the Ollama LLM), which serve a limited number of requests at
+    once.
+
+    While running, the progress and throughput of the stages are printed every
+    `progress_interval` seconds.
+
+    Args:
+        retrieval_concurrency: Maximum number of concurrent retrievals
+        generation_concurrency: Maximum number of concurrent generations, e.g. OLLAMA_NUM_PARALLEL
+        progress_interval: Seconds between the progress reports, None to report only at the end
+    """
+
+    def __init__(
+        self,
+        retrieval_concurrency: int = 8,
+        generation_concurrency: int = 4,
+        progress_interval: Optional[float] = 10.0,
+    ):
+        self.concurrency = {
+            'retrieval': retrieval_concurrency,
+            'generation': generation_concurrency,
+        }
+        self.progress_interval = progress_interval
+        self._reset()
+
+    def _reset(self):
+        # Per run, as the semaphores belong to the event loop of the run
+        self.stages = {stage: StageStats(stage, concurrency) for stage, concurrency in self.concurrency.items()}
+        self.rows_done = 0
+        self.rows_total = 0
+        self._start = time.perf_counter()
+
+    async def predict_retriever(self, retriever, rows: Sequence[dict]) -> List[dict]:
+        """Retrieve the contexts of the `input` of each row. See `_run` for the results"""
+
+        async def predict(row):
+            return await self._retrieve(retriever, row['input'])
+
+        return await self._run('Ret', rows, predict)
+
+    async def predict_generator(self, generator, rows: Sequence[dict], retriever=None) -> List[dict]:
+        """Generate the response to the `input` of each row from its `retrieval_context`. The
+        context of the rows without one is retrieved first with the retriever, and added to the
+        row. See `_run` for the results"""
+
+        async def predict(row):
+            if 'retrieval_context' not in row:
+                if retriever is None:
+                    raise ValueError('The row has no retrieval_context and there is no retriever to retrieve it')
+                row['retrieval_context'] = await self._retrieve(retriever, row['input'])
+            response = await self.stages['generation'].run(
+                lambda: _call(generator, 'query', row['input'], row['retrieval_context'])
+            )
+            return getattr(response, 'content', response)
+
+        return await self._run('Gen', rows, predict)
+
+    async def _retrieve(self, retriever, query: str) -> List[str]:
+        docs = await self.stages['retrieval'].run(lambda: _call(retriever, 'query', query))
+        return [doc.page_content for doc in docs]
+
+    async def _predict_row(self, row: dict, predict) -> dict:
+        result = {'row': row, 'output': None, 'error': None}
+        try:
+            result['output'] = await predict(row)
+        except Exception as e:
+            result['error'] = repr(e)
+        self.rows_done += 1
+        return result
+
+    async def _run(self, label: str, rows: Sequence[dict], predict) -> List[dict]:
+        """Results of the rows, in their order: dicts of the `row`, the `output` of the model and
+        the `error` of the model if it failed"""
+        self._reset()
+        self.rows_total = len(rows)
+        reporter = asyncio.create_task(self._report_progress(label)) if self.progress_interval else None
+        try:
+            results = await asyncio.gather(*(self._predict_row(row, predict) for row in rows))
+        finally:
+            if reporter is not None:
+                reporter.cancel()
+        print(self.progress(label))
+        return list(results)
+
+    async def _report_progress(self, label: str):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            print(self.progress(label))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def progress(self, label: str) -> str:
+        elapsed = self.elapsed()
+        rate = self.rows_done / elapsed if elapsed > 0 else 0.0
+        stages = []
+        for stage in self.stages.values():
+            if stage.started:
+                failed = f", {stage.failed} failed" if stage.failed else ''
+                stages.append(f"{stage.name} {stage.completed} done{failed}, {stage.in_flight} in flight")
+        return f"[{label}] {self.rows_done}/{self.rows_total} rows in {elapsed:.1f} s ({rate:.2f} rows/s) | " + ' | '.join(stages)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        elapsed = self.elapsed()
+        return {name: stage.stats(elapsed) for name, stage in self.stages.items()}
+
+
+async def _call(component, method: str, *args):
+    """The async variant of the method of the component, or the method in a worker thread"""
+    async_method = getattr(component, f'a{method}', None)
+    if async_method is not None:
+        return await async_method(*args)
+    return await asyncio.to_thread(getattr(component, method), *args)
@@ -0,0 +1,34 @@
+from typing import Any, Dict, List
+
+import weave
+from pydantic import PrivateAttr
+
+
+class PrecomputedModel(weave.Model):
+    """
+    Model of a `weave.Evaluation` returning the outputs computed beforehand by the
+    `EvaluationExecutor`, so that the retriever and generator run within the executor's limits
+    while weave still scores the outputs and logs the evaluation. The evaluated model is logged
+    along with it, as `model`.
+
+    The outputs are looked up by the `input` of the rows; the rows whose prediction failed raise
+    their error, which weave records for the row.
+    """
+
+    model: Any
+    _outputs: Dict[str, Any] = PrivateAttr(default_factory=dict)
+    _errors: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, model: Any, results: List[dict]):
+        super().__init__(model=model)
+        for result in results:
+            if result['error'] is not None:
+                self._errors[result['row']['input']] = result['error']
+            else:
+                self._outputs[result['row']['input']] = result['output']
+
+    @weave.op()
+    def predict(self, input: str) -> Any:
+        if input in self._errors:
+            raise RuntimeError(f'Prediction failed: {self._errors[input]}')
+        return self._outputs[input]
@@ -1,10 +1,24 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Iterator, List
+
+from langchain_core.documents import Document
 
 class BaseGenerator(ABC):
 
     @abstractmethod
-    def query(self, query: str, context: str | List[str]) -> str: 
-        """Generate the response based on the query and the context - most probably the output of a retriver"""
-    
+    def query(self, query: str, context: str | List[str] | List[Document]) -> str: 
+        """Generate the response based on the query and the context - most probably the output of a retriver, as texts or documents"""
+
+    async def aquery(self, query: str, context: str | List[str] | List[Document]):
+        """`query` for asyncio. Generators without an async API run in a worker thread"""
+        return await asyncio.to_thread(self.query, query, context)
+
+    def warm_up(self):
+        """Load the model ahead of the first query"""
 
+    def stream(self, query: str, context: str | List[str] | List[Document]) -> Iterator[str]:
+        """Generate the response as it is produced, token by token. Generators which cannot stream
+        yield the whole response at once"""
+        response = self.query(query, context)
+        yield getattr(response, 'content', response)
@@ -0,0 +1,173 @@
+import math
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Union
+
+from langchain_core.documents import Document
+
+_WORD = re.compile(r'\w+')
+
+
+class TokenCounter:
+    """
+    Counts the tokens of texts with the tokenizer of the target model, loaded from Hugging Face
+    (e.g. Qwen/Qwen2.5-3B-Instruct for qwen2.5:3b, Ollama does not expose its tokenizers). Without
+    a tokenizer, the count is estimated at 4 characters per token.
+    """
+
+    def __init__(self, tokenizer: Optional[str] = None):
+        self.tokenizer_name = tokenizer
+        self._tokenizer = None
+
+    def _get_tokenizer(self):
+        if self._tokenizer is None:
+            from tokenizers import Tokenizer
+
+            self._tokenizer = Tokenizer.from_pretrained(self.tokenizer_name)
+        return self._tokenizer
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        if self.tokenizer_name is None:
+            return [math.ceil(len(text) / 4) for text in texts]
+        encodings = self._get_tokenizer().encode_batch(list(texts), add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+
+class PackedContext(NamedTuple):
+    texts: List[str]  # Packed chunks, in the order of the input
+    tokens: int  # Tokens of the packed chunks
+    original_tokens: int  # Tokens of all the chunks before packing
+    dropped: int  # Chunks dropped as duplicates, or for not fitting in the budget
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def _shingles(text: str, size: int = 3) -> Set[tuple]:
+    words = _WORD.findall(text.casefold())
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: Set[tuple], b: Set[tuple]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _overlap(left: str, right: str, min_overlap: int, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` which is a prefix of `right`, 0 if shorter than
+    `min_overlap`"""
+    for length in range(min(len(left), len(right), max_overlap), min_overlap - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+class ContextPacker:
+    """
+    Assembles the retrieved chunks into the context of the prompt:
+
+    - drops the near-duplicate chunks (e.g. of the .md and .txt copies of a note), whose word
+      shingles have a Jaccard similarity of at least `dedup_threshold` with a kept chunk, and the
+      chunks contained in a kept chunk
+    - strips the spans a chunk shares with a kept chunk of the same source, the overlap added by
+      the chunkers between consecutive chunks
+    - keeps the chunks, best first, while they fit in `max_tokens`
+
+    The chunks are expected best first, as returned by the retrievers.
+
+    Args:
+        max_tokens: Token budget of the context, None for no limit
+        tokenizer: Hugging Face tokenizer of the generator model counting the tokens, see TokenCounter
+        dedup_threshold: Minimum similarity of a near-duplicate chunk, None disables deduplication
+        min_overlap: Minimum number of characters of a stripped overlap, shorter ones are
+            assumed to be coincidental
+        max_overlap: Maximum number of characters of a stripped overlap
+        separator: Separator of the chunks in the context
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = 1024,
+        tokenizer: Optional[str] = None,
+        dedup_threshold: Optional[float] = 0.9,
+        min_overlap: int = 20,
+        max_overlap: int = 400,
+        separator: str = '\n\n',
+    ):
+        self.max_tokens = max_tokens
+        self.counter = TokenCounter(tokenizer)
+        self.dedup_threshold = dedup_threshold
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+        self.separator = separator
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.tokens = 0
+        self.original_tokens = 0
+
+    def _strip_overlaps(self, text: str, kept: Sequence[str]) -> str:
+        for other in kept:
+            # The chunk either follows or precedes the kept one in their source
+            start = _overlap(other, text, self.min_overlap, self.max_overlap)
+            end = _overlap(text, other, self.min_overlap, self.max_overlap)
+            text = text[start : len(text) - end]
+        return text
+
+    def pack(self, chunks: Sequence[Union[Document, str]]) -> PackedContext:
+        texts = [chunk.page_content if isinstance(chunk, Document) else chunk for chunk in chunks]
+        sources = [
+            chunk.metadata.get('filename', chunk.metadata.get('source')) if isinstance(chunk, Document) else None
+            for chunk in chunks
+        ]
+        original_tokens = sum(self.counter.count_batch(texts))
+
+        packed: List[str] = []
+        normalized_kept: List[str] = []
+        shingles: List[Set[tuple]] = []
+        by_source: Dict[str, List[str]] = {}
+        tokens = 0
+        for text, source in zip(texts, sources):
+            text = text.strip()
+            normalized = ' '.join(text.casefold().split())
+            if not normalized or any(normalized in kept for kept in normalized_kept):
+                continue
+            text_shingles = _shingles(text)
+            if self.dedup_threshold is not None and any(
+                _jaccard(text_shingles, kept) >= self.dedup_threshold for kept in shingles
+            ):
+                continue
+            stripped = self._strip_overlaps(text, by_source.get(source, [])).strip() if source else text
+            if not stripped:
+                continue
+            count = self.counter.count(stripped)
+            if self.max_tokens is not None and tokens + count > self.max_tokens:
+                continue
+            tokens += count
+            packed.append(stripped)
+            normalized_kept.append(normalized)
+            shingles.append(text_shingles)
+            if source:
+                # Overlaps are found with the original text of the chunk
+                by_source.setdefault(source, []).append(text)
+
+        with self._lock:
+            self.queries += 1
+            self.tokens += tokens
+            self.original_tokens += original_tokens
+        return PackedContext(packed, tokens, original_tokens, len(texts) - len(packed))
+
+    def stats(self) -> Dict[str, float]:
+        saved = self.original_tokens - self.tokens
+        return {
+            'queries': self.queries,
+            'tokens_per_query': self.tokens / self.queries if self.queries else 0.0,
+            'saved_tokens_per_query': saved / self.queries if self.queries else 0.0,
+            'saved_ratio': saved / self.original_tokens if self.original_tokens else 0.0,
+        }
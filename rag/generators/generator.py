@@ -1,11 +1,15 @@
-from typing import List
+from typing import Iterator, List, Optional
 
+import ollama
 import weave
 from langchain.prompts import PromptTemplate
+from langchain_core.documents import Document
 from langchain_ollama import ChatOllama
+from pydantic import Field, PrivateAttr
 
 from rag.common.registry import registry
 from rag.generators.base import BaseGenerator
+from rag.generators.context_packer import ContextPacker, PackedContext
 
 
 @registry.register_generator('ResponseGenerator')
@@ -24,18 +28,55 @@ class ResponseGenerator(weave.Model, BaseGenerator):
         input_variables=["context", "question"],
         template=_template,
     )
+    context_packer: Optional[dict] = Field(default=None, description='Packing of the retrieved chunks into the prompt: max_tokens, tokenizer, dedup_threshold, min_overlap and max_overlap, see ContextPacker. Chunks are joined verbatim if None')
+
+    _packer: Optional[ContextPacker] = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.llm = ChatOllama(model=self.model, temperature=0.0, verbose=False)
+        if self.context_packer is not None:
+            self._packer = ContextPacker(**self.context_packer)
 
-    def query(self, query: str, context: str | List[str]):
+    def _augment(self, query: str, context: str | List[str] | List[Document]):
+        packed: Optional[PackedContext] = None
         if isinstance(context, List):
-            context = "\n".join(context)
+            if self._packer is not None:
+                packed = self._packer.pack(context)
+                context = self._packer.separator.join(packed.texts)
+            elif context and isinstance(context[0], Document):
+                context = "\n\n".join(doc.page_content for doc in context)
+            else:
+                context = "\n".join(context)
+        return self.prompt.invoke({"context": context, "question": query}), packed
+
+    def warm_up(self):
+        # A request without a prompt makes Ollama load the model, without generating anything
+        client = ollama.Client(host=self.llm.base_url, **(self.llm.client_kwargs or {}))
+        client.generate(model=self.model, keep_alive=self.llm.keep_alive)
+
+    @staticmethod
+    def _report(response, packed: Optional[PackedContext]):
+        if packed is not None:
+            # Reported per query along with the prompt_eval_count of Ollama
+            response.response_metadata['context_tokens'] = packed.tokens
+            response.response_metadata['context_tokens_saved'] = packed.saved_tokens
+        return response
+
+    def query(self, query: str, context: str | List[str] | List[Document]):
+        prompt, packed = self._augment(query, context)
+        return self._report(self.llm.invoke(prompt), packed)
 
-        augmented_query = self.prompt.invoke({"context": context, "question": query})
+    async def aquery(self, query: str, context: str | List[str] | List[Document]):
+        # Ollama's async client, the event loop is free while the response is generated
+        prompt, packed = self._augment(query, context)
+        return self._report(await self.llm.ainvoke(prompt), packed)
 
-        return self.llm.invoke(augmented_query)
+    def stream(self, query: str, context: str | List[str] | List[Document]) -> Iterator[str]:
+        prompt, _ = self._augment(query, context)
+        for chunk in self.llm.stream(prompt):
+            if chunk.content:
+                yield chunk.content
     
     @weave.op()
     def predict(self, input: str, retrieval_context: str | List[str]):
@@ -1,11 +1,79 @@
 import glob
 import os
-from unstructured.partition.auto import partition
-from typing import List
-from rag.utils import el_to_doc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List
+from rag.common.hashing import hash_bytes, hash_file
+from rag.ingestors.partition_cache import PartitionCache
+from rag.ingestors.partitioners import NATIVE_PARTITIONERS
+from rag.utils import el_to_doc, element_dicts_to_docs
 from rag.common.registry import registry
 from langchain_core.documents import Document
 
+
+def _partition_file(
+    file_path: str = None,
+    file=None,
+    partition_kwargs: dict = None,
+    cache: PartitionCache = None,
+    native: bool = False,
+) -> List[Document]:
+    # Module level so that it can be pickled and sent to the worker processes
+    partition_kwargs = dict(partition_kwargs or {})
+    # Name the elements of file objects (e.g. uploads) after the file, like the ones of paths
+    if file is not None and getattr(file, "name", None):
+        partition_kwargs.setdefault("metadata_filename", file.name)
+
+    if native:
+        name = file_path if file_path is not None else getattr(file, "name", None) or ""
+        native_partition = NATIVE_PARTITIONERS.get(name.split(".")[-1])
+        if native_partition is not None:
+            return element_dicts_to_docs(
+                native_partition(
+                    filename=file_path,
+                    file=file,
+                    metadata_filename=partition_kwargs.get("metadata_filename"),
+                )
+            )
+
+    # Imported lazily as unstructured's auto partition is slow to import
+    from unstructured.partition.auto import partition
+    from unstructured.staging.base import convert_to_dict
+
+    if cache is None:
+        return el_to_doc(partition(filename=file_path, file=file, **partition_kwargs))
+
+    if file_path is not None:
+        content_hash = hash_file(file_path)
+    else:
+        content_hash = hash_bytes(file.read())
+        file.seek(0)
+    metadata_filename = partition_kwargs.get("metadata_filename")
+    # The name does not change the elements, it is set back below
+    key = cache.key(
+        content_hash, {k: v for k, v in partition_kwargs.items() if k != "metadata_filename"}
+    )
+
+    element_dicts = cache.get(key)
+    if element_dicts is None:
+        element_dicts = convert_to_dict(
+            partition(filename=file_path, file=file, **partition_kwargs)
+        )
+        cache.put(key, element_dicts)
+    else:
+        # The same content may have been cached from another location
+        for element_dict in element_dicts:
+            metadata = element_dict["metadata"]
+            metadata.pop("filename", None)
+            metadata.pop("file_directory", None)
+            name = metadata_filename or file_path
+            if name is not None:
+                file_directory, metadata["filename"] = os.path.split(name)
+                if file_directory:
+                    metadata["file_directory"] = file_directory
+    return element_dicts_to_docs(element_dicts)
+
+
 @registry.register_ingestor('SimpleIngestor')
 class SimpleIngestor:
     """
@@ -20,9 +88,40 @@ class SimpleIngestor:
     incompatible with the chunking methods provided by the Unstructured library.
     To address this, a helper function was created to facilitate conversion
     between formats.
+
+    Directories are partitioned in a pool of `num_workers` processes (defaults to
+    the number of CPUs), with at most `max_pending` files in flight at a time.
+
+    If `cache_dir` is set, partitioned elements are cached on disk by file content
+    and `partition_kwargs`, so re-ingesting a file (e.g. to try other chunkers)
+    skips partitioning entirely. See `PartitionCache`.
     """
 
-    def _get_file_paths(self, dir_path: str | List[str]): 
+    native_partitioning = False
+
+    def __init__(
+        self,
+        num_workers: int | None = None,
+        max_pending: int | None = None,
+        cache_dir: str | None = None,
+        cache_max_bytes: int | None = None,
+        partition_kwargs: dict | None = None,
+    ):
+        self.num_workers = num_workers if num_workers is not None else os.cpu_count() or 1
+        self.max_pending = max_pending if max_pending is not None else 2 * self.num_workers
+        self.cache = PartitionCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.partition_kwargs = partition_kwargs or {}
+
+    def get_params(self) -> dict:
+        """Identifies the ingestor and the parameters changing its documents (not the number of
+        workers or the cache), used to detect when an index built from its documents is outdated"""
+        return {
+            'name': type(self).__name__,
+            'native_partitioning': self.native_partitioning,
+            'partition_kwargs': self.partition_kwargs,
+        }
+
+    def _get_file_paths(self, dir_path: str | List[str]):
         dir_paths = [dir_path] if isinstance(dir_path, str) else dir_path
 
         for dir in dir_paths:
@@ -31,18 +130,47 @@ class SimpleIngestor:
 
         valid_extensions = ('md', 'txt', 'pdf')
         files = []
-        for ext in valid_extensions:
-            files.extend(glob.glob(f'{dir_path}/**/*.{ext}', recursive=True))
+        for dir in dir_paths:
+            for ext in valid_extensions:
+                files.extend(glob.glob(f'{dir}/**/*.{ext}', recursive=True))
         return files
-        
 
-    def load_dir(self, dir_path: str | List[str]) -> List[Document]: 
-        files = self._get_file_paths(dir_path)
+
+    def load_dir(self, dir_path: str | List[str]) -> List[Document]:
         docs = []
-        for file in files:
-            docs.extend(self.load_file(file))
+        for file_docs in self.iter_dir(dir_path):
+            docs.extend(file_docs)
         return docs
 
+    def iter_dir(self, dir_path: str | List[str]) -> Iterator[List[Document]]:
+        """Lazily partition the files in the directory, yielding the documents of one file at a time
+        in the order of the files. Only `max_pending` partitioned files are held in memory at once."""
+        return self.iter_files(self._get_file_paths(dir_path))
+
+    def iter_files(self, files: List[str]) -> Iterator[List[Document]]:
+        if self.num_workers <= 1 or len(files) <= 1:
+            for file in files:
+                yield self.load_file(file)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(self.num_workers, len(files))) as pool:
+            pending = deque()
+            for file in files:
+                pending.append(
+                    pool.submit(
+                        _partition_file,
+                        file,
+                        None,
+                        self.partition_kwargs,
+                        self.cache,
+                        self.native_partitioning,
+                    )
+                )
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
     def _validate_filetype(self, file_path: str | List[str]):
         if isinstance(file_path, str):
             ext = file_path.split(".")[-1]
@@ -58,16 +186,38 @@ class SimpleIngestor:
     def load_file(self, file_path: str | List[str] = None, file=None) -> List[Document]:
         """Load and chunk all files provided by the paths. The path can be a single file path
         or a list of file paths."""
+        docs = []
         if file_path is not None:
             self._validate_filetype(file_path)
-            if isinstance(file_path, list):
-                elements = []
-                for path in file_path:
-                    elements.extend(partition(path))
-
-            if isinstance(file_path, str):
-                elements = partition(file_path)
+            file_paths = file_path if isinstance(file_path, list) else [file_path]
+            for path in file_paths:
+                docs.extend(
+                    _partition_file(
+                        path,
+                        partition_kwargs=self.partition_kwargs,
+                        cache=self.cache,
+                        native=self.native_partitioning,
+                    )
+                )
 
         if file is not None:
-            elements = partition(file=file)
-        return el_to_doc(elements)
+            docs.extend(
+                _partition_file(
+                    file=file,
+                    partition_kwargs=self.partition_kwargs,
+                    cache=self.cache,
+                    native=self.native_partitioning,
+                )
+            )
+        return docs
+
+
+@registry.register_ingestor('FastIngestor')
+class FastIngestor(SimpleIngestor):
+    """
+    SimpleIngestor which partitions Markdown and text files with the lightweight partitioners in
+    `rag.ingestors.partitioners` instead of unstructured's auto partition, skipping its file type
+    detection and heavy imports. Other file types (PDFs) still go through unstructured.
+    """
+
+    native_partitioning = True
@@ -0,0 +1,80 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List
+
+MANIFEST_VERSION = 1
+
+
+class IngestionManifest:
+    """
+    Persisted record of the ingested files, mapping each file path to the hash of its content,
+    the parameters of the chunker used and the ids of the chunks added to the vector store.
+    This allows re-ingesting a directory incrementally: unchanged files are skipped, changed
+    files are re-chunked and re-embedded, and the chunks of removed files are deleted.
+
+    The manifest is stored as JSON at `path` and is only written on `save`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.files = data['files']
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    @staticmethod
+    def _normalize(params: Dict[str, Any]) -> Dict[str, Any]:
+        # Round trip through json so that params compare equal to the ones of a reloaded manifest
+        return json.loads(json.dumps(params, default=str))
+
+    def get(self, file_path: str) -> Dict[str, Any] | None:
+        return self.files.get(self._key(file_path))
+
+    def is_current(self, file_path: str, file_hash: str, chunker_params: Dict[str, Any]) -> bool:
+        """Whether the file was ingested with the same content and chunker parameters"""
+        entry = self.get(file_path)
+        return (
+            entry is not None
+            and entry['hash'] == file_hash
+            and entry['chunker'] == self._normalize(chunker_params)
+        )
+
+    def set(
+        self,
+        file_path: str,
+        file_hash: str,
+        chunker_params: Dict[str, Any],
+        chunk_ids: List[str],
+    ):
+        self.files[self._key(file_path)] = {
+            'hash': file_hash,
+            'chunker': self._normalize(chunker_params),
+            'chunk_ids': list(chunk_ids),
+        }
+
+    def remove(self, file_path: str) -> List[str]:
+        """Remove the file from the manifest, returning the ids of its chunks"""
+        entry = self.files.pop(self._key(file_path), None)
+        return entry['chunk_ids'] if entry is not None else []
+
+    def files_under(self, dir_paths: Iterable[str]) -> List[str]:
+        """Recorded files located inside any of the directories"""
+        prefixes = [os.path.join(os.path.abspath(d), '') for d in dir_paths]
+        return [
+            path for path in self.files if any(path.startswith(p) for p in prefixes)
+        ]
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, so that an interrupted save does not corrupt the manifest
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
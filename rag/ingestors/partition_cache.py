@@ -0,0 +1,136 @@
+import argparse
+import gzip
+import json
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from rag.common.hashing import hash_params, hash_text
+
+
+class PartitionCache:
+    """
+    Content addressed on-disk cache of partitioned elements. Partitioning only depends on the
+    bytes of the file and the partition parameters, so the elements (as the dicts produced by
+    unstructured's `convert_to_dict`) are stored as gzipped JSON under a key derived from both.
+
+    Entries are touched when read, and once the cache grows beyond `max_bytes` the least
+    recently used entries are evicted. Writes are atomic, so the cache can be shared by the
+    worker processes partitioning a directory.
+
+    Args:
+        cache_dir: Directory storing the cache entries
+        max_bytes: Maximum size of the cache on disk, unbounded if None
+    """
+
+    SUFFIX = '.json.gz'
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(content_hash: str, partition_kwargs: Dict[str, Any] | None = None) -> str:
+        return hash_text(content_hash + hash_params(partition_kwargs or {}))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                element_dicts = json.load(f)
+        except (FileNotFoundError, EOFError, OSError, json.JSONDecodeError):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for the eviction
+        except FileNotFoundError:
+            pass
+        return element_dicts
+
+    def put(self, key: str, element_dicts: List[Dict[str, Any]]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(element_dicts, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+
+    def _entries(self) -> List[tuple]:
+        """(last used time, size, path) of all the entries"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                if not file.endswith(self.SUFFIX):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:  # Evicted concurrently
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def prune(self, max_bytes: int) -> int:
+        """Evict the least recently used entries until the cache fits in max_bytes.
+        Returns the number of evicted entries."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return evicted
+
+    def clear(self) -> int:
+        return self.prune(0)
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the on-disk cache of partitioned files.")
+    parser.add_argument("command", choices=["warm", "prune", "clear", "stats"])
+    parser.add_argument("--cache-dir", type=str, required=True, help="Directory of the cache")
+    parser.add_argument(
+        "--dir", type=str, nargs="+", help="Directories to partition into the cache (warm)"
+    )
+    parser.add_argument("--max-mb", type=float, help="Maximum size of the cache in MB")
+    parser.add_argument("--num-workers", type=int, help="Processes used to partition (warm)")
+    args = parser.parse_args()
+
+    max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else None
+    cache = PartitionCache(args.cache_dir, max_bytes=max_bytes)
+
+    if args.command == "warm":
+        if not args.dir:
+            parser.error("warm requires --dir")
+        from rag.ingestors.ingestor import SimpleIngestor
+
+        ingestor = SimpleIngestor(
+            num_workers=args.num_workers, cache_dir=args.cache_dir, cache_max_bytes=max_bytes
+        )
+        n_files = sum(1 for _ in ingestor.iter_dir(args.dir))
+        print(f"Warmed cache with {n_files} files")
+    elif args.command == "prune":
+        if max_bytes is None:
+            parser.error("prune requires --max-mb")
+        print(f"Evicted {cache.prune(max_bytes)} entries")
+    elif args.command == "clear":
+        print(f"Evicted {cache.clear()} entries")
+
+    stats = cache.stats()
+    print(f"Cache: {stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.2f} MB")
@@ -0,0 +1,207 @@
+"""
+Lightweight partitioners for Markdown and plain text files.
+
+Unstructured's auto partition detects the file type and, for Markdown, renders the file to HTML
+before parsing it back, which is slow and pulls in heavy imports. These partitioners parse the
+text directly and emit the element dicts produced by unstructured's `convert_to_dict` (Title,
+NarrativeText, ListItem, ... with `parent_id` and `category_depth` metadata), so the output can
+be used by the unstructured chunkers as is.
+"""
+import hashlib
+import os
+import re
+import textwrap
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+_ATX_HEADING = re.compile(r'^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$')
+_SETEXT_UNDERLINE = re.compile(r'^\s{0,3}(=+|-+)\s*$')
+_HORIZONTAL_RULE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_LIST_ITEM = re.compile(r'^\s*(?:[-*+•]|\d+[.)])\s+(.*)$')
+_BLOCKQUOTE = re.compile(r'^\s*>\s?')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+
+_IMAGE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_STRONG = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1')
+_EMPHASIS = re.compile(r'(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])')
+_INLINE_CODE = re.compile(r'`([^`]*)`')
+_HTML_TAG = re.compile(r'<[^>]+>')
+_WHITESPACE = re.compile(r'\s+')
+
+_TXT_BULLET = re.compile(r'^\s*(?:[-*•·▪◦‣]|\d+[.)])\s+')
+_SENTENCE_END = re.compile(r'[.!?,;:)]["\']?$')
+
+Block = Tuple[str, str, Optional[int]]  # (element type, text, category depth)
+
+
+def _clean_inline(text: str) -> str:
+    text = _IMAGE.sub('', text)
+    text = _LINK.sub(r'\1', text)
+    text = _INLINE_CODE.sub(r'\1', text)
+    text = _STRONG.sub(r'\2', text)
+    text = _EMPHASIS.sub(r'\2', text)
+    text = _HTML_TAG.sub('', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _markdown_blocks(text: str) -> Iterator[Block]:
+    lines = text.splitlines()
+    paragraph: List[str] = []
+    paragraph_type = 'NarrativeText'
+
+    def flush():
+        nonlocal paragraph, paragraph_type
+        block = (paragraph_type, _clean_inline(' '.join(paragraph)), None)
+        paragraph, paragraph_type = [], 'NarrativeText'
+        return block
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        fence = _FENCE.match(line)
+        heading = _ATX_HEADING.match(line)
+        list_item = _LIST_ITEM.match(line)
+
+        if fence:
+            if paragraph:
+                yield flush()
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code.append(lines[i])
+                i += 1
+            yield 'CodeSnippet', textwrap.dedent('\n'.join(code)).strip(), None
+        elif not line.strip():
+            if paragraph:
+                yield flush()
+        elif heading:
+            if paragraph:
+                yield flush()
+            yield 'Title', _clean_inline(heading.group(2)), len(heading.group(1)) - 1
+        elif (
+            paragraph
+            and paragraph_type == 'NarrativeText'
+            and _SETEXT_UNDERLINE.match(line)
+        ):
+            depth = 0 if line.strip().startswith('=') else 1
+            title = flush()[1]
+            yield 'Title', title, depth
+        elif _HORIZONTAL_RULE.match(line):
+            if paragraph:
+                yield flush()
+        elif line.lstrip().startswith('|'):
+            if paragraph:
+                yield flush()
+            rows = []
+            while i < len(lines) and lines[i].lstrip().startswith('|'):
+                if not _TABLE_SEPARATOR.match(lines[i]):
+                    cells = [_clean_inline(cell) for cell in lines[i].strip().strip('|').split('|')]
+                    rows.append(' '.join(cell for cell in cells if cell))
+                i += 1
+            yield 'Table', ' '.join(rows), None
+            continue
+        elif list_item:
+            if paragraph:
+                yield flush()
+            paragraph, paragraph_type = [list_item.group(1)], 'ListItem'
+        else:
+            paragraph.append(_BLOCKQUOTE.sub('', line).strip())
+        i += 1
+
+    if paragraph:
+        yield flush()
+
+
+def _is_possible_title(text: str) -> bool:
+    # Simplified version of unstructured's title heuristics for plain text
+    words = text.split()
+    return (
+        0 < len(words) <= 12
+        and any(c.isalpha() for c in text)
+        and not _SENTENCE_END.search(text)
+    )
+
+
+def _text_blocks(text: str) -> Iterator[Block]:
+    # Like unstructured's partition_text, every non empty line is a separate element
+    for line in text.splitlines():
+        line = _WHITESPACE.sub(' ', line).strip()
+        if not line:
+            continue
+        if _TXT_BULLET.match(line):
+            yield 'ListItem', _TXT_BULLET.sub('', line, count=1), None
+        elif _is_possible_title(line):
+            yield 'Title', line, 0
+        else:
+            yield 'NarrativeText', line, None
+
+
+def _to_element_dicts(
+    blocks: Iterator[Block], filename: Optional[str], filetype: str, last_modified: Optional[str]
+) -> List[Dict]:
+    base_metadata = {'filetype': filetype, 'languages': ['eng']}
+    if filename is not None:
+        file_directory, base_metadata['filename'] = os.path.split(filename)
+        if file_directory:
+            base_metadata['file_directory'] = file_directory
+    if last_modified is not None:
+        base_metadata['last_modified'] = last_modified
+
+    element_dicts = []
+    titles: List[Tuple[int, str]] = []  # Stack of (depth, element id) of the enclosing titles
+    for sequence_number, (element_type, text, depth) in enumerate(blocks):
+        if not text:
+            continue
+        # Deterministic ids, in the same spirit as unstructured's hash based element ids
+        element_id = hashlib.sha256(
+            f'{filename}{text}{sequence_number}'.encode('utf-8')
+        ).hexdigest()[:32]
+        metadata = dict(base_metadata)
+
+        if element_type == 'Title':
+            while titles and titles[-1][0] >= depth:
+                titles.pop()
+            metadata['category_depth'] = depth
+        if titles:
+            metadata['parent_id'] = titles[-1][1]
+        if element_type == 'Title':
+            titles.append((depth, element_id))
+
+        element_dicts.append(
+            {'type': element_type, 'element_id': element_id, 'text': text, 'metadata': metadata}
+        )
+    return element_dicts
+
+
+def _read(filename: Optional[str], file) -> Tuple[str, Optional[str]]:
+    if filename is not None:
+        with open(filename, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        return text, datetime.fromtimestamp(os.path.getmtime(filename)).isoformat()
+    content = file.read()
+    file.seek(0)
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    return content, None
+
+
+def partition_md(filename: str = None, file=None, metadata_filename: str = None) -> List[Dict]:
+    text, last_modified = _read(filename, file)
+    return _to_element_dicts(
+        _markdown_blocks(text), metadata_filename or filename, 'text/markdown', last_modified
+    )
+
+
+def partition_txt(filename: str = None, file=None, metadata_filename: str = None) -> List[Dict]:
+    text, last_modified = _read(filename, file)
+    return _to_element_dicts(
+        _text_blocks(text), metadata_filename or filename, 'text/plain', last_modified
+    )
+
+
+NATIVE_PARTITIONERS: Dict[str, Callable[..., List[Dict]]] = {
+    'md': partition_md,
+    'txt': partition_txt,
+}
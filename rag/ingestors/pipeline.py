@@ -0,0 +1,199 @@
+import os
+import queue
+import threading
+from typing import Callable, Dict, List
+
+from rag.common.hashing import hash_file
+from rag.ingestors.ingestor import SimpleIngestor
+from rag.ingestors.manifest import IngestionManifest
+from rag.retrievers.base import BaseRetriever
+
+_DONE = object()  # Sentinel marking the end of a stage's output
+
+
+class IngestionPipeline:
+    """
+    Ingests a directory as four stages running concurrently, connected by bounded queues:
+
+        partition (process pool) -> chunk -> embed -> index
+
+    CPU bound partitioning of the next files runs in worker processes while the chunks of the
+    previous files are embedded (I/O bound requests to Ollama) and written to the vector store.
+    The queues hold at most `queue_size` items each, so memory stays bounded on large corpora.
+
+    Args:
+        ingestor: Ingestor providing `iter_dir`, which yields the documents of one file at a time
+        retriever: Retriever providing the `chunk_docs`, `embed_docs` and `index_docs` stages
+        queue_size: Maximum number of items waiting between two stages
+        embed_batch_size: Maximum number of chunks sent in one embedding request
+
+    With an `IngestionManifest`, only the files added or changed since the last run are ingested
+    and the chunks of deleted files are removed from the vector store. Without one, a retriever
+    with a persistent index skips the ingestion entirely when the corpus has not changed.
+    """
+
+    def __init__(
+        self,
+        ingestor: SimpleIngestor,
+        retriever: BaseRetriever,
+        queue_size: int = 4,
+        embed_batch_size: int = 64,
+    ):
+        self.ingestor = ingestor
+        self.retriever = retriever
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+
+    def run(
+        self, dir_path: str | List[str], manifest: IngestionManifest | None = None
+    ) -> List[str]:
+        """Ingest all the files in the directory and return the ids of the indexed chunks.
+        If a manifest is given, the directory is synced incrementally instead (see `sync`)."""
+        files = self.ingestor._get_file_paths(dir_path)
+        if manifest is None:
+            return self.ingest_files(files)
+
+        dir_paths = [dir_path] if isinstance(dir_path, str) else dir_path
+        found = {os.path.abspath(f) for f in files}
+        removed = [f for f in manifest.files_under(dir_paths) if f not in found]
+        return self.sync(files, manifest, removed=removed)
+
+    def ingest_files(self, files: List[str]) -> List[str]:
+        """
+        Ingest the files and return the ids of the indexed chunks. If the retriever has a
+        persistent index built from the same files, ingestor, chunker and embedding model, the
+        existing index is used as is. Otherwise a persistent index is rebuilt from scratch.
+        """
+        if not self.retriever.is_persistent():
+            return [id for ids in self._run(files).values() for id in ids]
+
+        fingerprint = self.retriever.index_fingerprint(files, self.ingestor.get_params())
+        if self.retriever.is_index_current(fingerprint):
+            print(f"Index is up to date with the {len(files)} files, skipping ingestion")
+            return []
+        self.retriever.reset_index()
+        ids = [id for ids in self._run(files).values() for id in ids]
+        self.retriever.persist_index()
+        self.retriever.save_index_fingerprint(fingerprint, files=len(files), chunks=len(ids))
+        return ids
+
+    def sync(
+        self,
+        files: List[str],
+        manifest: IngestionManifest,
+        removed: List[str] = (),
+    ) -> List[str]:
+        """
+        Incrementally ingest the files: files whose content and chunker parameters match the
+        manifest (and whose chunks are still in the vector store) are skipped, changed files are
+        re-ingested replacing their old chunks, and the chunks of the removed files are deleted.
+        The manifest is saved afterwards. Returns the ids of the newly indexed chunks.
+        """
+        chunker_params = self.retriever.chunker.get_params()
+        hashes = {file: hash_file(file) for file in files}
+
+        changed = []
+        for file in files:
+            entry = manifest.get(file)
+            if manifest.is_current(file, hashes[file], chunker_params):
+                chunk_ids = entry['chunk_ids']
+                if len(self.retriever.get_existing_ids(chunk_ids)) == len(chunk_ids):
+                    continue
+            changed.append(file)
+
+        stale_ids = []
+        for file in list(removed) + changed:
+            stale_ids.extend(manifest.remove(file))
+        self.retriever.delete_docs(stale_ids)
+
+        ids_by_file = self._run(changed)
+        self.retriever.persist_index()
+        for file in changed:
+            manifest.set(file, hashes[file], chunker_params, ids_by_file.get(file, []))
+        manifest.save()
+
+        print(
+            f"Ingestion sync: {len(files) - len(changed)} unchanged, {len(changed)} (re)ingested, "
+            f"{len(removed)} removed"
+        )
+        return [id for ids in ids_by_file.values() for id in ids]
+
+    def _run(self, files: List[str]) -> Dict[str, List[str]]:
+        """Run the stages over the files, returning the ids of the indexed chunks of each file"""
+        self._stop = threading.Event()
+        self._errors = []
+        ids_by_file = {file: [] for file in files}
+
+        partitioned = queue.Queue(maxsize=self.queue_size)
+        chunked = queue.Queue(maxsize=self.queue_size)
+        embedded = queue.Queue(maxsize=self.queue_size)
+
+        def chunk(item):
+            file, docs = item
+            chunks = self.retriever.chunk_docs(docs)
+            for i in range(0, len(chunks), self.embed_batch_size):
+                yield file, chunks[i : i + self.embed_batch_size]
+
+        def embed(item):
+            file, chunks = item
+            yield file, chunks, self.retriever.embed_docs(chunks)
+
+        def index(item):
+            file, chunks, embeddings = item
+            ids_by_file[file].extend(self.retriever.index_docs(chunks, embeddings))
+            return ()
+
+        stages = [
+            threading.Thread(target=self._stage, args=(chunk, partitioned, chunked)),
+            threading.Thread(target=self._stage, args=(embed, chunked, embedded)),
+            threading.Thread(target=self._stage, args=(index, embedded, None)),
+        ]
+        for stage in stages:
+            stage.start()
+
+        try:
+            for file, docs in zip(files, self.ingestor.iter_files(files)):
+                if not self._put(partitioned, (file, docs)):
+                    break
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(partitioned, _DONE)
+            for stage in stages:
+                stage.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return ids_by_file
+
+    def _stage(self, fn: Callable, in_queue: queue.Queue, out_queue: queue.Queue | None):
+        while not self._stop.is_set():
+            try:
+                item = in_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                break
+            try:
+                for output in fn(item):
+                    if out_queue is not None and not self._put(out_queue, output):
+                        return
+            except BaseException as e:
+                self._fail(e)
+                return
+        if out_queue is not None:
+            self._put(out_queue, _DONE)
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put which gives up once the pipeline is stopped because of an error"""
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+
+    def _fail(self, error: BaseException):
+        self._errors.append(error)
+        self._stop.set()
@@ -1,34 +1,106 @@
+import asyncio
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rag.common.registry import registry
+from rag.ingestors.manifest import IngestionManifest
+from rag.ingestors.pipeline import IngestionPipeline
+
 """
 Integrate all the components under the RAG class
 """
 class RAG:
-    def __init__(self, retriever, generator, ingestor):
+    def __init__(self, retriever, generator, ingestor, manifest_path: str = None):
         self.retriever = retriever
         self.generator = generator
         self.ingestor = ingestor
+        # With a manifest, files and directories are re-ingested incrementally
+        self.manifest = IngestionManifest(manifest_path) if manifest_path else None
     
-    def _format_docs(self, docs):
-        return "\n\n".join(doc.page_content for doc in docs)
+    @classmethod
+    def from_config(cls, config: dict):
+        """RAG built from the generator, retriever and ingestor sections of a config like
+        rag/configs/evaluate.yaml, and its optional manifest path. Only the modules of the
+        components named in the config are imported."""
+        retriever_config = config['retriever']
+        retriever_params = dict(retriever_config.get('params') or {})
+        chunker_config = retriever_params.pop('chunker', None)
+        if chunker_config is not None:
+            Chunker = registry.get_chunker(chunker_config['name'])
+            retriever_params['chunker'] = Chunker(**(chunker_config.get('params') or {}))
+        retriever = registry.get_retriever(retriever_config['name'])(**retriever_params)
+
+        generator_config = config['generator']
+        generator = registry.get_generator(generator_config['name'])(**(generator_config.get('params') or {}))
+        ingestor_config = config['ingestor']
+        ingestor = registry.get_ingestor(ingestor_config['name'])(**(ingestor_config.get('params') or {}))
+        return cls(retriever, generator, ingestor, manifest_path=config.get('manifest'))
+
+    def warm_up(self):
+        """Load the models of the retriever and generator, so that the first query does not wait
+        for them"""
+        start = time.perf_counter()
+        self.retriever.warm_up()
+        self.generator.warm_up()
+        print(f"Warmed up the models in {time.perf_counter() - start:.2f} s")
+
+    def query(self, query, filters: dict = None, return_documents: bool = False):
+        """Answer the query from the retrieved chunks. `filters` restrict the retrieval to the
+        chunks with matching metadata, e.g. `{'filename': 'notes.md'}`. The contexts are returned
+        as texts, or as documents with their metadata if `return_documents` is set."""
+        contexts = self.retriever.query(query, filters=filters) if filters else self.retriever.query(query)
+        response = self.generator.query(query, context=contexts)
+        if not return_documents:
+            contexts = [doc.page_content for doc in contexts]
+        return response, contexts
 
-    def query(self, query):
-        contexts = self.retriever.query(query)
-        response = self.generator.query(query, context=self._format_docs(contexts))
-        contexts = [doc.page_content for doc in contexts]
+    async def aquery(self, query, filters: dict = None, return_documents: bool = False):
+        """`query` for asyncio: concurrent queries of one process overlap, each waiting on Ollama
+        without blocking the others"""
+        if filters:
+            contexts = await self.retriever.aquery(query, filters=filters)
+        else:
+            contexts = await self.retriever.aquery(query)
+        response = await self.generator.aquery(query, context=contexts)
+        if not return_documents:
+            contexts = [doc.page_content for doc in contexts]
         return response, contexts
 
-    def ingest(self, filepath: str = None, file = None, dir: str = None, text: str = None):
-        """Can provide multiple arguments or single"""
+    def stream_query(self, query, filters: dict = None, return_documents: bool = False):
+        """`query` streaming the response: the contexts are retrieved up front, so that the sources
+        can be shown while the response is generated. Returns an iterator of the response tokens
+        and the contexts."""
+        contexts = self.retriever.query(query, filters=filters) if filters else self.retriever.query(query)
+        tokens = self.generator.stream(query, context=contexts)
+        if not return_documents:
+            contexts = [doc.page_content for doc in contexts]
+        return tokens, contexts
+
+    def ingest(self, filepath: str = None, file = None, dir: str = None, text: str = None, metadata: dict = None):
+        """Can provide multiple arguments or single. Directories are ingested through the
+        pipelined ingestion, overlapping partitioning with embedding and indexing. `metadata` is
+        added to the documents loaded directly (`file`, `text`, and `filepath` without a manifest),
+        e.g. to ingest them in a namespace"""
         docs = []
-        if filepath:
-            docs += self.ingestor.load_file(filepath=filepath)
+        if filepath and self.manifest is not None:
+            IngestionPipeline(self.ingestor, self.retriever).sync([filepath], self.manifest)
+        elif filepath:
+            docs += self.ingestor.load_file(file_path=filepath)
         if file:
             docs += self.ingestor.load_file(file=file)
-        if dir:
-            docs += self.ingestor.load_dir(dir=dir)
         if text:
             docs += self.ingestor.load_text(text=text)
-        self.retriever.add_docs(docs)
-        
\ No newline at end of file
+        if docs:
+            for doc in docs:
+                doc.metadata.update(metadata or {})
+            self.retriever.add_docs(docs)
+            self.retriever.persist_index()
+        if dir:
+            IngestionPipeline(self.ingestor, self.retriever).run(dir, manifest=self.manifest)
+
+    async def aingest(self, filepath: str = None, file = None, dir: str = None, text: str = None, metadata: dict = None):
+        """`ingest` in a worker thread, so that queries keep being served meanwhile, from the chunks
+        indexed so far"""
+        await asyncio.to_thread(self.ingest, filepath=filepath, file=file, dir=dir, text=text, metadata=metadata)
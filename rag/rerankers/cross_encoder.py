@@ -0,0 +1,150 @@
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class TorchCrossEncoder:
+    """
+    sentence-transformers cross-encoder run with torch on the CPU.
+
+    Args:
+        model_name: Name or path of the cross-encoder model
+        num_threads: Number of threads used by torch for inference. If None, torch's default.
+            Note that this is a process wide torch setting
+        quantize: Apply int8 dynamic quantization to the linear layers, which is faster on CPU for a
+            small loss in accuracy
+        max_length: Maximum number of tokens of a (query, document) pair, longer pairs are truncated
+        device: Device running the model
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        num_threads: Optional[int] = None,
+        quantize: bool = False,
+        max_length: Optional[int] = None,
+        device: str = 'cpu',
+    ):
+        # Imported lazily, torch is slow to import and only needed by this backend
+        import torch
+        from sentence_transformers import CrossEncoder
+
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+        self.model = CrossEncoder(model_name, max_length=max_length, device=device)
+        self.model.model.eval()
+        if quantize:
+            self.model.model = torch.quantization.quantize_dynamic(
+                self.model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self._torch = torch
+        # Inference is CPU bound and already multithreaded by torch
+        self._lock = threading.Lock()
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int) -> np.ndarray:
+        with self._lock, self._torch.inference_mode():
+            scores = self.model.predict(
+                list(pairs), batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True
+            )
+        # Models with two labels score the relevance with the second one
+        return scores[:, 1] if scores.ndim == 2 else scores
+
+
+class OnnxCrossEncoder:
+    """
+    Cross-encoder exported to ONNX, run with onnxruntime and the `tokenizers` tokenizer of the model,
+    without torch. Hugging Face cross-encoders usually ship their ONNX export (e.g.
+    cross-encoder/ms-marco-MiniLM-L6-v2 has onnx/model.onnx).
+
+    Scores are the sigmoid of the logit for single label models, like sentence-transformers.
+
+    Args:
+        model_name: Hugging Face model id, or local directory holding tokenizer.json and the model
+        num_threads: Number of threads of the onnxruntime session. If None, onnxruntime's default
+        quantize: Run the model with int8 dynamic quantization. The quantized model is written
+            next to the original one on first use
+        max_length: Maximum number of tokens of a (query, document) pair, longer pairs are truncated
+        onnx_file: Path of the ONNX model, relative to the model directory
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        num_threads: Optional[int] = None,
+        quantize: bool = False,
+        max_length: int = 512,
+        onnx_file: str = 'onnx/model.onnx',
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = self._resolve(model_name, onnx_file)
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        self.tokenizer = Tokenizer.from_file(self._resolve(model_name, 'tokenizer.json'))
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length)
+        self.pad_id = next(
+            (id for id in map(self.tokenizer.token_to_id, ('[PAD]', '<pad>')) if id is not None), 0
+        )
+
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = {input.name for input in self.session.get_inputs()}
+
+    @staticmethod
+    def _resolve(model_name: str, filename: str) -> str:
+        if os.path.isdir(model_name):
+            return os.path.join(model_name, filename)
+        from huggingface_hub import hf_hub_download
+
+        return hf_hub_download(repo_id=model_name, filename=filename)
+
+    @staticmethod
+    def _quantized(model_path: str) -> str:
+        quantized_path = f'{os.path.splitext(model_path)[0]}.int8.onnx'
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp_path = f'{quantized_path}.tmp'
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def _run(self, encodings: List) -> np.ndarray:
+        length = max(len(encoding.ids) for encoding in encodings)
+        shape = (len(encodings), length)
+        inputs = {
+            'input_ids': np.full(shape, self.pad_id, dtype=np.int64),
+            'attention_mask': np.zeros(shape, dtype=np.int64),
+            'token_type_ids': np.zeros(shape, dtype=np.int64),
+        }
+        for i, encoding in enumerate(encodings):
+            n = len(encoding.ids)
+            inputs['input_ids'][i, :n] = encoding.ids
+            inputs['attention_mask'][i, :n] = 1
+            inputs['token_type_ids'][i, :n] = encoding.type_ids
+        logits = self.session.run(None, {k: v for k, v in inputs.items() if k in self.input_names})[0]
+        if logits.ndim == 2 and logits.shape[1] > 1:
+            return logits[:, 1]
+        return 1 / (1 + np.exp(-logits.reshape(-1)))
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int) -> np.ndarray:
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(list(pairs))
+        # Pairs of similar lengths are batched together, which minimizes the padding
+        order = np.argsort([len(encoding.ids) for encoding in encodings], kind='stable')
+        scores = np.empty(len(pairs), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            batch = order[start : start + batch_size]
+            scores[batch] = self._run([encodings[i] for i in batch])
+        return scores
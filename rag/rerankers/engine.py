@@ -0,0 +1,200 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from rag.common.hashing import hash_params, hash_text
+from rag.common.lru import LRUCache
+
+_BACKENDS = ('torch', 'onnx')
+
+
+def _query_key(query: str) -> str:
+    # Queries differing only by whitespace share their scores
+    return hash_text(' '.join(query.split()))
+
+
+def _chunk_key(doc: Document) -> str:
+    return doc.id if doc.id else hash_text(doc.page_content)
+
+
+class RerankEngine:
+    """
+    Scores (query, chunk) pairs with a cross-encoder and reorders the candidates of the queries.
+    Scores are cached in an LRU keyed by (query hash, chunk id), so the pairs of repeated queries
+    (across eval runs, or chat turns) are not scored again. Only the missing pairs of all the
+    queries are sent to the cross-encoder, in batches of `batch_size`.
+
+    Chunks are identified by their id (by their text if they have none), which assumes that a
+    chunk id is not reused for a different text.
+
+    Args:
+        cross_encoder: Model with a `predict(pairs, batch_size)` method returning a score per pair,
+            higher is more relevant, e.g. `TorchCrossEncoder` or `OnnxCrossEncoder`
+        batch_size: Number of pairs scored in one forward pass
+        cache_size: Maximum number of cached scores, 0 disables the cache
+    """
+
+    def __init__(self, cross_encoder: Any, batch_size: int = 32, cache_size: int = 10_000):
+        self.cross_encoder = cross_encoder
+        self.batch_size = batch_size
+        self._cache = LRUCache(cache_size) if cache_size else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.busy_seconds = 0.0
+
+    def score_batch(
+        self, queries: Sequence[str], candidates: Sequence[Sequence[Document]]
+    ) -> List[List[float]]:
+        """Scores of the candidates of each query"""
+        keys = [
+            [(_query_key(query), _chunk_key(doc)) for doc in docs]
+            for query, docs in zip(queries, candidates)
+        ]
+        scores: Dict[Tuple[str, str], float] = {}
+        missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for query, docs, doc_keys in zip(queries, candidates, keys):
+            for doc, key in zip(docs, doc_keys):
+                score = self._cache.get(key) if self._cache is not None else None
+                if score is not None:
+                    scores[key] = score
+                elif key not in missing:
+                    missing[key] = (query, doc.page_content)
+
+        if missing:
+            start = time.perf_counter()
+            predicted = self.cross_encoder.predict(list(missing.values()), self.batch_size)
+            elapsed = time.perf_counter() - start
+            for key, score in zip(missing, predicted):
+                scores[key] = float(score)
+                if self._cache is not None:
+                    self._cache.put(key, float(score))
+        else:
+            elapsed = 0.0
+
+        with self._lock:
+            total = sum(len(doc_keys) for doc_keys in keys)
+            self.misses += len(missing)
+            self.hits += total - len(missing)
+            self.busy_seconds += elapsed
+        return [[scores[key] for key in doc_keys] for doc_keys in keys]
+
+    def rerank_batch(
+        self, queries: Sequence[str], candidates: Sequence[Sequence[Document]], k: int
+    ) -> List[List[Document]]:
+        """The k best scored candidates of each query, best first"""
+        with self._lock:
+            self.queries += len(queries)
+        results = []
+        for docs, scores in zip(candidates, self.score_batch(queries, candidates)):
+            ranked = sorted(zip(docs, scores), key=lambda item: item[1], reverse=True)
+            results.append([doc for doc, _ in ranked[:k]])
+        return results
+
+    def rerank(self, query: str, docs: Sequence[Document], k: int) -> List[Document]:
+        return self.rerank_batch([query], [docs], k)[0]
+
+    def rerank_adaptive_batch(
+        self,
+        queries: Sequence[str],
+        candidates: Sequence[Sequence[Document]],
+        k: int,
+        step: int = 4,
+        margin: float = 0.1,
+    ) -> List[List[Document]]:
+        """
+        The k best scored candidates of each query, scoring the candidates in order (e.g. of
+        dense similarity) `step` at a time and stopping once the top k is stable: when none of
+        the last scored candidates comes within `margin` of the k-th best score. The candidates
+        after that point are assumed to rank lower, as they are less similar to the query.
+
+        The pending candidates of all the queries are scored together at each round.
+        """
+        scored: List[List[Tuple[int, float]]] = [[] for _ in queries]
+        positions = [0] * len(queries)
+        active = [i for i, docs in enumerate(candidates) if docs]
+        while active:
+            batches = []
+            for i in active:
+                size = max(k, step) if positions[i] == 0 else step
+                batches.append(range(positions[i], min(positions[i] + size, len(candidates[i]))))
+            scores = self.score_batch(
+                [queries[i] for i in active],
+                [[candidates[i][j] for j in batch] for i, batch in zip(active, batches)],
+            )
+            still_active = []
+            for i, batch, batch_scores in zip(active, batches, scores):
+                first_round = positions[i] == 0
+                scored[i].extend(zip(batch, batch_scores))
+                positions[i] = batch.stop
+                if positions[i] >= len(candidates[i]):
+                    continue
+                if not first_round and len(scored[i]) >= k:
+                    kth_score = sorted((score for _, score in scored[i]), reverse=True)[k - 1]
+                    if max(batch_scores) < kth_score - margin:
+                        continue
+                still_active.append(i)
+            active = still_active
+
+        with self._lock:
+            self.queries += len(queries)
+        results = []
+        for docs, doc_scores in zip(candidates, scored):
+            ranked = sorted(doc_scores, key=lambda item: item[1], reverse=True)
+            results.append([docs[j] for j, _ in ranked[:k]])
+        return results
+
+    def clear_cache(self):
+        if self._cache is not None:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'pairs_per_query': total / self.queries if self.queries else 0.0,
+            'pairs_per_sec': self.misses / self.busy_seconds if self.busy_seconds else 0.0,
+        }
+
+
+# Engines are shared process wide, so that the retrievers using the same cross-encoder load it once
+# and share its score cache
+_engines: Dict[Tuple[str, str], RerankEngine] = {}
+_lock = threading.Lock()
+
+
+def get_rerank_engine(
+    model: str,
+    backend: str = 'torch',
+    batch_size: int = 32,
+    cache_size: int = 10_000,
+    **params: Any,
+) -> RerankEngine:
+    """
+    Rerank engine of the cross-encoder model.
+
+    Args:
+        model: Name or path of the cross-encoder model
+        backend: "torch" (sentence-transformers) or "onnx" (onnxruntime, without torch)
+        batch_size: Number of pairs scored in one forward pass
+        cache_size: Maximum number of cached scores, 0 disables the cache
+        params: Arguments of the backend, e.g. num_threads, quantize and max_length, see
+            `TorchCrossEncoder` and `OnnxCrossEncoder`
+    """
+    if backend not in _BACKENDS:
+        raise ValueError(f"Unknown rerank backend '{backend}', expected one of {_BACKENDS}")
+    key = (model, hash_params({'backend': backend, 'batch_size': batch_size, 'cache_size': cache_size, **params}))
+    with _lock:
+        engine: Optional[RerankEngine] = _engines.get(key)
+        if engine is None:
+            from rag.rerankers.cross_encoder import OnnxCrossEncoder, TorchCrossEncoder
+
+            CrossEncoder = TorchCrossEncoder if backend == 'torch' else OnnxCrossEncoder
+            engine = RerankEngine(CrossEncoder(model, **params), batch_size=batch_size, cache_size=cache_size)
+            _engines[key] = engine
+        return engine
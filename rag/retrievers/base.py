@@ -1,9 +1,20 @@
+import asyncio
+import json
+import os
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Any, List, Optional
 
+from langchain_community.vectorstores.utils import filter_complex_metadata
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
 
 from rag.chunkers.base import BaseChunkingStrategy
+from rag.common.hashing import hash_file, hash_params
+from rag.common.registry import registry
+from rag.embeddings.queries import aembed_queries, embed_queries
+from rag.retrievers.query_cache import QueryCache
+from rag.vectorstores.filters import Filters
 
 
 # Interface for the Retriver Class
@@ -18,4 +29,242 @@ class BaseRetriever(ABC):
     def add_docs(self, docs: List[Document], chunker: BaseChunkingStrategy | None): ...
 
     @abstractmethod
-    def query(self, prompt: str) -> list[Document]: ...
+    def retrieve_batch(
+        self,
+        prompts: List[str],
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]: ...
+    """
+    Retrieve the chunks relevant to each prompt, embedding the prompts in one batched call (unless
+    their `embeddings` are given) and searching them together. Called by `query` and `query_batch`
+    on the queries missing from the query cache.
+    """
+
+    def query(self, prompt: str, filters: Optional[Filters] = None) -> list[Document]:
+        """
+        Retrieve the chunks relevant to the prompt. `filters` restrict the search to the chunks with
+        matching metadata, e.g. `{'filename': 'notes.md', 'page_number': (1, 3)}`, see
+        `rag.vectorstores.filters`.
+        """
+        return self.query_batch([prompt], filters=filters)[0]
+
+    def query_batch(self, prompts: List[str], filters: Optional[Filters] = None) -> List[List[Document]]:
+        """`query` of several prompts, answered from the query cache when possible"""
+        cache = getattr(self, '_query_cache', None)
+        if cache is None:
+            return self.retrieve_batch(prompts, filters)
+
+        generation = cache.generation
+        results = [cache.get(prompt, filters) for prompt in prompts]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        vectors = [None] * len(prompts)
+        if missing and cache.similarity_threshold is not None:
+            for i, vector in zip(missing, embed_queries(self.vector_db.embeddings, [prompts[i] for i in missing])):
+                vectors[i] = vector
+        return self._retrieve_missing(prompts, filters, results, missing, vectors, generation)
+
+    async def aquery(self, prompt: str, filters: Optional[Filters] = None) -> List[Document]:
+        """`query` for asyncio, see `aquery_batch`"""
+        return (await self.aquery_batch([prompt], filters=filters))[0]
+
+    async def aquery_batch(self, prompts: List[str], filters: Optional[Filters] = None) -> List[List[Document]]:
+        """
+        `query_batch` for asyncio: the prompts are embedded with the async API of the embedding
+        function and the search (CPU bound, e.g. reranking) runs in a worker thread, so the event
+        loop keeps serving other queries meanwhile. The vector stores can be written while they are
+        searched, so the index can be updated concurrently (see `RAG.aingest`): a search sees the
+        chunks indexed when it starts.
+        """
+        cache = getattr(self, '_query_cache', None)
+        generation = cache.generation if cache is not None else None
+        results = [cache.get(prompt, filters) if cache is not None else None for prompt in prompts]
+        missing = [i for i, docs in enumerate(results) if docs is None]
+        vectors = [None] * len(prompts)
+        # The retrieval needs the embeddings anyway, so they are always computed here
+        for i, vector in zip(missing, await aembed_queries(self.vector_db.embeddings, [prompts[i] for i in missing])):
+            vectors[i] = vector
+        return await asyncio.to_thread(self._retrieve_missing, prompts, filters, results, missing, vectors, generation)
+
+    def _retrieve_missing(
+        self,
+        prompts: List[str],
+        filters: Optional[Filters],
+        results: List[Optional[List[Document]]],
+        missing: List[int],
+        vectors: List[Optional[List[float]]],
+        generation: Optional[int],
+    ) -> List[List[Document]]:
+        """Complete the results missing from the exact tier of the query cache, from its semantic
+        tier or by retrieving them, reusing the embeddings of the prompts when computed"""
+        cache = getattr(self, '_query_cache', None)
+        to_retrieve = []
+        for i in missing:
+            results[i] = cache.get_similar(vectors[i], filters) if cache is not None else None
+            if results[i] is None:
+                to_retrieve.append(i)
+        if to_retrieve:
+            embeddings = [vectors[i] for i in to_retrieve]
+            if any(vector is None for vector in embeddings):
+                embeddings = None
+            for i, docs in zip(to_retrieve, self.retrieve_batch([prompts[i] for i in to_retrieve], filters, embeddings)):
+                results[i] = docs
+                if cache is not None:
+                    cache.put(prompts[i], filters, docs, vector=vectors[i], generation=generation)
+        return results
+
+    def warm_up(self):
+        """Load the models used by the queries (e.g. by the Ollama server) ahead of the first query"""
+        embed_queries(self.vector_db.embeddings, ['warm up'])
+
+    def create_query_cache(self) -> Optional[QueryCache]:
+        """Query cache configured by `self.query_cache`, None if disabled"""
+        params = getattr(self, 'query_cache', None)
+        return QueryCache(**params) if params is not None else None
+
+    def clear_query_cache(self):
+        """Called after any change to the vector store, which invalidates the cached results. Queries
+        retrieved before the change and completing after it are not cached either."""
+        cache = getattr(self, '_query_cache', None)
+        if cache is not None:
+            cache.clear()
+
+    def search_filter(self, filters: Optional[Filters]):
+        """Filters in the format of the vector store, None if there are none"""
+        return self.vector_db.translate_filter(filters) if filters else None
+
+    def search_batch(
+        self,
+        prompts: List[str],
+        k: int,
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[tuple[Document, float]]]:
+        """Chunks and relevance scores (higher is more relevant) of the k most similar chunks of each
+        prompt. The prompts are embedded in one call (unless their embeddings are given) and searched
+        in one vector store query."""
+        if embeddings is None:
+            embeddings = embed_queries(self.vector_db.embeddings, prompts)
+        results = self.vector_db.similarity_search_batch_with_score_by_vectors(
+            embeddings, k=k, filter=self.search_filter(filters)
+        )
+        relevance = self.vector_db._select_relevance_score_fn()
+        return [[(doc, relevance(score)) for doc, score in docs] for docs in results]
+
+    def create_vector_store(self, embedding: Embeddings) -> VectorStore:
+        """Vector store registered as `self.vector_store`, persisted if `persist_directory` is set"""
+        VectorStoreCls = registry.get_vectorstore(getattr(self, 'vector_store', 'chroma'))
+        return VectorStoreCls(
+            embedding_function=embedding,
+            persist_directory=getattr(self, 'persist_directory', None),
+            collection_name=getattr(self, 'collection_name', 'langchain'),
+            **(getattr(self, 'vector_store_params', None) or {}),
+        )
+
+    """
+    Ingestion stages. `add_docs` is equivalent to `index_docs(chunk_docs(docs))`, the stages are
+    exposed separately so that they can be overlapped by the ingestion pipeline.
+    These assume the retriever stores its chunks in `self.vector_db`.
+    """
+
+    def chunk_docs(
+        self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None
+    ) -> List[Document]:
+        if chunker is None:
+            chunker = self.chunker
+        # Workaround for ChromaDb not supporting list as metadata value - convert to string
+        return filter_complex_metadata(chunker.chunk(docs))
+
+    def embed_docs(self, chunks: List[Document]) -> List[List[float]]:
+        return self.vector_db.embeddings.embed_documents(
+            [chunk.page_content for chunk in chunks]
+        )
+
+    def index_docs(
+        self, chunks: List[Document], embeddings: Optional[List[List[float]]] = None
+    ) -> List[str]:
+        """Add the chunks to the vector store, reusing the embeddings if already computed"""
+        self.invalidate_index_fingerprint()
+        try:
+            if embeddings is None:
+                return self.vector_db.add_documents(chunks)
+            return self.vector_db.add_embeddings(chunks, embeddings)
+        finally:
+            self.clear_query_cache()
+
+    def delete_docs(self, ids: List[str]):
+        """Remove the chunks with the given ids from the vector store"""
+        if ids:
+            self.invalidate_index_fingerprint()
+            try:
+                self.vector_db.delete(ids=ids)
+            finally:
+                self.clear_query_cache()
+
+    def has_source(self, filename: str, filters: Optional[Filters] = None) -> bool:
+        """Whether chunks of the file (by name, without its directory) are in the vector store,
+        among the chunks matching the filters if given (e.g. of a namespace)"""
+        where = self.search_filter({**(filters or {}), 'filename': filename})
+        return bool(self.vector_db.get(where=where, limit=1)['ids'])
+
+    def get_existing_ids(self, ids: List[str]) -> List[str]:
+        """Subset of the ids present in the vector store"""
+        if not ids:
+            return []
+        return [doc.id for doc in self.vector_db.get_by_ids(ids)]
+
+    """
+    Persistent index. Retrievers with a `persist_directory` keep their vector store on disk, along
+    with a fingerprint of the corpus, ingestor and chunker parameters and embedding model it was
+    built from, so that the ingestion of an unchanged corpus can be skipped. Any other change to
+    the vector store invalidates the fingerprint.
+    """
+
+    def is_persistent(self) -> bool:
+        return getattr(self, 'persist_directory', None) is not None
+
+    def _fingerprint_path(self) -> str:
+        return os.path.join(self.persist_directory, f'{self.collection_name}.fingerprint.json')
+
+    def index_fingerprint(self, files: List[str], ingestor_params: Optional[dict] = None) -> str:
+        """Fingerprint of the index built from the files, loaded by the ingestor with the given
+        params (see `SimpleIngestor.get_params`), with the current chunker and embeddings"""
+        return hash_params({
+            'files': {os.path.abspath(file): hash_file(file) for file in files},
+            'ingestor': ingestor_params,
+            'chunker': self.chunker.get_params() if self.chunker is not None else None,
+            'model': self.model,
+            'embedding_params': getattr(self, 'embedding_params', None),
+        })
+
+    def is_index_current(self, fingerprint: str) -> bool:
+        """Whether the persisted index was built with the same fingerprint"""
+        if not self.is_persistent() or not os.path.exists(self._fingerprint_path()):
+            return False
+        with open(self._fingerprint_path(), 'r') as f:
+            return json.load(f).get('fingerprint') == fingerprint
+
+    def save_index_fingerprint(self, fingerprint: str, **info: Any):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = f'{self._fingerprint_path()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': fingerprint, **info}, f, indent=2)
+        os.replace(tmp_path, self._fingerprint_path())
+
+    def invalidate_index_fingerprint(self):
+        if self.is_persistent() and os.path.exists(self._fingerprint_path()):
+            os.remove(self._fingerprint_path())
+
+    def persist_index(self):
+        """Write pending changes of the vector store to disk, for stores which do not on every write"""
+        persist = getattr(self.vector_db, 'persist', None)
+        if self.is_persistent() and persist is not None:
+            persist()
+
+    def reset_index(self):
+        """Remove all the chunks from the vector store"""
+        self.invalidate_index_fingerprint()
+        try:
+            self.vector_db.reset_collection()
+        finally:
+            self.clear_query_cache()
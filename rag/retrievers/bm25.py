@@ -0,0 +1,166 @@
+import math
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Words, keeping identifiers joined by '-', '_' or '.' (e.g. sklearn-onnx, predict_proba) together
+_TOKEN = re.compile(r'[a-z0-9]+(?:[-_.][a-z0-9]+)*')
+_SUB_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower cased words. Compound identifiers are kept as a token along with their parts, so that
+    `sklearn-onnx` matches exactly while `onnx` alone still matches it."""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_SUB_TOKEN.findall(token))
+    return tokens
+
+
+class BM25Index:
+    """
+    Incrementally updated inverted index scoring documents with Okapi BM25.
+
+    Posting lists are compact: for each term, the document numbers and term frequencies are
+    stored in two typed `array`s, which are scored with NumPy without copying. Documents are
+    numbered in insertion order. Removed documents are marked as deleted and their postings are
+    dropped once they make up most of the index (see `compact`).
+
+    Args:
+        k1: Term frequency saturation
+        b: Document length normalization
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._terms: Dict[str, int] = {}
+            self._postings_docs: List[array] = []  # Document numbers, per term id
+            self._postings_tfs: List[array] = []  # Term frequencies, per term id
+            self._doc_ids: List[str] = []
+            self._doc_numbers: Dict[str, int] = {}
+            self._doc_lengths = array('I')
+            self._deleted = bytearray()
+            self._n_deleted = 0
+            self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_ids) - self._n_deleted
+
+    def _add(self, doc_id: str, text: str):
+        if doc_id in self._doc_numbers:
+            self._remove(doc_id)
+        doc_number = len(self._doc_ids)
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, count in counts.items():
+            term_id = self._terms.get(term)
+            if term_id is None:
+                term_id = self._terms[term] = len(self._postings_docs)
+                self._postings_docs.append(array('I'))
+                self._postings_tfs.append(array('I'))
+            self._postings_docs[term_id].append(doc_number)
+            self._postings_tfs[term_id].append(count)
+        self._doc_ids.append(doc_id)
+        self._doc_numbers[doc_id] = doc_number
+        self._doc_lengths.append(len(tokens))
+        self._deleted.append(0)
+        self._total_length += len(tokens)
+
+    def _remove(self, doc_id: str):
+        doc_number = self._doc_numbers.pop(doc_id, None)
+        if doc_number is None:
+            return
+        self._deleted[doc_number] = 1
+        self._n_deleted += 1
+        self._total_length -= self._doc_lengths[doc_number]
+
+    def add(self, doc_ids: Sequence[str], texts: Sequence[str]):
+        """Index the texts, replacing the documents already indexed with the same ids"""
+        with self._lock:
+            for doc_id, text in zip(doc_ids, texts):
+                self._add(doc_id, text)
+
+    def remove(self, doc_ids: Iterable[str]):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+            if self._n_deleted > len(self._doc_ids) / 2:
+                self._compact()
+
+    def _compact(self):
+        """Rebuild the postings without the deleted documents"""
+        live = [
+            (doc_id, number) for number, doc_id in enumerate(self._doc_ids) if not self._deleted[number]
+        ]
+        renumber = np.full(len(self._doc_ids), -1, dtype=np.int64)
+        renumber[[number for _, number in live]] = np.arange(len(live))
+        terms, postings_docs, postings_tfs = {}, [], []
+        for term, term_id in self._terms.items():
+            docs = renumber[np.frombuffer(self._postings_docs[term_id], dtype=np.uint32)]
+            keep = docs >= 0
+            if not keep.any():
+                continue
+            terms[term] = len(postings_docs)
+            postings_docs.append(array('I', docs[keep].astype(np.uint32).tobytes()))
+            tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint32)[keep]
+            postings_tfs.append(array('I', tfs.tobytes()))
+        self._terms, self._postings_docs, self._postings_tfs = terms, postings_docs, postings_tfs
+        self._doc_lengths = array('I', (self._doc_lengths[number] for _, number in live))
+        self._doc_ids = [doc_id for doc_id, _ in live]
+        self._doc_numbers = {doc_id: number for number, (doc_id, _) in enumerate(live)}
+        self._deleted = bytearray(len(live))
+        self._n_deleted = 0
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def search(
+        self, query: str, k: int, doc_ids: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Ids and BM25 scores of the k best matching documents, best first. If `doc_ids` is
+        given, only these documents are returned (the statistics still cover the whole index)."""
+        with self._lock:
+            n_docs = len(self)
+            if n_docs == 0 or k <= 0:
+                return []
+            avg_length = self._total_length / n_docs
+            lengths = np.frombuffer(self._doc_lengths, dtype=np.uint32)
+            norms = self.k1 * (1 - self.b + self.b * lengths / max(avg_length, 1e-9))
+            scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+            for term in set(tokenize(query)):
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    continue
+                docs = np.frombuffer(self._postings_docs[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint32).astype(np.float32)
+                # Postings of deleted documents are still there until compaction
+                doc_freq = len(docs) - int(np.frombuffer(self._deleted, dtype=np.uint8)[docs].sum())
+                idf = math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms[docs])
+            if self._n_deleted:
+                scores[np.frombuffer(self._deleted, dtype=np.uint8).astype(bool)] = 0
+            if doc_ids is not None:
+                allowed = np.zeros(len(self._doc_ids), dtype=bool)
+                numbers = [self._doc_numbers[id] for id in doc_ids if id in self._doc_numbers]
+                allowed[numbers] = True
+                scores[~allowed] = 0
+            k = min(k, int(np.count_nonzero(scores)))
+            if k == 0:
+                return []
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best], kind='stable')]
+            return [(self._doc_ids[number], float(scores[number])) for number in best]
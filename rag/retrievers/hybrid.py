@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import weave
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from pydantic import Field, PrivateAttr
+
+from rag.chunkers.base import BaseChunkingStrategy
+from rag.common.registry import registry
+from rag.embeddings.factory import get_embeddings
+from rag.embeddings.queries import embed_queries
+from rag.retrievers.base import BaseRetriever
+from rag.retrievers.bm25 import BM25Index
+from rag.retrievers.query_cache import QueryCache
+from rag.vectorstores.filters import Filters
+
+# Runs the dense and lexical searches of a query side by side. Shared by all the hybrid
+# retrievers, so that rebuilding retrievers does not leave idle threads behind
+_POOL = ThreadPoolExecutor(thread_name_prefix='hybrid-retriever')
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse rankings of ids, scoring each id by the sum of 1 / (k + rank) over the rankings"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id in enumerate(ranking, start=1):
+            scores[id] = scores.get(id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+@registry.register_retriever('hybrid')
+class HybridRetriever(weave.Model, BaseRetriever):
+    """
+    Combines dense retrieval from the vector store with lexical retrieval from a BM25 index kept
+    next to it, which finds exact identifiers (library and API names) that embeddings tend to
+    miss. The `fetch_k` best chunks of both are fused with reciprocal rank fusion and the `k`
+    best are returned. The two lookups run concurrently, so the latency stays close to the
+    dense lookup alone.
+
+    The BM25 index is updated along with the vector store, and rebuilt from it when a persisted
+    index is opened.
+    """
+    model: str = 'nomic-embed-text'
+    k: int = 3
+    fetch_k: int = Field(default=20, description='Number of chunks retrieved by each lookup before fusion')
+    rrf_k: int = Field(default=60, description='Rank offset of reciprocal rank fusion, higher flattens the ranks')
+    bm25_k1: float = 1.5
+    bm25_b: float = 0.75
+    vector_db: Optional[VectorStore] = Field(default=None, init=None)
+    chunker: Optional[BaseChunkingStrategy] = Field(default=None, init=None)
+    docs: Optional[List[Document]] = None
+    embedding_cache_path: Optional[str] = Field(default=None, description='SQLite file caching the embeddings across runs')
+    embedding_executor: Optional[dict] = Field(default=None, description='Batching, concurrency and retries of the embedding requests, see BatchedEmbeddings')
+    embedding_params: Optional[dict] = Field(default=None, description='Extra arguments of the embedding backend, e.g. batch_size, num_threads and quantize for sentence-transformers models')
+    persist_directory: Optional[str] = Field(default=None, description='Directory persisting the index, in memory if None')
+    collection_name: str = Field(default='langchain', description='Name of the collection in the persisted index')
+    vector_store: str = Field(default='chroma', description='Name of the registered vector store: chroma, numpy (exact) or ivf (approximate)')
+    vector_store_params: Optional[dict] = Field(default=None, description='Extra arguments of the vector store, e.g. mmap for numpy')
+    query_cache: Optional[dict] = Field(default=None, description='Cache of the retrieved chunks by query: max_size, ttl (seconds) and similarity_threshold of the semantic tier, see QueryCache')
+
+    _bm25: BM25Index = PrivateAttr(default=None)
+    _query_cache: Optional[QueryCache] = PrivateAttr(default=None)
+
+    def model_post_init(self, __context):
+        self.init_retriever(self.docs)
+
+    def init_retriever(self, docs: List[Document] = None):
+        embedding = get_embeddings(
+            self.model,
+            cache_path=self.embedding_cache_path,
+            executor=self.embedding_executor,
+            params=self.embedding_params,
+        )
+        self.vector_db = self.create_vector_store(embedding)
+        self._query_cache = self.create_query_cache()
+        self._bm25 = BM25Index(k1=self.bm25_k1, b=self.bm25_b)
+
+        # A persisted vector store may already hold chunks
+        existing = self.vector_db.get()
+        self._bm25.add(existing['ids'], existing['documents'])
+
+        if docs is not None:
+            self.add_docs(docs)
+
+    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None) -> List[str]:
+        return self.index_docs(self.chunk_docs(docs, chunker))
+
+    def index_docs(
+        self, chunks: List[Document], embeddings: Optional[List[List[float]]] = None
+    ) -> List[str]:
+        ids = super().index_docs(chunks, embeddings)
+        self._bm25.add(ids, [chunk.page_content for chunk in chunks])
+        # Queries retrieved before the BM25 index caught up are not kept
+        self.clear_query_cache()
+        return ids
+
+    def delete_docs(self, ids: List[str]):
+        super().delete_docs(ids)
+        self._bm25.remove(ids)
+        self.clear_query_cache()
+
+    def reset_index(self):
+        super().reset_index()
+        self._bm25.clear()
+        self.clear_query_cache()
+
+    def retrieve_batch(
+        self,
+        inputs: List[str],
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]:
+        if embeddings is None:
+            embeddings = embed_queries(self.vector_db.embeddings, inputs)
+        where = self.search_filter(filters)
+        # The lexical lookup is restricted to the chunks matching the filters in the vector store
+        allowed = self.vector_db.get(where=where, include=[])['ids'] if where else None
+        return [
+            self._retrieve(input, embedding, where, allowed) for input, embedding in zip(inputs, embeddings)
+        ]
+
+    def _retrieve(self, input: str, embedding: List[float], where, allowed: Optional[List[str]]) -> List[Document]:
+        dense_future = _POOL.submit(
+            self.vector_db.similarity_search_by_vector, embedding, k=self.fetch_k, filter=where
+        )
+        lexical_future = _POOL.submit(self._bm25.search, input, self.fetch_k, allowed)
+        dense_docs = dense_future.result()
+        lexical = lexical_future.result()
+
+        fused = reciprocal_rank_fusion(
+            [[doc.id for doc in dense_docs], [id for id, _ in lexical]], k=self.rrf_k
+        )[: self.k]
+        docs_by_id = {doc.id: doc for doc in dense_docs}
+        missing = [id for id, _ in fused if id not in docs_by_id]
+        if missing:
+            docs_by_id.update((doc.id, doc) for doc in self.vector_db.get_by_ids(missing))
+        return [docs_by_id[id] for id, _ in fused if id in docs_by_id]
+
+    # Use this only for evaluation with weave
+    @weave.op()
+    def predict(self, input: str) -> List[str]:
+        docs = self.query(input)
+        return [doc.page_content for doc in docs]
@@ -1,16 +1,18 @@
 from typing import List, Optional
 
 import weave
-from langchain_chroma import Chroma
-from langchain_community.vectorstores.utils import filter_complex_metadata
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
-from langchain_ollama import OllamaEmbeddings
+from langchain_core.vectorstores import VectorStore
 from pydantic import Field, PrivateAttr
 
 from rag.chunkers.base import BaseChunkingStrategy
 from rag.common.registry import registry
+from rag.embeddings.factory import get_embeddings
+from rag.embeddings.queries import embed_queries
 from rag.retrievers.base import BaseRetriever
+from rag.retrievers.query_cache import QueryCache
+from rag.vectorstores.filters import Filters
+from rag.vectorstores.mmr import maximal_marginal_relevance
 
 
 @registry.register_retriever('mmr')
@@ -18,46 +20,59 @@ class MMR(weave.Model, BaseRetriever):
     # Initialize parameters with proper type hints
     model: str
     vector_db: Optional[VectorStore] = None
-    fetch_k: int = 1
+    fetch_k: int = Field(default=20, description='Number of candidates the diverse chunks are selected from')
     k: int = 1
     diversity: float = Field(default=0.5, ge=0.0, le=1.0, description="Diversity parameter (0=max diversity, 1=min diversity)")
     chunker: Optional[BaseChunkingStrategy] = None
-    _retriever: Optional[VectorStoreRetriever] = PrivateAttr(default=None)
     docs: Optional[List[Document]] = None
+    embedding_cache_path: Optional[str] = Field(default=None, description='SQLite file caching the embeddings across runs')
+    embedding_executor: Optional[dict] = Field(default=None, description='Batching, concurrency and retries of the embedding requests, see BatchedEmbeddings')
+    embedding_params: Optional[dict] = Field(default=None, description='Extra arguments of the embedding backend, e.g. batch_size, num_threads and quantize for sentence-transformers models')
+    persist_directory: Optional[str] = Field(default=None, description='Directory persisting the index, in memory if None')
+    collection_name: str = Field(default='langchain', description='Name of the collection in the persisted index')
+    vector_store: str = Field(default='chroma', description='Name of the registered vector store: chroma, numpy (exact) or ivf (approximate)')
+    vector_store_params: Optional[dict] = Field(default=None, description='Extra arguments of the vector store, e.g. mmap for numpy')
+    query_cache: Optional[dict] = Field(default=None, description='Cache of the retrieved chunks by query: max_size, ttl (seconds) and similarity_threshold of the semantic tier, see QueryCache')
+
+    _query_cache: Optional[QueryCache] = PrivateAttr(default=None)
 
     def model_post_init(self, __context):
         self.init_retriever(self.docs)
 
     def init_retriever(self, docs: List[Document] = None):
-        embedding = OllamaEmbeddings(
-            model=self.model,
+        embedding = get_embeddings(
+            self.model,
+            cache_path=self.embedding_cache_path,
+            executor=self.embedding_executor,
+            params=self.embedding_params,
         )
 
-        self.vector_db = Chroma(
-            embedding_function=embedding,
-        )
+        self.vector_db = self.create_vector_store(embedding)
+        self._query_cache = self.create_query_cache()
         if docs is not None:
             self.add_docs(docs)
 
-        self._retriever = self.vector_db.as_retriever(
-            search_type='mmr', search_kwargs={
-                'k': self.k,
-                'fetch_k': self.fetch_k,
-                'lambda_mult': self.diversity
-            }
-        )
-
-    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None):
-        # Workaround for ChromaDb not supporting list as metadata value - convert to string
-        if chunker is None:
-            chunker = self.chunker
-        
-        chunked_docs = chunker.chunk(docs)
-        self.vector_db.add_documents(filter_complex_metadata(chunked_docs))
+    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None) -> List[str]:
+        return self.index_docs(self.chunk_docs(docs, chunker))
     
-    def query(self, input: str)-> List[Document]:
-        relevant_docs = self._retriever.invoke(input)
-        return relevant_docs
+    def retrieve_batch(
+        self,
+        inputs: List[str],
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]:
+        # The queries are embedded in one call and their candidates fetched along with their
+        # vectors in one search, so the selection needs no further lookup
+        if embeddings is None:
+            embeddings = embed_queries(self.vector_db.embeddings, inputs)
+        candidates = self.vector_db.similarity_search_batch_with_vectors(
+            embeddings, k=max(self.fetch_k, self.k), filter=self.search_filter(filters)
+        )
+        results = []
+        for embedding, (docs, vectors) in zip(embeddings, candidates):
+            selected = maximal_marginal_relevance(embedding, vectors, k=self.k, lambda_mult=self.diversity)
+            results.append([docs[i] for i in selected])
+        return results
 
     # Use this only for evaluation with weave
     @weave.op()
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.common.hashing import hash_params, hash_text
+
+
+class _Entry(NamedTuple):
+    docs: List[Document]
+    vector: Optional[np.ndarray]  # Unit length query embedding, None if not embedded
+    created: float
+
+
+def _filters_key(filters: Optional[dict]) -> str:
+    return hash_params(filters or {})
+
+
+def _prompt_key(prompt: str) -> str:
+    # Queries differing only by case or whitespace are the same query
+    return hash_text(' '.join(prompt.casefold().split()))
+
+
+class QueryCache:
+    """
+    Cache of the chunks retrieved for the queries, in two tiers:
+
+    - exact: the query text (ignoring case and whitespace) and filters
+    - semantic: the most similar cached query embedding with the same filters, if its cosine
+      similarity is at least `similarity_threshold`, so that near-identical questions share
+      their results
+
+    Entries expire after `ttl` seconds, and the least recently used ones are evicted beyond
+    `max_size`. The retrievers clear the cache whenever their index changes; results retrieved
+    while it changed are not cached (see `generation`).
+
+    Args:
+        max_size: Maximum number of cached queries
+        ttl: Lifetime of an entry in seconds, None for no expiry
+        similarity_threshold: Minimum cosine similarity of a semantic hit, None disables the
+            semantic tier (and the query embedding it needs)
+    """
+
+    def __init__(
+        self, max_size: int = 1024, ttl: Optional[float] = 3600, similarity_threshold: Optional[float] = 0.95
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.generation = 0
+        self._entries: 'OrderedDict[Tuple[str, str], _Entry]' = OrderedDict()
+        self._matrix: Optional[Tuple[List[Tuple[str, str]], np.ndarray]] = None  # Keys and vectors
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl is not None and now - entry.created > self.ttl
+
+    def _remove(self, key: Tuple[str, str]):
+        del self._entries[key]
+        self._matrix = None
+
+    def get(self, prompt: str, filters: Optional[dict] = None) -> Optional[List[Document]]:
+        """Cached chunks of the same query (exact tier)"""
+        key = (_prompt_key(prompt), _filters_key(filters))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, time.monotonic()):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return list(entry.docs)
+
+    def get_similar(
+        self, vector: Optional[List[float]], filters: Optional[dict] = None
+    ) -> Optional[List[Document]]:
+        """Cached chunks of the most similar query (semantic tier), counting a miss if none. Called
+        after a miss of the exact tier, with no vector if the semantic tier is disabled."""
+        with self._lock:
+            if vector is not None and self.similarity_threshold is not None and self._entries:
+                now = time.monotonic()
+                for key in [key for key, entry in self._entries.items() if self._expired(entry, now)]:
+                    self._remove(key)
+                if self._matrix is None:
+                    keys = [key for key, entry in self._entries.items() if entry.vector is not None]
+                    vectors = np.array([self._entries[key].vector for key in keys], dtype=np.float32)
+                    self._matrix = (keys, vectors if keys else np.zeros((0, 0), dtype=np.float32))
+                keys, vectors = self._matrix
+                filters_key = _filters_key(filters)
+                candidates = [i for i, key in enumerate(keys) if key[1] == filters_key]
+                if candidates:
+                    query = np.asarray(vector, dtype=np.float32)
+                    similarities = vectors[candidates] @ (query / (np.linalg.norm(query) or 1.0))
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.similarity_threshold:
+                        key = keys[candidates[best]]
+                        self._entries.move_to_end(key)
+                        self.semantic_hits += 1
+                        return list(self._entries[key].docs)
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        prompt: str,
+        filters: Optional[dict],
+        docs: List[Document],
+        vector: Optional[List[float]] = None,
+        generation: Optional[int] = None,
+    ):
+        """Cache the chunks of the query, unless the cache was cleared since `generation`"""
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        key = (_prompt_key(prompt), _filters_key(filters))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = _Entry(list(docs), vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': (self.exact_hits + self.semantic_hits) / total if total else 0.0,
+        }
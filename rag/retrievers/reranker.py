@@ -1,21 +1,17 @@
 from typing import List, Optional
 
 import weave
-from langchain.retrievers.contextual_compression import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors.cross_encoder_rerank import (
-    CrossEncoderReranker,
-)
-from langchain_chroma import Chroma
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
-from langchain_community.vectorstores.utils import filter_complex_metadata
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
-from langchain_ollama import OllamaEmbeddings
+from langchain_core.vectorstores import VectorStore
 from pydantic import Field, PrivateAttr
 
 from rag.chunkers.base import BaseChunkingStrategy
 from rag.common.registry import registry
+from rag.embeddings.factory import get_embeddings
+from rag.rerankers.engine import RerankEngine, get_rerank_engine
 from rag.retrievers.base import BaseRetriever
+from rag.retrievers.query_cache import QueryCache
+from rag.vectorstores.filters import Filters
 
 
 @registry.register_retriever('reranker')
@@ -27,42 +23,74 @@ class Reranker(weave.Model, BaseRetriever):
     vector_db: Optional[VectorStore] = Field(default=None, init=None)
     chunker: Optional[BaseChunkingStrategy] = Field(default=None, init=None)
     docs: Optional[List[Document]] = None
+    embedding_cache_path: Optional[str] = Field(default=None, description='SQLite file caching the embeddings across runs')
+    embedding_executor: Optional[dict] = Field(default=None, description='Batching, concurrency and retries of the embedding requests, see BatchedEmbeddings')
+    embedding_params: Optional[dict] = Field(default=None, description='Extra arguments of the embedding backend, e.g. batch_size, num_threads and quantize for sentence-transformers models')
+    persist_directory: Optional[str] = Field(default=None, description='Directory persisting the index, in memory if None')
+    collection_name: str = Field(default='langchain', description='Name of the collection in the persisted index')
+    vector_store: str = Field(default='chroma', description='Name of the registered vector store: chroma, numpy (exact) or ivf (approximate)')
+    vector_store_params: Optional[dict] = Field(default=None, description='Extra arguments of the vector store, e.g. mmap for numpy')
+    query_cache: Optional[dict] = Field(default=None, description='Cache of the retrieved chunks by query: max_size, ttl (seconds) and similarity_threshold of the semantic tier, see QueryCache')
+    rerank_params: Optional[dict] = Field(default=None, description='Arguments of the rerank engine: backend (torch or onnx), batch_size, num_threads, quantize and cache_size, see get_rerank_engine')
+    adaptive: bool = Field(default=False, description='Score the candidates a few at a time in dense order and stop once the top k is stable')
+    adaptive_step: int = Field(default=4, description='Number of candidates scored per round of adaptive reranking')
+    adaptive_margin: float = Field(default=0.1, description='Adaptive reranking stops when the last scored candidates are this far below the k-th best score')
+    first_pass_model: Optional[str] = Field(default=None, description='Cheaper cross-encoder ordering the candidates before the main one, e.g. cross-encoder/ms-marco-TinyBERT-L2-v2')
+    first_pass_k: Optional[int] = Field(default=None, description='Number of candidates kept by the first pass, all if None')
 
-    _retriever: VectorStoreRetriever = PrivateAttr(default=None)
+    _engine: RerankEngine = PrivateAttr(default=None)
+    _first_pass_engine: Optional[RerankEngine] = PrivateAttr(default=None)
+    _query_cache: Optional[QueryCache] = PrivateAttr(default=None)
 
     def model_post_init(self, __context):
         self.init_retriever(self.docs)
 
     def init_retriever(self, docs: List[Document] = None):
-        embedding = OllamaEmbeddings(
-            model=self.model,
+        embedding = get_embeddings(
+            self.model,
+            cache_path=self.embedding_cache_path,
+            executor=self.embedding_executor,
+            params=self.embedding_params,
         )
 
-        self.vector_db = Chroma(
-            embedding_function=embedding,
-        )
+        self.vector_db = self.create_vector_store(embedding)
+        self._query_cache = self.create_query_cache()
         if docs is not None:
             self.add_docs(docs)
 
-        # https://python.langchain.com/docs/integrations/document_transformers/cross_encoder_reranker/
-        retriever = self.vector_db.as_retriever(search_kwargs={"k": self.fetch_k})
-        model = HuggingFaceCrossEncoder(model_name=self.cross_encoding_model)
-        compressor = CrossEncoderReranker(model=model, top_n=self.k)
-        self._retriever = ContextualCompressionRetriever( # Combiens and passes docuemtns for compressesion 
-            base_compressor=compressor, base_retriever=retriever
-        )
+        self._engine = get_rerank_engine(self.cross_encoding_model, **(self.rerank_params or {}))
+        if self.first_pass_model:
+            self._first_pass_engine = get_rerank_engine(self.first_pass_model, **(self.rerank_params or {}))
+
+    def warm_up(self):
+        super().warm_up()
+        # Scored by the cross-encoders directly, so that the pair is not cached
+        for engine in (self._first_pass_engine, self._engine):
+            if engine is not None:
+                engine.cross_encoder.predict([('warm up', 'warm up')], 1)
 
-    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None):
-        # Workaround for ChromaDb not supporting list as metadata value - convert to string
-        if chunker is None:
-            chunker = self.chunker
-        
-        chunked_docs = chunker.chunk(docs)
-        self.vector_db.add_documents(filter_complex_metadata(chunked_docs))
+    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None) -> List[str]:
+        return self.index_docs(self.chunk_docs(docs, chunker))
     
-    def query(self, input: str)-> List[Document]:
-        relevant_docs = self._retriever.invoke(input)
-        return relevant_docs
+    def retrieve_batch(
+        self,
+        inputs: List[str],
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]:
+        candidates = [
+            [doc for doc, _ in docs] for docs in self.search_batch(inputs, self.fetch_k, filters, embeddings)
+        ]
+        if self._first_pass_engine is not None:
+            # Cascade: the cheap model reorders (and optionally prunes) the candidates
+            candidates = self._first_pass_engine.rerank_batch(inputs, candidates, self.first_pass_k or self.fetch_k)
+        if self.adaptive:
+            return self._engine.rerank_adaptive_batch(
+                inputs, candidates, self.k, step=self.adaptive_step, margin=self.adaptive_margin
+            )
+        # The (query, candidate) pairs of all the queries are scored together, so the cross encoder
+        # runs on full batches
+        return self._engine.rerank_batch(inputs, candidates, self.k)
 
     # Use this only for evaluation with weave
     @weave.op()
@@ -1,58 +1,66 @@
 from typing import List, Optional
 
 import weave
-from langchain_chroma import Chroma
-from langchain_community.vectorstores.utils import filter_complex_metadata
 from langchain_core.documents import Document
-from langchain_core.vectorstores import VectorStore, VectorStoreRetriever
-from langchain_ollama import OllamaEmbeddings
+from langchain_core.vectorstores import VectorStore
 from pydantic import Field, PrivateAttr
 
 from rag.chunkers.base import BaseChunkingStrategy
 from rag.common.registry import registry
+from rag.embeddings.factory import get_embeddings
 from rag.retrievers.base import BaseRetriever
+from rag.retrievers.query_cache import QueryCache
+from rag.vectorstores.filters import Filters
 
 
 @registry.register_retriever('SimpleRetriever')
 class SimpleRetriever(weave.Model, BaseRetriever): 
     model: str = None
     k: int = 1
-    _retriever: VectorStoreRetriever = PrivateAttr(default=None)
     vector_db: Optional[VectorStore] = Field(default=None, init=None)
     chunker: Optional[BaseChunkingStrategy] = Field(default=None, init=None)
     docs: Optional[List[Document]] = None
+    embedding_cache_path: Optional[str] = Field(default=None, description='SQLite file caching the embeddings across runs')
+    embedding_executor: Optional[dict] = Field(default=None, description='Batching, concurrency and retries of the embedding requests, see BatchedEmbeddings')
+    embedding_params: Optional[dict] = Field(default=None, description='Extra arguments of the embedding backend, e.g. batch_size, num_threads and quantize for sentence-transformers models')
+    persist_directory: Optional[str] = Field(default=None, description='Directory persisting the index, in memory if None')
+    collection_name: str = Field(default='langchain', description='Name of the collection in the persisted index')
+    vector_store: str = Field(default='chroma', description='Name of the registered vector store: chroma, numpy (exact) or ivf (approximate)')
+    vector_store_params: Optional[dict] = Field(default=None, description='Extra arguments of the vector store, e.g. mmap for numpy')
+    query_cache: Optional[dict] = Field(default=None, description='Cache of the retrieved chunks by query: max_size, ttl (seconds) and similarity_threshold of the semantic tier, see QueryCache')
     similarity_threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
 
+    _query_cache: Optional[QueryCache] = PrivateAttr(default=None)
+
     def model_post_init(self, __context):
         self.init_retriever(self.docs)
 
     def init_retriever(self, docs: List[Document] = None):
-        embedding = OllamaEmbeddings(
-            model=self.model,
+        embedding = get_embeddings(
+            self.model,
+            cache_path=self.embedding_cache_path,
+            executor=self.embedding_executor,
+            params=self.embedding_params,
         )
 
-        self.vector_db = Chroma(
-            embedding_function=embedding,
-        )
+        self.vector_db = self.create_vector_store(embedding)
+        self._query_cache = self.create_query_cache()
         if docs is not None:
             self.add_docs(docs)
 
-        if self.similarity_threshold:
-            self._retriever = self.vector_db.as_retriever(search_type="similarity_score_threshold", search_kwargs={"k": self.k, "score_threshold": self.similarity_threshold})
-        else:
-            self._retriever = self.vector_db.as_retriever(search_kwargs={"k": self.k})
-
-    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None):
-        # Workaround for ChromaDb not supporting list as metadata value - convert to string
-        if chunker is None:
-            chunker = self.chunker
-        
-        chunked_docs = chunker.chunk(docs)
-        self.vector_db.add_documents(filter_complex_metadata(chunked_docs))
+    def add_docs(self, docs: List[Document], chunker: Optional[BaseChunkingStrategy] = None) -> List[str]:
+        return self.index_docs(self.chunk_docs(docs, chunker))
     
-    def query(self, input: str) -> List[Document]:
-        relevant_docs = self._retriever.invoke(input)
-        return relevant_docs
+    def retrieve_batch(
+        self,
+        inputs: List[str],
+        filters: Optional[Filters] = None,
+        embeddings: Optional[List[List[float]]] = None,
+    ) -> List[List[Document]]:
+        results = self.search_batch(inputs, self.k, filters, embeddings)
+        if self.similarity_threshold:
+            return [[doc for doc, score in docs if score >= self.similarity_threshold] for docs in results]
+        return [[doc for doc, _ in docs] for docs in results]
 
     # Use this only for evaluation with weave
     @weave.op()
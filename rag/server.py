@@ -0,0 +1,318 @@
+import argparse
+import collections
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from rag.common.hashing import hash_params
+
+
+class Overloaded(RuntimeError):
+    """Raised when a request is submitted to a full queue"""
+
+
+class Batched(NamedTuple):
+    value: Any  # Result of the item
+    batch_size: int  # Number of items processed in the same batch
+    queue_seconds: float  # Time spent waiting for the batch to start
+    batch_seconds: float  # Time spent processing the batch
+
+
+class MicroBatcher:
+    """
+    Collects the items submitted concurrently (e.g. by the threads serving HTTP requests) and
+    processes them together: a batch starts once `max_batch_size` items are waiting, or `max_wait`
+    seconds after its first item arrived. Batches are processed one at a time by a worker thread,
+    so the items arriving meanwhile make up the next batch.
+
+    At most `max_queue` items wait for a batch, `submit` raises `Overloaded` beyond that, so that
+    the callers can shed the load instead of letting the latency grow.
+
+    Args:
+        process: Function of a list of items returning the list of their results. Results which
+            are exceptions are raised to the submitter of their item only
+        max_batch_size: Maximum number of items processed in one batch
+        max_wait: Maximum time in seconds an item waits for other items to join its batch
+        max_queue: Maximum number of items waiting for a batch
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        max_queue: int = 64,
+    ):
+        if max_batch_size <= 0:
+            raise ValueError(f"max_batch_size must be > 0, got {max_batch_size}")
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._queue = collections.deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue the item, the future resolves to its `Batched` result"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('The batcher is closed')
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f'{len(self._queue)} requests are already queued')
+            self._queue.append((item, future, time.perf_counter()))
+            self._condition.notify()
+        return future
+
+    def _next_batch(self) -> List[tuple]:
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return []
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            start = time.perf_counter()
+            try:
+                results = self.process([item for item, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+            with self._condition:
+                self.batches += 1
+                self.items += len(batch)
+            for (_, future, submitted), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(Batched(result, len(batch), start - submitted, elapsed))
+
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def close(self):
+        """Stop the worker once the queued items are processed"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'queue_depth': self.queue_depth(),
+            'batches': self.batches,
+            'items': self.items,
+            'rejected': self.rejected,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+        }
+
+
+def _milliseconds(seconds: float) -> str:
+    return f'{seconds * 1000:.1f}'
+
+
+class RAGServer(ThreadingHTTPServer):
+    """
+    HTTP/JSON server answering the queries of a RAG. The retrieval of the concurrent queries is
+    micro-batched, so that their query embeddings are computed in one request and their
+    (query, chunk) pairs reranked in full cross-encoder batches. Generation runs in the request
+    threads, at most `max_generations` at a time (Ollama answers OLLAMA_NUM_PARALLEL requests at
+    once and queues the others).
+
+    Endpoints:
+        POST /query: {"query": str, "filters": dict (optional), "generate": bool (default true)},
+            answered with {"answer": str or null, "sources": [{"filename": str, "text": str}]}.
+            The `Server-Timing` header reports the time spent in each stage (queue, retrieval and
+            generation) and `X-Batch-Size` the number of queries retrieved together. Answered 503
+            when the retrieval queue is full.
+        GET /health: status and statistics of the batcher
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        rag,
+        max_batch_size: int = 16,
+        max_wait: float = 0.005,
+        max_queue: int = 64,
+        max_generations: int = 4,
+    ):
+        super().__init__(address, RAGRequestHandler)
+        self.rag = rag
+        self.batcher = MicroBatcher(
+            self._retrieve_batch, max_batch_size=max_batch_size, max_wait=max_wait, max_queue=max_queue
+        )
+        self.generations = threading.BoundedSemaphore(max_generations)
+
+    def _retrieve_batch(self, items: List[tuple]) -> List[list]:
+        """Chunks of the (query, filters) items, the queries with the same filters are retrieved
+        in one batch. A failing group (e.g. invalid filters) only fails its own queries"""
+        groups: Dict[str, List[int]] = {}
+        for i, (_, filters) in enumerate(items):
+            groups.setdefault(hash_params(filters or {}), []).append(i)
+        results: List[Optional[list]] = [None] * len(items)
+        for indices in groups.values():
+            filters = items[indices[0]][1]
+            queries = [items[i][0] for i in indices]
+            try:
+                if filters:
+                    docs = self.rag.retriever.query_batch(queries, filters=filters)
+                else:
+                    docs = self.rag.retriever.query_batch(queries)
+            except Exception as e:
+                docs = [e] * len(indices)
+            for i, chunks in zip(indices, docs):
+                results[i] = chunks
+        return results
+
+    def server_close(self):
+        super().server_close()
+        self.batcher.close()
+
+
+class RAGRequestHandler(BaseHTTPRequestHandler):
+    server: RAGServer
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send_json(404, {'error': f'Unknown path {self.path}'})
+        self._send_json(200, {'status': 'ok', **self.server.batcher.stats()})
+
+    def do_POST(self):
+        if self.path != '/query':
+            return self._send_json(404, {'error': f'Unknown path {self.path}'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            return self._send_json(400, {'error': 'Invalid Content-Length'})
+        if length < 0:
+            # rfile.read(-1) would wait for the client to close the connection
+            return self._send_json(400, {'error': 'Invalid Content-Length'})
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError as e:
+            return self._send_json(400, {'error': f'Invalid JSON: {e}'})
+        query = request.get('query') if isinstance(request, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            return self._send_json(400, {'error': '"query" must be a non-empty string'})
+        filters = request.get('filters')
+        if filters is not None and not isinstance(filters, dict):
+            return self._send_json(400, {'error': '"filters" must be an object'})
+
+        try:
+            retrieved = self.server.batcher.submit((query, filters)).result()
+        except Overloaded as e:
+            return self._send_json(503, {'error': str(e)}, {'Retry-After': '1'})
+        except ValueError as e:
+            # Invalid filters
+            return self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            return self._send_json(500, {'error': repr(e)})
+        docs = retrieved.value
+        timings = [('queue', retrieved.queue_seconds), ('retrieval', retrieved.batch_seconds)]
+
+        answer = None
+        if request.get('generate', True):
+            start = time.perf_counter()
+            with self.server.generations:
+                timings.append(('generation_queue', time.perf_counter() - start))
+                start = time.perf_counter()
+                try:
+                    answer = self.server.rag.generator.query(query, context=docs)
+                except Exception as e:
+                    return self._send_json(500, {'error': repr(e)})
+                answer = getattr(answer, 'content', answer)
+            timings.append(('generation', time.perf_counter() - start))
+
+        sources = [{'filename': doc.metadata.get('filename'), 'text': doc.page_content} for doc in docs]
+        self._send_json(
+            200,
+            {'answer': answer, 'sources': sources},
+            {
+                'Server-Timing': ', '.join(f'{name};dur={_milliseconds(seconds)}' for name, seconds in timings),
+                'X-Batch-Size': str(retrieved.batch_size),
+            },
+        )
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(rag, host: str = '127.0.0.1', port: int = 8000, **params: Any):
+    """Serve the RAG until interrupted, see `RAGServer` for the params"""
+    server = RAGServer((host, port), rag, **params)
+    print(f"Serving on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    import yaml
+
+    from rag.rag import RAG
+
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    parser = argparse.ArgumentParser(description='Serve the RAG over HTTP.')
+    parser.add_argument('-f', '--file', default='rag/configs/server.yaml', help='Path of the configuration file relative to root dir')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--dir', help='Directory of notes ingested before serving')
+    parser.add_argument('--max-batch-size', type=int, default=16, help='Maximum number of queries retrieved in one batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5, help='Maximum time a query waits for others to join its batch')
+    parser.add_argument('--max-queue', type=int, default=64, help='Maximum number of queued queries, others are answered 503')
+    parser.add_argument('--max-generations', type=int, default=4, help='Maximum number of concurrent generations')
+    args = parser.parse_args()
+
+    with open(os.path.join(root_dir, args.file)) as stream:
+        rag = RAG.from_config(yaml.safe_load(stream))
+    if args.dir:
+        rag.ingest(dir=args.dir)
+    serve(
+        rag,
+        args.host,
+        args.port,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        max_generations=args.max_generations,
+    )
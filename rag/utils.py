@@ -1,20 +1,69 @@
+import ast
 import os
 import sys
 import importlib.util
 import inspect
-from typing import Any, Callable, List, Optional
+import threading
+from types import ModuleType
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 
 from langchain_core.documents import Document
-from unstructured.staging.base import dict_to_elements, convert_to_dict
-from unstructured.documents.elements import Element
 
-# Usage example for both classes and functions
+if TYPE_CHECKING:
+    from unstructured.documents.elements import Element
+
+# Top level functions and classes of the modules of each search dir, and the modules already
+# imported by path, so that a lookup imports only the module defining the callable
+_callable_index: Dict[str, Dict[str, str]] = {}
+_modules: Dict[str, ModuleType] = {}
+_lock = threading.Lock()
+
+
+def _index_callables(search_dir: str) -> Dict[str, str]:
+    """Path of the module defining each top level function and class of the directory, read from
+    the syntax trees of the modules so that none is imported. The first definition wins"""
+    index = {}
+    for root, dirs, files in os.walk(search_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(".py") and not file.startswith("__"):
+                file_path = os.path.join(root, file)
+                try:
+                    with open(file_path, encoding="utf-8") as f:
+                        tree = ast.parse(f.read(), filename=file_path)
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    print(f"Warning: Error parsing {file_path}: {str(e)}")
+                    continue
+                for node in tree.body:
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                        index.setdefault(node.name, file_path)
+    return index
+
+
+def _import_file(file_path: str) -> ModuleType:
+    module = _modules.get(file_path)
+    if module is None:
+        module_name = os.path.splitext(os.path.basename(file_path))[0]
+        unique_module_name = (
+            f"dynamic_import_{os.path.basename(os.path.dirname(file_path))}_{module_name}"
+        )
+        spec = importlib.util.spec_from_file_location(unique_module_name, file_path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Cannot import {file_path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[unique_module_name] = module
+        spec.loader.exec_module(module)
+        _modules[file_path] = module
+    return module
+
+
 def get_callable_from_name(
     callable_name: str, search_dirs: list[str]
 ) -> Optional[Callable]:
     """
-    Find a callable (function or class) by name from the specified directories.
+    Find a callable (function or class) by name from the specified directories. The directories
+    are indexed once, and only the module defining the callable is imported.
 
     Args:
         callable_name: Name of the function or class to find
@@ -28,35 +77,25 @@ def get_callable_from_name(
             print(f"Warning: Directory {search_dir} does not exist")
             continue
 
-        for root, _, files in os.walk(search_dir):
-            for file in files:
-                if file.endswith(".py") and not file.startswith("__"):
-                    file_path = os.path.join(root, file)
-                    module_name = os.path.splitext(file)[0]
-                    unique_module_name = (
-                        f"dynamic_import_{os.path.basename(root)}_{module_name}"
-                    )
-
-                    try:
-                        spec = importlib.util.spec_from_file_location(
-                            unique_module_name, file_path
-                        )
-                        if spec is None or spec.loader is None:
-                            continue
-
-                        module = importlib.util.module_from_spec(spec)
-                        sys.modules[unique_module_name] = module
-                        spec.loader.exec_module(module)
-
-                        if hasattr(module, callable_name):
-                            obj = getattr(module, callable_name)
-                            if inspect.isfunction(obj):
-                                return obj
-                            elif inspect.isclass(obj):
-                                return obj
-                    except (ImportError, ModuleNotFoundError, AttributeError) as e:
-                        print(f"Warning: Error importing {file_path}: {str(e)}")
-                        continue
+        search_dir = os.path.abspath(search_dir)
+        with _lock:
+            index = _callable_index.get(search_dir)
+            if index is None or callable_name not in index:
+                # Indexed again on a miss, in case the module was added since
+                index = _callable_index[search_dir] = _index_callables(search_dir)
+            file_path = index.get(callable_name)
+            if file_path is None:
+                continue
+
+            try:
+                module = _import_file(file_path)
+            except (ImportError, ModuleNotFoundError, AttributeError) as e:
+                print(f"Warning: Error importing {file_path}: {str(e)}")
+                continue
+
+        obj = getattr(module, callable_name, None)
+        if inspect.isfunction(obj) or inspect.isclass(obj):
+            return obj
 
     return None
 
@@ -78,7 +117,14 @@ def execute_callable(
 
 
 def el_to_doc(elements) -> List[Document]:
-    element_json = convert_to_dict(elements)
+    # unstructured is imported lazily, only its chunkers and partitioners need it
+    from unstructured.staging.base import convert_to_dict
+
+    return element_dicts_to_docs(convert_to_dict(elements))
+
+
+def element_dicts_to_docs(element_json: List[dict]) -> List[Document]:
+    """Same as el_to_doc, for elements already converted to dicts (e.g. read from a cache)"""
     documents = []
     for element_dict in element_json:
         metadata = element_dict["metadata"]
@@ -97,11 +143,13 @@ def el_to_doc(elements) -> List[Document]:
 #     return {"source": self.file_path} if self.file_path else {}
 
 
-def doc_to_el(documents: List[Document]) -> List[Element]:
+def doc_to_el(documents: List[Document]) -> List["Element"]:
+    from unstructured.staging.base import dict_to_elements
+
     element_dicts = []
     for document in documents:
         element_dict = dict()
-        metadata = document.metadata
+        metadata = dict(document.metadata)  # Copy, so the documents can be chunked again
         element_dict["element_id"] = document.id
         element_dict["text"] = document.page_content
         element_dict["type"] = metadata.pop("element_type")
@@ -0,0 +1,111 @@
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from rag.common.registry import registry
+from rag.vectorstores.filters import Filters, to_chroma_where
+from rag.vectorstores.mmr import maximal_marginal_relevance
+
+
+@registry.register_vectorstore('chroma')
+class ChromaStore(Chroma):
+    """
+    Chroma vector store which additionally accepts documents along with their precomputed
+    embeddings. This allows embedding to run as a separate stage (e.g. in the ingestion
+    pipeline) instead of being done implicitly by `add_documents`.
+    """
+
+    def add_embeddings(
+        self, docs: List[Document], embeddings: List[List[float]]
+    ) -> List[str]:
+        ids = [doc.id if doc.id else str(uuid.uuid4()) for doc in docs]
+        texts = [doc.page_content for doc in docs]
+        metadatas = [doc.metadata for doc in docs]
+
+        # Chroma rejects empty metadata dicts, so these have to be upserted separately
+        with_meta = [i for i, metadata in enumerate(metadatas) if metadata]
+        without_meta = [i for i, metadata in enumerate(metadatas) if not metadata]
+        if with_meta:
+            self._collection.upsert(
+                ids=[ids[i] for i in with_meta],
+                embeddings=[embeddings[i] for i in with_meta],
+                documents=[texts[i] for i in with_meta],
+                metadatas=[metadatas[i] for i in with_meta],
+            )
+        if without_meta:
+            self._collection.upsert(
+                ids=[ids[i] for i in without_meta],
+                embeddings=[embeddings[i] for i in without_meta],
+                documents=[texts[i] for i in without_meta],
+            )
+        return ids
+
+    def translate_filter(self, filters: Optional[Filters]) -> Optional[Dict[str, Any]]:
+        """Filters of the retrievers as a `where` clause, resolved by Chroma's metadata index
+        before the vector search"""
+        return to_chroma_where(filters)
+
+    def similarity_search_batch_with_score_by_vectors(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Documents and distances of the k nearest neighbours of each embedding, searched in a
+        single collection query"""
+        if len(embeddings) == 0:
+            return []
+        results = self._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=filter,
+            include=['documents', 'metadatas', 'distances'],
+        )
+        return [
+            [
+                (Document(page_content=text, metadata=metadata or {}, id=id), distance)
+                for text, metadata, id, distance in zip(texts, metadatas, ids, distances)
+            ]
+            for texts, metadatas, ids, distances in zip(
+                results['documents'], results['metadatas'], results['ids'], results['distances']
+            )
+        ]
+
+    def similarity_search_batch_with_vectors(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[List[Document], np.ndarray]]:
+        """Documents of the k nearest neighbours of each embedding, along with their embeddings,
+        fetched in a single collection query"""
+        if len(embeddings) == 0:
+            return []
+        results = self._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=filter,
+            include=['documents', 'metadatas', 'embeddings'],
+        )
+        return [
+            (
+                [
+                    Document(page_content=text, metadata=metadata or {}, id=id)
+                    for text, metadata, id in zip(texts, metadatas, ids)
+                ],
+                np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1),
+            )
+            for texts, metadatas, ids, vectors in zip(
+                results['documents'], results['metadatas'], results['ids'], results['embeddings']
+            )
+        ]
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        docs, vectors = self.similarity_search_batch_with_vectors([embedding], fetch_k, filter)[0]
+        selected = maximal_marginal_relevance(embedding, vectors, k=k, lambda_mult=lambda_mult)
+        return [docs[i] for i in selected]
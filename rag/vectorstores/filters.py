@@ -0,0 +1,67 @@
+"""
+Metadata filters of the retrievers' queries, as a dict mapping a metadata key to a condition:
+
+- a value: the metadata equals the value, e.g. `{'filename': 'notes.md'}`
+- a list: the metadata equals any of the values, e.g. `{'element_type': ['Title', 'NarrativeText']}`
+- a tuple `(first, last)`: the metadata is in the inclusive range, either bound may be None,
+  e.g. `{'page_number': (3, 5)}`
+
+All the conditions must hold. Each vector store translates the filters to its own format with
+`translate_filter`.
+"""
+from typing import Any, Dict, Optional
+
+Filters = Dict[str, Any]
+
+
+def validate_filters(filters: Filters):
+    for key, condition in filters.items():
+        if isinstance(condition, tuple) and len(condition) != 2:
+            raise ValueError(f"Range of '{key}' must be a (first, last) tuple, got {condition}")
+
+
+def in_range(value: Any, condition: tuple) -> bool:
+    first, last = condition
+    try:
+        return (first is None or value >= first) and (last is None or value <= last)
+    except TypeError:  # Not comparable, e.g. missing
+        return False
+
+
+def matches(metadata: Dict[str, Any], filters: Optional[Filters]) -> bool:
+    """Whether the metadata satisfies all the conditions of the filters"""
+    if not filters:
+        return True
+    for key, condition in filters.items():
+        value = metadata.get(key)
+        if isinstance(condition, tuple):
+            if not in_range(value, condition):
+                return False
+        elif isinstance(condition, list):
+            if value not in condition:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def to_chroma_where(filters: Optional[Filters]) -> Optional[Dict[str, Any]]:
+    """Filters as a Chroma `where` clause"""
+    if not filters:
+        return None
+    validate_filters(filters)
+    clauses = []
+    for key, condition in filters.items():
+        if isinstance(condition, tuple):
+            first, last = condition
+            if first is not None:
+                clauses.append({key: {'$gte': first}})
+            if last is not None:
+                clauses.append({key: {'$lte': last}})
+        elif isinstance(condition, list):
+            clauses.append({key: {'$in': condition}})
+        else:
+            clauses.append({key: {'$eq': condition}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {'$and': clauses}
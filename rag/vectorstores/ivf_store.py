@@ -0,0 +1,215 @@
+import math
+import os
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.common.registry import registry
+from rag.vectorstores.filters import Filters
+from rag.vectorstores.numpy_store import NumpyVectorStore, _best, _normalize, _Snapshot
+
+
+class _IVFIndex(NamedTuple):
+    centroids: np.ndarray  # (nlist, dim) float32, rows normalized to unit length
+    assignments: np.ndarray  # (n,) list of each row
+    lists: Tuple[np.ndarray, ...]  # Rows of each list, in increasing order
+    trained_size: int  # Number of rows when the centroids were trained
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 16384) -> np.ndarray:
+    """Nearest (most similar) centroid of each vector"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for i in range(0, len(vectors), batch_size):
+        assignments[i : i + batch_size] = np.argmax(vectors[i : i + batch_size] @ centroids.T, axis=1)
+    return assignments
+
+
+def _lists(assignments: np.ndarray, nlist: int) -> Tuple[np.ndarray, ...]:
+    order = np.argsort(assignments, kind='stable')
+    counts = np.bincount(assignments, minlength=nlist)
+    return tuple(np.split(order, np.cumsum(counts)[:-1]))
+
+
+def _spherical_kmeans(
+    vectors: np.ndarray, nlist: int, iters: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Centroids of the vectors clustered by cosine similarity (k-means on the unit sphere)"""
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iters):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Clusters which lost all their vectors are restarted from random vectors
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+@registry.register_vectorstore('ivf')
+class IVFVectorStore(NumpyVectorStore):
+    """
+    Approximate nearest neighbour search over the NumPy vector store with an inverted file index
+    (IVF-flat). The vectors are clustered into `nlist` lists by spherical k-means, and a query only
+    scores the vectors of the `nprobe` lists with the closest centroids, trading recall for
+    latency: search is O(nlist + n * nprobe / nlist) instead of O(n).
+
+    Added vectors are assigned to the list of their nearest centroid. The centroids are trained
+    once the store holds `min_train_size` vectors (searching exhaustively before that) and
+    retrained when it grows by `retrain_growth` since the last training. The centroids and list
+    assignments are persisted along with the vectors.
+
+    Filtered queries scan the matching vectors exactly when they are fewer than the vectors of the
+    probed lists. Otherwise the probed lists are restricted to the matching vectors, in which case
+    fewer than k results may be found.
+
+    Args:
+        embedding_function: Embeddings of the documents and queries
+        persist_directory: Directory of the persisted collections, in memory only if None
+        collection_name: Name of the collection
+        mmap: Memory-map the persisted matrix
+        indexed_metadata: Metadata keys indexed for the filtered queries
+        nlist: Number of lists. If None, 4 * sqrt(n) at training time
+        nprobe: Number of lists searched per query
+        min_train_size: Number of vectors from which the index is trained
+        retrain_growth: Growth factor of the store since the last training triggering a retraining
+        kmeans_iters: Number of k-means iterations
+        train_sample: Maximum number of vectors used to train the centroids. If None, 64 * nlist
+        seed: Seed of the k-means initialization
+    """
+
+    INDEX_FILE = 'ivf.npz'
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        persist_directory: Optional[str] = None,
+        collection_name: str = 'langchain',
+        mmap: bool = False,
+        indexed_metadata: Sequence[str] = ('filename', 'element_type', 'page_number'),
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        min_train_size: int = 1024,
+        retrain_growth: float = 4.0,
+        kmeans_iters: int = 10,
+        train_sample: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iters = kmeans_iters
+        self.train_sample = train_sample
+        self.seed = seed
+        super().__init__(
+            embedding_function,
+            persist_directory=persist_directory,
+            collection_name=collection_name,
+            mmap=mmap,
+            indexed_metadata=indexed_metadata,
+        )
+
+    def _train(self, snapshot: _Snapshot) -> Optional[_IVFIndex]:
+        n = len(snapshot.ids)
+        if n < self.min_train_size:
+            return None
+        nlist = min(self.nlist or max(1, int(4 * math.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, self.train_sample or 64 * nlist)
+        sample = snapshot.vectors[np.sort(rng.choice(n, sample_size, replace=False))]
+        centroids = _spherical_kmeans(np.asarray(sample, dtype=np.float32), nlist, self.kmeans_iters, rng)
+        assignments = _assign(snapshot.vectors, centroids)
+        print(f"Trained IVF index with {nlist} lists on {sample_size} of {n} vectors")
+        return _IVFIndex(centroids, assignments, _lists(assignments, nlist), n)
+
+    def train(self):
+        """(Re)train the centroids on the current vectors"""
+        with self._lock:
+            self._snapshot = self._snapshot._replace(index=self._train(self._snapshot))
+            self._dirty = True
+
+    def _index_append(self, previous: _Snapshot, snapshot: _Snapshot) -> Optional[_IVFIndex]:
+        index = previous.index
+        n = len(snapshot.ids)
+        if index is None or n > index.trained_size * self.retrain_growth:
+            return self._train(snapshot)
+
+        start = len(previous.ids)
+        new_assignments = _assign(snapshot.vectors[start:], index.centroids)
+        lists = list(index.lists)
+        # Only the touched lists are copied, the others are shared with the previous snapshot
+        for list_id in np.unique(new_assignments):
+            new_rows = start + np.flatnonzero(new_assignments == list_id)
+            lists[list_id] = np.concatenate((lists[list_id], new_rows))
+        return index._replace(
+            assignments=np.concatenate((index.assignments, new_assignments)), lists=tuple(lists)
+        )
+
+    def _index_subset(
+        self, previous: _Snapshot, snapshot: _Snapshot, keep: List[int]
+    ) -> Optional[_IVFIndex]:
+        index = previous.index
+        if index is None or not keep:
+            return None
+        assignments = index.assignments[keep]
+        return index._replace(
+            assignments=assignments, lists=_lists(assignments, len(index.centroids))
+        )
+
+    def _index_load(self, snapshot: _Snapshot) -> Optional[_IVFIndex]:
+        path = os.path.join(self._collection_dir(), self.INDEX_FILE)
+        if os.path.exists(path):
+            with np.load(path) as data:
+                centroids, assignments = data['centroids'], data['assignments']
+                trained_size = int(data['trained_size'])
+            if len(assignments) == len(snapshot.ids):
+                return _IVFIndex(
+                    centroids, assignments, _lists(assignments, len(centroids)), trained_size
+                )
+        return self._train(snapshot)
+
+    def _index_persist(self, snapshot: _Snapshot):
+        path = os.path.join(self._collection_dir(), self.INDEX_FILE)
+        index = snapshot.index
+        if index is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = f'{path}.tmp.npz'
+        np.savez(
+            tmp_path,
+            centroids=index.centroids,
+            assignments=index.assignments,
+            trained_size=index.trained_size,
+        )
+        os.replace(tmp_path, path)
+
+    def _top_k(
+        self, snapshot: _Snapshot, embedding: List[float], k: int, filter: Optional[Filters]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        return self._top_k_batch(snapshot, [embedding], k, filter)[0]
+
+    def _top_k_batch(
+        self, snapshot: _Snapshot, embeddings: List[List[float]], k: int, filter: Optional[Filters]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        index = snapshot.index
+        if index is None:
+            return super()._top_k_batch(snapshot, embeddings, k, filter)
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        filtered = self._filter_rows(snapshot, filter) if filter else None
+        # A filtered subset smaller than the probed lists is cheaper (and exact) to scan directly
+        if filtered is not None and len(filtered) <= len(snapshot.ids) * self.nprobe / len(index.centroids):
+            return self._scan_batch(snapshot, filtered, queries, k)
+
+        results = []
+        for query, centroid_scores in zip(queries, queries @ index.centroids.T):
+            probed = _best(centroid_scores, self.nprobe)
+            rows = np.concatenate([index.lists[list_id] for list_id in probed])
+            if filtered is not None:
+                rows = rows[np.isin(rows, filtered, assume_unique=True)]
+            results.append(self._scan(snapshot, rows, query, k))
+        return results
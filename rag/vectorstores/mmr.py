@@ -0,0 +1,44 @@
+from typing import List
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def maximal_marginal_relevance(
+    query_embedding, candidate_embeddings, k: int = 4, lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Indices of the candidates selected by maximal marginal relevance (by cosine similarity),
+    in selection order. Each step selects the candidate maximizing
+    `lambda_mult * relevance - (1 - lambda_mult) * max similarity to the selected candidates`.
+
+    The highest similarity of each candidate to the selection is kept up to date, so a step only
+    computes the similarities to the last selected candidate: O(k n d) overall, instead of
+    recomputing the similarities to the whole selection at each step. As k is much smaller than
+    the number of candidates, this is also cheaper than the full candidate similarity matrix.
+    """
+    candidates = _normalize_rows(np.asarray(candidate_embeddings, dtype=np.float32))
+    n = len(candidates)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    relevance = candidates @ query
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = candidates @ candidates[selected[0]]
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+    for _ in range(k - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(max_similarity, candidates @ candidates[best], out=max_similarity)
+    return selected
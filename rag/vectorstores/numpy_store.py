@@ -0,0 +1,536 @@
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from rag.common.registry import registry
+from rag.vectorstores.filters import Filters, in_range, matches, validate_filters
+from rag.vectorstores.mmr import maximal_marginal_relevance
+
+
+class _Snapshot(NamedTuple):
+    """Immutable view of the store. Writers build a new snapshot and swap it in, so that queries
+    running concurrently keep a consistent view without locking."""
+    ids: Tuple[str, ...]
+    vectors: np.ndarray  # (n, dim) float32, rows normalized to unit length
+    texts: Tuple[str, ...]
+    metadatas: Tuple[Dict[str, Any], ...]
+    rows: Dict[str, int]  # id -> row
+    index: Any = None  # Search structure of subclasses, e.g. the inverted lists of IVFVectorStore
+    # Posting lists of the indexed metadata: key -> value -> rows with the value, in increasing order
+    postings: Optional[Dict[str, Dict[Any, np.ndarray]]] = None
+
+
+_EMPTY = _Snapshot((), np.zeros((0, 0), dtype=np.float32), (), (), {})
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _best(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest (finite) scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return best[np.isfinite(scores[best])]
+
+
+def _build_postings(
+    metadatas: Sequence[Dict[str, Any]], keys: Sequence[str], start: int = 0
+) -> Dict[str, Dict[Any, np.ndarray]]:
+    rows_by_value: Dict[str, Dict[Any, List[int]]] = {key: {} for key in keys}
+    for row, metadata in enumerate(metadatas, start=start):
+        for key in keys:
+            value = metadata.get(key)
+            if value is None or isinstance(value, (list, dict)):  # Unhashable values are not indexed
+                continue
+            rows_by_value[key].setdefault(value, []).append(row)
+    return {
+        key: {value: np.array(rows, dtype=np.int64) for value, rows in values.items()}
+        for key, values in rows_by_value.items()
+    }
+
+
+def _merge_postings(
+    postings: Dict[str, Dict[Any, np.ndarray]], new: Dict[str, Dict[Any, np.ndarray]]
+) -> Dict[str, Dict[Any, np.ndarray]]:
+    """Postings with the rows of `new` appended. Only the touched lists are copied."""
+    merged = {key: dict(values) for key, values in postings.items()}
+    for key, values in new.items():
+        for value, rows in values.items():
+            existing = merged[key].get(value)
+            merged[key][value] = rows if existing is None else np.concatenate((existing, rows))
+    return merged
+
+
+@registry.register_vectorstore('numpy')
+class NumpyVectorStore(VectorStore):
+    """
+    Exact (flat) vector store keeping all the embeddings in one contiguous float32 matrix with
+    rows normalized to unit length, so that the top k of a query is a single matrix-vector
+    product followed by `argpartition`. Scores are cosine similarities.
+
+    For corpora of notes this avoids the per-query overhead of Chroma (SQLite round trips and
+    conversions of the results), at the cost of a linear scan.
+
+    Writes are copy-on-write: appends go into spare capacity of the matrix past the rows visible
+    to readers, and updates or deletions build a new matrix, so queries never see a partial write.
+
+    Queries can be filtered on metadata (see `rag.vectorstores.filters`). The values of the
+    `indexed_metadata` keys are indexed by posting lists, so a filtered query only scans the
+    matching rows instead of the whole matrix; conditions on other keys are checked on those rows.
+
+    If `persist_directory` is set, the store is loaded from `<persist_directory>/<collection_name>`
+    and written back there by `persist()`. With `mmap`, the matrix is memory-mapped instead of
+    read into memory, until the next write.
+
+    Args:
+        embedding_function: Embeddings of the documents and queries
+        persist_directory: Directory of the persisted collections, in memory only if None
+        collection_name: Name of the collection
+        mmap: Memory-map the persisted matrix
+        indexed_metadata: Metadata keys indexed for the filtered queries
+    """
+
+    VECTORS_FILE = 'vectors.npy'
+    DOCS_FILE = 'docs.json'
+    # Maximum size of the score matrix of a batch of queries
+    MAX_SCORES = 1 << 22
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        persist_directory: Optional[str] = None,
+        collection_name: str = 'langchain',
+        mmap: bool = False,
+        indexed_metadata: Sequence[str] = ('filename', 'element_type', 'page_number'),
+    ):
+        self._embedding_function = embedding_function
+        self.indexed_metadata = tuple(indexed_metadata)
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.mmap = mmap
+        self._snapshot = _EMPTY._replace(postings=_build_postings((), self.indexed_metadata))
+        self._buffer: Optional[np.ndarray] = None  # Backing array of the snapshot's vectors
+        self._lock = threading.Lock()
+        self._dirty = False
+        if persist_directory is not None:
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def __len__(self) -> int:
+        return len(self._snapshot.ids)
+
+    # Persistence
+
+    def _collection_dir(self) -> str:
+        return os.path.join(self.persist_directory, self.collection_name)
+
+    def _load(self):
+        vectors_path = os.path.join(self._collection_dir(), self.VECTORS_FILE)
+        docs_path = os.path.join(self._collection_dir(), self.DOCS_FILE)
+        if not (os.path.exists(vectors_path) and os.path.exists(docs_path)):
+            return
+        with open(docs_path, 'r') as f:
+            docs = json.load(f)
+        vectors = np.load(vectors_path, mmap_mode='r' if self.mmap else None)
+        ids = tuple(docs['ids'])
+        metadatas = tuple(docs['metadatas'])
+        snapshot = _Snapshot(
+            ids,
+            vectors,
+            tuple(docs['texts']),
+            metadatas,
+            {id: i for i, id in enumerate(ids)},
+            postings=_build_postings(metadatas, self.indexed_metadata),
+        )
+        self._snapshot = snapshot._replace(index=self._index_load(snapshot))
+        self._buffer = None if self.mmap else vectors
+
+    def persist(self):
+        """Write the store to the persist directory, if it changed since the last write"""
+        if self.persist_directory is None or not self._dirty:
+            return
+        with self._lock:
+            snapshot = self._snapshot
+            self._dirty = False
+        collection_dir = self._collection_dir()
+        os.makedirs(collection_dir, exist_ok=True)
+        # Written to temporary files first so that an interrupted write keeps the previous version
+        vectors_tmp = os.path.join(collection_dir, f'{self.VECTORS_FILE}.tmp')
+        docs_tmp = os.path.join(collection_dir, f'{self.DOCS_FILE}.tmp')
+        with open(vectors_tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(snapshot.vectors))
+        with open(docs_tmp, 'w') as f:
+            json.dump(
+                {'ids': snapshot.ids, 'texts': snapshot.texts, 'metadatas': snapshot.metadatas}, f
+            )
+        self._index_persist(snapshot)
+        os.replace(vectors_tmp, os.path.join(collection_dir, self.VECTORS_FILE))
+        os.replace(docs_tmp, os.path.join(collection_dir, self.DOCS_FILE))
+
+    # Hooks for subclasses maintaining a search structure along with the vectors, which is stored
+    # in the snapshots so that it is always consistent with them
+
+    def _index_append(self, previous: _Snapshot, snapshot: _Snapshot) -> Any:
+        """Index of the snapshot made of the rows of the previous snapshot followed by new rows"""
+        return None
+
+    def _index_subset(self, previous: _Snapshot, snapshot: _Snapshot, keep: List[int]) -> Any:
+        """Index of the snapshot made of the rows `keep` of the previous snapshot"""
+        return None
+
+    def _index_load(self, snapshot: _Snapshot) -> Any:
+        """Index of the snapshot loaded from the persist directory"""
+        return None
+
+    def _index_persist(self, snapshot: _Snapshot):
+        """Write the index of the snapshot to the persist directory"""
+
+    # Writes
+
+    def _append(self, snapshot: _Snapshot, vectors: np.ndarray) -> np.ndarray:
+        """Matrix of the snapshot's rows followed by the vectors. The rows are written to the spare
+        capacity of the buffer when possible, which readers of the snapshot never look at."""
+        n, dim = len(snapshot.ids), vectors.shape[1]
+        if n and snapshot.vectors.shape[1] != dim:
+            raise ValueError(f"Expected embeddings of dimension {snapshot.vectors.shape[1]}, got {dim}")
+        buffer = self._buffer
+        if buffer is None or buffer.shape[1] != dim or len(buffer) < n + len(vectors):
+            # Grow geometrically, so that appending in batches is amortized O(batch)
+            capacity = max(n + len(vectors), 2 * n, 1024)
+            buffer = np.empty((capacity, dim), dtype=np.float32)
+            if n:
+                buffer[:n] = snapshot.vectors
+            self._buffer = buffer
+        buffer[n : n + len(vectors)] = vectors
+        return buffer[: n + len(vectors)]
+
+    def add_embeddings(self, docs: List[Document], embeddings: List[List[float]]) -> List[str]:
+        """Add (or replace, by id) documents along with their precomputed embeddings"""
+        if not docs:
+            return []
+        ids = [doc.id if doc.id else str(uuid.uuid4()) for doc in docs]
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(docs), -1))
+
+        with self._lock:
+            snapshot = self._snapshot
+            # Last occurrence wins for duplicated ids, like an upsert
+            new = {id: i for i, id in enumerate(ids)}
+            replaced = [id for id in new if id in snapshot.rows]
+            if replaced:
+                # Rows visible to readers cannot be modified in place
+                snapshot = self._without(snapshot, set(replaced))
+            order = list(new.values())
+            matrix = self._append(snapshot, vectors[order])
+            metadatas = tuple(dict(docs[i].metadata) for i in order)
+            new_postings = _build_postings(metadatas, self.indexed_metadata, start=len(snapshot.ids))
+            new_snapshot = _Snapshot(
+                snapshot.ids + tuple(ids[i] for i in order),
+                matrix,
+                snapshot.texts + tuple(docs[i].page_content for i in order),
+                snapshot.metadatas + metadatas,
+                {**snapshot.rows, **{ids[i]: len(snapshot.ids) + j for j, i in enumerate(order)}},
+                postings=_merge_postings(snapshot.postings, new_postings),
+            )
+            self._snapshot = new_snapshot._replace(index=self._index_append(snapshot, new_snapshot))
+            self._dirty = True
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [None] * len(texts)
+        docs = [
+            Document(page_content=text, metadata=metadata or {}, id=id)
+            for text, metadata, id in zip(texts, metadatas, ids)
+        ]
+        return self.add_embeddings(docs, self._embedding_function.embed_documents(texts))
+
+    def add_documents(self, documents: List[Document], **kwargs: Any) -> List[str]:
+        ids = kwargs.get('ids')
+        if ids is not None:
+            documents = [
+                Document(page_content=doc.page_content, metadata=doc.metadata, id=id)
+                for doc, id in zip(documents, ids)
+            ]
+        return self.add_embeddings(
+            documents,
+            self._embedding_function.embed_documents([doc.page_content for doc in documents]),
+        )
+
+    def _without(self, snapshot: _Snapshot, ids: set) -> _Snapshot:
+        keep = [i for i, id in enumerate(snapshot.ids) if id not in ids]
+        vectors = np.ascontiguousarray(snapshot.vectors[keep], dtype=np.float32)
+        self._buffer = vectors
+        kept_ids = tuple(snapshot.ids[i] for i in keep)
+        metadatas = tuple(snapshot.metadatas[i] for i in keep)
+        new_snapshot = _Snapshot(
+            kept_ids,
+            vectors,
+            tuple(snapshot.texts[i] for i in keep),
+            metadatas,
+            {id: row for row, id in enumerate(kept_ids)},
+            postings=_build_postings(metadatas, self.indexed_metadata),
+        )
+        return new_snapshot._replace(index=self._index_subset(snapshot, new_snapshot, keep))
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return None
+        with self._lock:
+            ids = {id for id in ids if id in self._snapshot.rows}
+            if ids:
+                self._snapshot = self._without(self._snapshot, ids)
+                self._dirty = True
+        return True
+
+    def reset_collection(self):
+        with self._lock:
+            self._snapshot = _EMPTY._replace(postings=_build_postings((), self.indexed_metadata))
+            self._buffer = None
+            self._dirty = True
+
+    # Reads
+
+    def _document(self, snapshot: _Snapshot, row: int) -> Document:
+        return Document(
+            page_content=snapshot.texts[row],
+            metadata=dict(snapshot.metadatas[row]),
+            id=snapshot.ids[row],
+        )
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        snapshot = self._snapshot
+        return [self._document(snapshot, snapshot.rows[id]) for id in ids if id in snapshot.rows]
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Dict[str, List]:
+        """Documents matching the ids and metadata, in the format returned by Chroma's `get`"""
+        snapshot = self._snapshot
+        if ids is not None:
+            rows = [snapshot.rows[id] for id in ids if id in snapshot.rows]
+            rows = [row for row in rows if matches(snapshot.metadatas[row], where)]
+        elif where:
+            rows = self._filter_rows(snapshot, where).tolist()
+        else:
+            rows = range(len(snapshot.ids))
+        rows = rows[:limit]
+        return {
+            'ids': [snapshot.ids[row] for row in rows],
+            'documents': [snapshot.texts[row] for row in rows],
+            'metadatas': [dict(snapshot.metadatas[row]) for row in rows],
+        }
+
+    @staticmethod
+    def _query_vector(embedding: List[float]) -> np.ndarray:
+        query = np.asarray(embedding, dtype=np.float32)
+        return query / (np.linalg.norm(query) or 1.0)
+
+    def translate_filter(self, filters: Optional[Filters]) -> Optional[Filters]:
+        """Filters of the retrievers in the format of the store, used as is"""
+        if filters:
+            validate_filters(filters)
+        return filters or None
+
+    @staticmethod
+    def _filter_mask(snapshot: _Snapshot, filter: Filters, rows: np.ndarray) -> np.ndarray:
+        """Whether the metadata of each of the rows matches the filter"""
+        return np.fromiter(
+            (matches(snapshot.metadatas[row], filter) for row in rows), dtype=bool, count=len(rows)
+        )
+
+    def _filter_rows(self, snapshot: _Snapshot, filter: Filters) -> np.ndarray:
+        """Rows matching the filter, in increasing order. Conditions on the indexed metadata are
+        resolved with the posting lists, the others are checked on the remaining rows."""
+        rows = None
+        residual = {}
+        for key, condition in filter.items():
+            values = (snapshot.postings or {}).get(key)
+            if values is None:
+                residual[key] = condition
+                continue
+            if isinstance(condition, tuple):
+                lists = [value_rows for value, value_rows in values.items() if in_range(value, condition)]
+            elif isinstance(condition, list):
+                lists = [values[value] for value in set(condition) if value in values]
+            else:
+                lists = [values[condition]] if condition in values else []
+            if not lists:
+                return np.zeros(0, dtype=np.int64)
+            matched = lists[0] if len(lists) == 1 else np.sort(np.concatenate(lists))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        if rows is None:
+            rows = np.arange(len(snapshot.ids))
+        if residual:
+            rows = rows[self._filter_mask(snapshot, residual, rows)]
+        return rows
+
+    def _scan(
+        self, snapshot: _Snapshot, rows: Optional[np.ndarray], query: np.ndarray, k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact top k among the rows (all the rows if None)"""
+        if rows is None:
+            scores = snapshot.vectors @ query
+            best = _best(scores, k)
+            return best, scores[best]
+        scores = snapshot.vectors[rows] @ query
+        best = _best(scores, k)
+        return rows[best], scores[best]
+
+    def _top_k(
+        self, snapshot: _Snapshot, embedding: List[float], k: int, filter: Optional[Filters]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows and cosine similarities of the k most similar vectors, best first"""
+        if not snapshot.ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = self._filter_rows(snapshot, filter) if filter else None
+        return self._scan(snapshot, rows, self._query_vector(embedding), k)
+
+    def _scan_batch(
+        self, snapshot: _Snapshot, rows: Optional[np.ndarray], queries: np.ndarray, k: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """`_scan` of several queries, scored together as a matrix product"""
+        vectors = snapshot.vectors if rows is None else snapshot.vectors[rows]
+        results = []
+        # Blocks of queries bound the size of the score matrix
+        block = max(1, self.MAX_SCORES // max(len(vectors), 1))
+        for start in range(0, len(queries), block):
+            for scores in queries[start : start + block] @ vectors.T:
+                best = _best(scores, k)
+                results.append((best if rows is None else rows[best], scores[best]))
+        return results
+
+    def _top_k_batch(
+        self, snapshot: _Snapshot, embeddings: List[List[float]], k: int, filter: Optional[Filters]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """`_top_k` of several queries, the filter being resolved once for all of them"""
+        if not snapshot.ids:
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32))] * len(embeddings)
+        rows = self._filter_rows(snapshot, filter) if filter else None
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        return self._scan_batch(snapshot, rows, queries, k)
+
+    def similarity_search_batch_with_vectors(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[List[Document], np.ndarray]]:
+        """Documents of the k most similar vectors of each embedding, along with these vectors"""
+        if len(embeddings) == 0:
+            return []
+        snapshot = self._snapshot
+        return [
+            ([self._document(snapshot, row) for row in rows], np.asarray(snapshot.vectors[rows]))
+            for rows, _ in self._top_k_batch(snapshot, embeddings, k, filter)
+        ]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        snapshot = self._snapshot
+        rows, scores = self._top_k(snapshot, embedding, k, filter)
+        return [(self._document(snapshot, row), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_batch_with_score_by_vectors(
+        self, embeddings: List[List[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        """Documents and cosine similarities of the k most similar vectors of each embedding"""
+        if len(embeddings) == 0:
+            return []
+        snapshot = self._snapshot
+        return [
+            [(self._document(snapshot, row), float(score)) for row, score in zip(rows, scores)]
+            for rows, scores in self._top_k_batch(snapshot, embeddings, k, filter)
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self._embedding_function.embed_query(query), k, filter
+        )
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Scores are already cosine similarities, higher is more relevant
+        return lambda score: score
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        snapshot = self._snapshot
+        rows, _ = self._top_k(snapshot, embedding, fetch_k, filter)
+        if len(rows) == 0:
+            return []
+        selected = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            snapshot.vectors[rows],
+            k=k,
+            lambda_mult=lambda_mult,
+        )
+        return [self._document(snapshot, rows[i]) for i in selected]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self._embedding_function.embed_query(query), k, fetch_k, lambda_mult, filter
+        )
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> 'NumpyVectorStore':
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,118 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from test.test_query_batch import NOTES, QUERIES
+from test.test_streaming import ANSWER, StubOllamaChatHandler
+
+
+class TextIngestor:
+    def load_text(self, text):
+        from langchain_core.documents import Document
+
+        return [Document(page_content=text, metadata={'filename': 'text'})]
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('langchain_ollama') and importlib.util.find_spec('weave'),
+    'langchain_ollama or weave is not installed',
+)
+class TestAsyncQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaChatHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        self.server.prompts = []
+        self.server.token_delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_concurrent_queries_match_sync_queries(self):
+        from langchain_core.documents import Document
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.hybrid import HybridRetriever
+        from rag.retrievers.retriever import SimpleRetriever
+
+        docs = [Document(page_content=note, metadata={'filename': f'{i % 2}.md'}) for i, note in enumerate(NOTES)]
+        chunker = NativeBasicChunking(max_characters=100, overlap=0)
+        for retriever in (
+            SimpleRetriever(model='stub', k=3, vector_store='numpy', chunker=chunker),
+            HybridRetriever(model='stub', k=3, vector_store='numpy', chunker=chunker, query_cache={}),
+        ):
+            retriever.add_docs(docs)
+            expected = [[doc.page_content for doc in retriever.query(query)] for query in QUERIES]
+            retriever.clear_query_cache()
+
+            async def run():
+                return await asyncio.gather(*(retriever.aquery(query) for query in QUERIES))
+
+            self.server.delay = 0.2
+            start = time.perf_counter()
+            results = asyncio.run(run())
+            # The embedding requests are in flight together
+            self.assertLess(time.perf_counter() - start, self.server.delay * len(QUERIES))
+            self.server.delay = 0
+            self.assertEqual([[doc.page_content for doc in docs] for docs in results], expected)
+            retriever.reset_index()
+
+    def test_generator_aquery(self):
+        from rag.generators.generator import ResponseGenerator
+
+        generator = ResponseGenerator(model='stub')
+
+        async def run():
+            return await asyncio.gather(*(generator.aquery(query, ['RRF fuses rankings']) for query in QUERIES))
+
+        responses = asyncio.run(run())
+        self.assertEqual([response.content for response in responses], [''.join(ANSWER)] * len(QUERIES))
+
+    def test_queries_are_served_during_ingestion(self):
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.generators.generator import ResponseGenerator
+        from rag.rag import RAG
+        from rag.retrievers.retriever import SimpleRetriever
+
+        retriever = SimpleRetriever(
+            model='stub',
+            k=1,
+            vector_store='numpy',
+            chunker=NativeBasicChunking(max_characters=100, overlap=0),
+            query_cache={},
+        )
+        rag = RAG(retriever, ResponseGenerator(model='stub'), TextIngestor())
+        rag.ingest(text='RRF fuses rankings')
+        rag.query('What is RRF?')
+
+        async def run():
+            self.server.delay = 0.3
+            ingestion = asyncio.create_task(rag.aingest(text='BM25 scores terms'))
+            # Served (here from the query cache) while the new chunks are being embedded
+            response, contexts = await rag.aquery('What is RRF?')
+            self.assertFalse(ingestion.done())
+            await ingestion
+            return response, contexts
+
+        response, contexts = asyncio.run(run())
+        self.assertEqual(response.content, ''.join(ANSWER))
+        self.assertEqual(contexts, ['RRF fuses rankings'])
+        self.assertEqual(len(retriever.vector_db.get()['ids']), 2)
+        # The index changed, the cached query is retrieved again
+        self.assertEqual(rag.query('What is RRF?')[1], ['BM25 scores terms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
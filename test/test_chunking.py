@@ -0,0 +1,87 @@
+import glob
+import importlib.util
+import os
+import unittest
+
+from rag.chunkers.chunking import chunk_basic, chunk_by_title
+
+
+def element(text, element_type='NarrativeText', filename='notes.md'):
+    return text, element_type, {'filename': filename, 'languages': ['eng']}
+
+
+class TestChunking(unittest.TestCase):
+
+    def test_basic_combines_up_to_max_characters(self):
+        elements = [element('a' * 40), element('b' * 40), element('c' * 40)]
+        chunks = chunk_basic(elements, max_characters=100)
+        self.assertEqual([text for text, _, _ in chunks], ['a' * 40 + '\n\n' + 'b' * 40, 'c' * 40])
+        self.assertTrue(all(element_type == 'CompositeElement' for _, element_type, _ in chunks))
+
+    def test_oversized_element_is_split_with_overlap(self):
+        text = ' '.join(f'word{i:02d}' for i in range(30))  # 30 words of 6 chars
+        chunks = chunk_basic([element(text)], max_characters=50, overlap=10)
+        self.assertTrue(all(len(chunk) <= 50 for chunk, _, _ in chunks))
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertIn(previous[0][-10:].strip(), current[0][:20])
+        # Nothing is lost
+        words = {w for chunk, _, _ in chunks for w in chunk.split()}
+        self.assertTrue(all(f'word{i:02d}' in ' '.join(words) for i in range(30)))
+
+    def test_tables_are_isolated(self):
+        elements = [element('intro'), element('a b c', 'Table'), element('outro')]
+        chunks = chunk_basic(elements, max_characters=100)
+        self.assertEqual([t for _, t, _ in chunks], ['CompositeElement', 'Table', 'CompositeElement'])
+
+    def test_by_title_starts_sections_on_titles_and_sources(self):
+        elements = [
+            element('Title 1', 'Title'), element('x' * 50),
+            element('Title 2', 'Title'), element('y' * 50),
+            element('z' * 50, filename='other.md'),
+        ]
+        chunks = chunk_by_title(elements, max_characters=200, combine_text_under_n_chars=0)
+        self.assertEqual(
+            [text for text, _, _ in chunks],
+            ['Title 1\n\n' + 'x' * 50, 'Title 2\n\n' + 'y' * 50, 'z' * 50],
+        )
+        self.assertEqual(chunks[2][2]['filename'], 'other.md')
+
+    def test_by_title_combines_small_sections(self):
+        elements = [element('T1', 'Title'), element('short'), element('T2', 'Title'), element('short too')]
+        chunks = chunk_by_title(elements, max_characters=200, combine_text_under_n_chars=50)
+        self.assertEqual(len(chunks), 1)
+
+    def test_metadata_is_consolidated_without_mutating_elements(self):
+        elements = [
+            ('Title', 'Title', {'filename': 'a.md', 'category_depth': 0, 'languages': ['eng']}),
+            ('text', 'NarrativeText', {'filename': 'a.md', 'parent_id': 'x', 'languages': ['fra']}),
+        ]
+        (_, _, metadata), = chunk_by_title(elements, max_characters=200)
+        self.assertEqual(metadata, {'filename': 'a.md', 'languages': ['eng', 'fra']})
+        self.assertEqual(elements[1][2]['parent_id'], 'x')
+
+    @unittest.skipUnless(importlib.util.find_spec('unstructured'), 'unstructured is not installed')
+    def test_equivalent_to_unstructured(self):
+        from rag.chunkers.native_chunker import NativeByTitleChunking
+        from rag.chunkers.unstructured_chunker import ByTitleChunking
+        from rag.ingestors.ingestor import FastIngestor
+
+        corpus_dir = os.path.join(os.path.dirname(__file__), '..', 'corpus', 'intro-to-ml-notes')
+        params = dict(
+            max_characters=1500, new_after_n_chars=1000, combine_text_under_n_characters=300, overlap=0
+        )
+        for path in glob.glob(os.path.join(corpus_dir, '*.md')):
+            with self.subTest(path=path):
+                docs = FastIngestor(num_workers=1).load_file(path)
+                expected = ByTitleChunking(**params).chunk(docs)
+                actual = NativeByTitleChunking(**params).chunk(docs)
+                # Same text (the overlap is disabled so it is not repeated) in about as many chunks
+                self.assertEqual(
+                    ''.join(''.join(d.page_content.split()) for d in actual),
+                    ''.join(''.join(d.page_content.split()) for d in expected),
+                )
+                self.assertLessEqual(abs(len(actual) - len(expected)), max(1, len(expected) // 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from langchain_core.documents import Document
+
+from rag.chunkers.chunking import chunk_basic
+from rag.generators.context_packer import ContextPacker
+
+NOTE = (
+    'Reciprocal rank fusion merges the rankings of the dense and lexical retrievers. '
+    'Each chunk is scored by the sum of one over the rank offset plus its rank. '
+    'The offset flattens the ranks, so that no single ranking dominates the fusion.'
+)
+
+
+def chunks(text, filename, max_characters=100, overlap=40):
+    return [
+        Document(page_content=chunk, metadata={'filename': filename})
+        for chunk, _, _ in chunk_basic([(text, 'NarrativeText', {})], max_characters=max_characters, overlap=overlap)
+    ]
+
+
+class TestContextPacker(unittest.TestCase):
+
+    def test_strips_overlaps_of_the_same_source(self):
+        docs = chunks(NOTE, 'rrf.md')
+        self.assertGreater(len(docs), 2)
+        packer = ContextPacker(max_tokens=None)
+        # Retrieved out of order
+        packed = packer.pack([docs[1], docs[0], docs[2]])
+        self.assertEqual(len(packed.texts), 3)
+        for text in packed.texts:
+            self.assertIn(text, NOTE)
+        # Without the overlaps, the chunks in the order of the note add up to its beginning
+        in_order = ''.join(packed.texts[i] for i in (1, 0, 2)).replace(' ', '')
+        self.assertTrue(NOTE.replace(' ', '').startswith(in_order))
+        self.assertLess(len(in_order), sum(len(doc.page_content) for doc in docs[:3]))
+        self.assertGreater(packed.saved_tokens, 0)
+
+        # Chunks of different sources are not stripped
+        other = Document(page_content=docs[1].page_content + ' And more.', metadata={'filename': 'other.md'})
+        packed = ContextPacker(max_tokens=None, dedup_threshold=None).pack([docs[0], other])
+        self.assertEqual(packed.texts[1], other.page_content)
+
+    def test_drops_duplicates_and_fits_budget(self):
+        md = Document(page_content=NOTE, metadata={'filename': 'rrf.md'})
+        txt = Document(page_content=NOTE.replace('fusion.', 'fusion!') + '\n', metadata={'filename': 'rrf.txt'})
+        contained = Document(page_content=NOTE[:60], metadata={'filename': 'rrf.txt'})
+        other = Document(page_content='BM25 scores the chunks by their terms.', metadata={'filename': 'bm25.md'})
+        packer = ContextPacker(max_tokens=None)
+        packed = packer.pack([md, txt, contained, other])
+        self.assertEqual(packed.texts, [NOTE, other.page_content])
+        self.assertEqual(packed.dropped, 2)
+
+        # The best chunk which does not fit is skipped, the smaller next one still fits
+        budget = packer.counter.count(other.page_content) + 5
+        packed = ContextPacker(max_tokens=budget).pack([md, other])
+        self.assertEqual(packed.texts, [other.page_content])
+        self.assertLessEqual(packed.tokens, budget)
+        self.assertEqual(packed.saved_tokens, packer.counter.count(NOTE))
+
+        # Plain texts are deduplicated too
+        packed = ContextPacker().pack([NOTE, NOTE.upper(), 'BM25'])
+        self.assertEqual(packed.texts, [NOTE, 'BM25'])
+        self.assertEqual(packer.stats()['queries'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from rag.common.lru import LRUCache
+from rag.embeddings.store import EmbeddingStore
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+
+class TestEmbeddingStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'cache', 'embeddings.sqlite')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip_is_keyed_by_model(self):
+        store = EmbeddingStore(self.path)
+        store.put_many('model-a', [('h1', [0.5, 1.0]), ('h2', [2.0, -1.0])])
+        self.assertEqual(store.get_many('model-a', ['h1', 'h2', 'h3']), {'h1': [0.5, 1.0], 'h2': [2.0, -1.0]})
+        self.assertEqual(store.get_many('model-b', ['h1']), {})
+        store.close()
+
+        # Persisted across instances
+        reopened = EmbeddingStore(self.path)
+        self.assertEqual(len(reopened), 2)
+        reopened.close()
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        from langchain_core.embeddings import Embeddings
+
+        class CountingEmbeddings(Embeddings):
+            def __init__(self):
+                self.embedded = []
+
+            def embed_documents(self, texts):
+                self.embedded.extend(texts)
+                return [[float(len(text)), 1.0] for text in texts]
+
+            def embed_query(self, text):
+                return self.embed_documents([text])[0]
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'embeddings.sqlite')
+        self.counting_embeddings_cls = CountingEmbeddings
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_only_misses_are_embedded(self):
+        from rag.embeddings.cached import CachedEmbeddings
+
+        inner = self.counting_embeddings_cls()
+        embeddings = CachedEmbeddings(inner, 'model', store=EmbeddingStore(self.path))
+        first = embeddings.embed_documents(['a', 'bb', 'a'])
+        self.assertEqual(inner.embedded, ['a', 'bb'])
+        self.assertEqual(embeddings.embed_documents(['bb', 'ccc']), [first[1], [3.0, 1.0]])
+        self.assertEqual(inner.embedded, ['a', 'bb', 'ccc'])
+        self.assertEqual(embeddings.stats()['misses'], 4)
+
+        # A new process (empty LRU) reuses the vectors stored on disk
+        inner = self.counting_embeddings_cls()
+        embeddings = CachedEmbeddings(inner, 'model', store=EmbeddingStore(self.path))
+        self.assertEqual(embeddings.embed_documents(['a', 'bb', 'ccc']), first[:2] + [[3.0, 1.0]])
+        self.assertEqual(inner.embedded, [])
+        self.assertEqual(embeddings.stats(), {'hits': 3, 'misses': 0, 'hit_rate': 1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
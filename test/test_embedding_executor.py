@@ -0,0 +1,110 @@
+import asyncio
+import importlib.util
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Emulates Ollama's /api/embed, embedding each text as [len(text), 1.0]"""
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.batch_sizes.append(len(body['input']))
+            fail = server.failures > 0
+            server.failures -= 1
+        try:
+            time.sleep(server.delay)
+            if fail:
+                self.send_response(503)
+                self.end_headers()
+                return
+            payload = json.dumps({
+                'model': body['model'],
+                'embeddings': [[float(len(text)), 1.0] for text in body['input']],
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+@unittest.skipUnless(importlib.util.find_spec('langchain_ollama'), 'langchain_ollama is not installed')
+class TestBatchedEmbeddings(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.batch_sizes = []
+        self.server.failures = 0
+        self.server.delay = 0.05
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_executor(self, **kwargs):
+        from langchain_ollama import OllamaEmbeddings
+        from rag.embeddings.executor import BatchedEmbeddings
+
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        return BatchedEmbeddings(OllamaEmbeddings(model='stub', base_url=base_url), **kwargs)
+
+    def test_batches_concurrently_in_order(self):
+        executor = self.make_executor(batch_size=4, max_concurrency=3)
+        texts = ['x' * i for i in range(1, 31)]
+        vectors = executor.embed_documents(texts)
+
+        self.assertEqual([v[0] for v in vectors], [float(i) for i in range(1, 31)])
+        self.assertEqual(sorted(self.server.batch_sizes), [2] + [4] * 7)
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+        stats = executor.stats()
+        self.assertEqual((stats['embedded'], stats['requests']), (30, 8))
+        self.assertGreater(stats['embeddings_per_sec'], 0)
+        executor.close()
+
+    def test_retries_failed_batches(self):
+        self.server.failures = 2
+        executor = self.make_executor(batch_size=8, max_retries=2, backoff=0.01)
+        self.assertEqual(executor.embed_documents(['a', 'bb']), [[1.0, 1.0], [2.0, 1.0]])
+        self.assertEqual(executor.stats()['retries'], 2)
+
+        self.server.failures = 2
+        executor.max_retries = 1
+        with self.assertRaises(Exception):
+            executor.embed_documents(['a'])
+        executor.close()
+
+    def test_sync_and_async_within_running_loop(self):
+        executor = self.make_executor(batch_size=2)
+
+        async def main():
+            sync_vector = executor.embed_query('abc')
+            async_vectors = await executor.aembed_documents(['a', 'bb', 'ccc'])
+            return sync_vector, async_vectors
+
+        sync_vector, async_vectors = asyncio.run(main())
+        self.assertEqual(sync_vector, [3.0, 1.0])
+        self.assertEqual(async_vectors, [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]])
+        executor.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import contextlib
+import importlib.util
+import io
+import time
+import unittest
+
+from langchain_core.documents import Document
+
+from rag.evaluation.executor import EvaluationExecutor
+
+
+class Tracker:
+    """Awaits the delay, recording the maximum number of concurrent calls"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = self.max_in_flight = self.calls = 0
+
+    async def __call__(self):
+        self.in_flight += 1
+        self.calls += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+
+class FakeRetriever:
+    def __init__(self, delay=0.0):
+        self.tracker = Tracker(delay)
+
+    async def aquery(self, query):
+        await self.tracker()
+        return [Document(page_content=f'context of {query}')]
+
+
+class FakeGenerator:
+    def __init__(self, delay=0.0):
+        self.tracker = Tracker(delay)
+
+    async def aquery(self, query, context):
+        await self.tracker()
+        if query == 'fail':
+            raise RuntimeError('generation failed')
+        return f'{query}: {context[0]}'
+
+
+class SyncGenerator:
+    def query(self, query, context):
+        return f'{query}: {context[0]}'
+
+
+class TestEvaluationExecutor(unittest.TestCase):
+
+    def test_stages_run_concurrently_within_their_limits(self):
+        retriever, generator = FakeRetriever(0.05), FakeGenerator(0.1)
+        rows = [{'input': f'query {i}'} for i in range(20)]
+        executor = EvaluationExecutor(retrieval_concurrency=10, generation_concurrency=4, progress_interval=0.2)
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            results = asyncio.run(executor.predict_generator(generator, rows, retriever=retriever))
+        elapsed = time.perf_counter() - start
+
+        # Bounded by the slowest stage (5 rounds of 4 generations), not the sum of the latencies (3 s)
+        self.assertLess(elapsed, 1.5)
+        self.assertEqual(retriever.tracker.max_in_flight, 10)
+        self.assertEqual(generator.tracker.max_in_flight, 4)
+
+        self.assertEqual([result['row']['input'] for result in results], [row['input'] for row in rows])
+        self.assertEqual(results[3]['output'], 'query 3: context of query 3')
+        self.assertEqual(rows[3]['retrieval_context'], ['context of query 3'])
+        stats = executor.stats()
+        self.assertEqual(set(stats), {'retrieval', 'generation'})
+        self.assertEqual((stats['retrieval']['completed'], stats['generation']['completed']), (20, 20))
+        self.assertGreater(stats['generation']['throughput'], 0)
+
+        lines = output.getvalue().splitlines()
+        self.assertGreater(len(lines), 1)  # Reported while running, and at the end
+        self.assertTrue(lines[-1].startswith('[Gen] 20/20 rows'))
+        self.assertIn('generation 20 done, 0 in flight', lines[-1])
+
+        # Rows with a context are not retrieved again
+        asyncio.run(executor.predict_generator(generator, rows[:2], retriever=retriever))
+        self.assertEqual(retriever.tracker.calls, 20)
+
+    def test_failures_are_recorded_per_row(self):
+        rows = [{'input': 'a', 'retrieval_context': ['ctx']}, {'input': 'fail', 'retrieval_context': ['ctx']}]
+        executor = EvaluationExecutor(progress_interval=None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(executor.predict_generator(FakeGenerator(), rows + [{'input': 'b'}]))
+            sync_results = asyncio.run(executor.predict_generator(SyncGenerator(), rows[:1]))
+
+        self.assertEqual((results[0]['output'], results[0]['error']), ('a: ctx', None))
+        self.assertIn('generation failed', results[1]['error'])
+        self.assertIn('no retriever', results[2]['error'])
+        self.assertEqual(sync_results[0]['output'], 'a: ctx')
+
+        with self.assertRaises(ValueError):
+            EvaluationExecutor(generation_concurrency=0)
+
+    def test_retriever_predictions_are_the_contexts(self):
+        executor = EvaluationExecutor(progress_interval=None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(executor.predict_retriever(FakeRetriever(), [{'input': 'q'}]))
+        self.assertEqual(results[0]['output'], ['context of q'])
+
+    @unittest.skipUnless(importlib.util.find_spec('weave'), 'weave is not installed')
+    def test_weave_scores_the_precomputed_outputs(self):
+        import weave
+        from rag.evaluation.precomputed import PrecomputedModel
+
+        @weave.op()
+        def exact(output, expected_output):
+            return {'score': float(output == expected_output)}
+
+        rows = [
+            {'input': 'a', 'retrieval_context': ['ctx'], 'expected_output': 'a: ctx'},
+            {'input': 'b', 'retrieval_context': ['ctx'], 'expected_output': 'other'},
+            {'input': 'fail', 'retrieval_context': ['ctx'], 'expected_output': ''},
+        ]
+        generator = FakeGenerator()
+        evaluation = weave.Evaluation(dataset=weave.Dataset(name='eval_data', rows=rows), scorers=[exact])
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            results = asyncio.run(EvaluationExecutor(progress_interval=None).predict_generator(generator, rows))
+            summary = asyncio.run(evaluation.evaluate(PrecomputedModel(generator, results)))
+
+        self.assertEqual(generator.tracker.calls, 3)  # Not generated again by weave
+        self.assertEqual(summary['exact']['score']['mean'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import importlib.util
+import os
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from rag.retrievers.bm25 import BM25Index, tokenize
+from test.test_embedding_executor import StubOllamaHandler
+
+NOTES = [
+    'Export scikit-learn models to ONNX with sklearn-onnx.',
+    'Gradient boosting builds an ensemble of weak learners.',
+    'Call predict_proba to get the class probabilities of a classifier.',
+    'ONNX runtime runs models exported from many frameworks.',
+]
+
+
+class TestBM25Index(unittest.TestCase):
+
+    def test_tokenize_keeps_identifiers(self):
+        self.assertEqual(tokenize('Use sklearn-onnx!'), ['use', 'sklearn-onnx', 'sklearn', 'onnx'])
+
+    def test_ranks_exact_identifiers_first(self):
+        index = BM25Index()
+        index.add([f'id{i}' for i in range(len(NOTES))], NOTES)
+        results = index.search('sklearn-onnx', k=3)
+        self.assertEqual(results[0][0], 'id0')
+        self.assertEqual([id for id, _ in index.search('predict_proba', k=3)], ['id2'])
+        self.assertEqual(index.search('unknown words', k=3), [])
+
+    def test_incremental_updates_and_compaction(self):
+        index = BM25Index()
+        index.add(['a', 'b', 'c'], NOTES[:3])
+        index.add(['d'], NOTES[3:])
+        self.assertEqual({id for id, _ in index.search('onnx', k=5)}, {'a', 'd'})
+
+        index.add(['a'], ['Nothing relevant here'])  # Replaces a
+        index.remove(['d'])
+        self.assertEqual(index.search('onnx', k=5), [])
+        index.remove(['b'])  # Most of the documents are deleted, compacts the postings
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(index._doc_ids), 2)
+        self.assertEqual([id for id, _ in index.search('probabilities', k=5)], ['c'])
+
+
+@unittest.skipUnless(
+    all(importlib.util.find_spec(name) for name in ('weave', 'langchain_ollama')),
+    'weave or langchain_ollama is not installed',
+)
+class TestHybridRetriever(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fuses_dense_and_lexical(self):
+        from langchain_core.documents import Document
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.hybrid import HybridRetriever, reciprocal_rank_fusion
+
+        self.assertEqual(
+            [id for id, _ in reciprocal_rank_fusion([['a', 'b', 'c'], ['b', 'c']], k=60)], ['b', 'c', 'a']
+        )
+
+        retriever = HybridRetriever(model='stub', k=2, fetch_k=4, vector_store='numpy', chunker=NativeBasicChunking(max_characters=80, overlap=0))
+        ids = retriever.add_docs([Document(page_content=note, metadata={'filename': 'notes.md'}) for note in NOTES])
+        self.assertEqual(len(ids), len(NOTES))
+        # The stub embeddings are meaningless, the exact identifier is found by BM25
+        self.assertIn('predict_proba', retriever.query('predict_proba')[0].page_content)
+
+        retriever.delete_docs([ids[2]])
+        self.assertNotIn('predict_proba', ' '.join(doc.page_content for doc in retriever.query('predict_proba')))
+
+        # Filtered queries only return chunks of the matching sources, from both lookups
+        retriever.add_docs([Document(page_content='calibrate predict_proba outputs', metadata={'filename': 'other.md'})])
+        filtered = retriever.query('predict_proba', filters={'filename': 'other.md'})
+        self.assertEqual([doc.metadata['filename'] for doc in filtered], ['other.md'])
+
+    def test_rebuilt_retrievers_do_not_leak_threads(self):
+        import threading
+
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.hybrid import HybridRetriever
+
+        retrievers = []
+
+        def rebuild():
+            retriever = HybridRetriever(model='stub', k=1, vector_store='numpy', chunker=NativeBasicChunking())
+            retriever.query('predict_proba')
+            retrievers.append(retriever)  # E.g. still referenced by a previous evaluation
+
+        rebuild()
+        threads = threading.active_count()
+        for _ in range(5):
+            rebuild()
+        # The searches share the threads of one pool
+        self.assertLessEqual(threading.active_count(), threads + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
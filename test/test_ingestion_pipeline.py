@@ -0,0 +1,109 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from langchain_core.documents import Document
+
+from rag.ingestors.ingestor import FastIngestor
+from rag.ingestors.pipeline import IngestionPipeline
+
+
+class StubIngestor:
+    """Yields one document per file, with the name of the file as content"""
+
+    def iter_files(self, files):
+        for file in files:
+            yield [Document(page_content=file, metadata={'filename': file})]
+
+
+class StubRetriever:
+    """Splits each document in `chunks_per_doc` chunks, and raises in the `failing` stage"""
+
+    def __init__(self, chunks_per_doc=5, failing=None, delay=0.0):
+        self.chunks_per_doc = chunks_per_doc
+        self.failing = failing
+        self.delay = delay
+        self.embed_batches = []
+
+    def is_persistent(self):
+        return False
+
+    def _call(self, stage):
+        time.sleep(self.delay)
+        if stage == self.failing:
+            raise RuntimeError(f'{stage} failed')
+
+    def chunk_docs(self, docs):
+        self._call('chunk')
+        return [
+            Document(page_content=f"{doc.page_content}#{i}", metadata=doc.metadata)
+            for doc in docs
+            for i in range(self.chunks_per_doc)
+        ]
+
+    def embed_docs(self, chunks):
+        self._call('embed')
+        self.embed_batches.append(len(chunks))
+        return [[float(len(chunk.page_content))] for chunk in chunks]
+
+    def index_docs(self, chunks, embeddings):
+        self._call('index')
+        return [chunk.page_content for chunk in chunks]
+
+
+class TestIngestionPipeline(unittest.TestCase):
+
+    def test_chunk_ids_are_attributed_to_their_file(self):
+        files = ['a.md', 'b.md', 'c.md']
+        retriever = StubRetriever(chunks_per_doc=5)
+        pipeline = IngestionPipeline(StubIngestor(), retriever, queue_size=1, embed_batch_size=2)
+
+        ids_by_file = pipeline._run(files)
+
+        self.assertEqual(retriever.embed_batches, [2, 2, 1] * 3)  # Several embed batches per file
+        self.assertEqual(ids_by_file, {file: [f'{file}#{i}' for i in range(5)] for file in files})
+        self.assertEqual(pipeline.ingest_files(files), [id for file in files for id in ids_by_file[file]])
+
+    def test_stage_errors_are_raised_without_deadlock(self):
+        files = [f'{i}.md' for i in range(20)]
+        for stage in ('chunk', 'embed', 'index'):
+            with self.subTest(stage=stage):
+                # Small queues and batches, so that the queues are full when the stage fails
+                retriever = StubRetriever(chunks_per_doc=10, failing=stage, delay=0.001)
+                pipeline = IngestionPipeline(StubIngestor(), retriever, queue_size=1, embed_batch_size=1)
+                errors = []
+
+                def run():
+                    try:
+                        pipeline.ingest_files(files)
+                    except RuntimeError as e:
+                        errors.append(e)
+
+                thread = threading.Thread(target=run, daemon=True)
+                thread.start()
+                thread.join(timeout=10)
+                self.assertFalse(thread.is_alive(), 'The pipeline is deadlocked')
+                self.assertEqual([str(e) for e in errors], [f'{stage} failed'])
+
+    def test_parallel_partitioning_keeps_the_file_order(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files = []
+            # The first files are the longest to partition, so they complete last
+            for i, sections in enumerate((400, 200, 1, 1, 50, 1)):
+                file = os.path.join(tmp_dir, f'note{i}.md')
+                with open(file, 'w') as f:
+                    f.write('\n\n'.join(f'## Section {j}\n\nAbout note {i}.' for j in range(sections)))
+                files.append(file)
+
+            ingestor = FastIngestor(num_workers=3, max_pending=3)
+            docs_by_file = list(ingestor.iter_files(files))
+
+        self.assertEqual(len(docs_by_file), len(files))
+        for file, docs in zip(files, docs_by_file):
+            self.assertEqual({doc.metadata['filename'] for doc in docs}, {os.path.basename(file)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import importlib.util
+import tempfile
+import unittest
+
+import numpy as np
+
+
+def clustered_vectors(n, dim=32, n_clusters=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    return (centers[rng.integers(n_clusters, size=n)] + 0.3 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+@unittest.skipUnless(importlib.util.find_spec('langchain_core'), 'langchain_core is not installed')
+class TestIVFVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def make_store(self, **kwargs):
+        from rag.vectorstores.ivf_store import IVFVectorStore
+
+        return IVFVectorStore(None, nlist=32, nprobe=4, min_train_size=500, **kwargs)
+
+    def add(self, store, vectors, start=0):
+        from langchain_core.documents import Document
+
+        docs = [Document(page_content=str(start + i), id=str(start + i)) for i in range(len(vectors))]
+        return store.add_embeddings(docs, vectors)
+
+    def test_exact_until_trained_then_high_recall(self):
+        vectors = clustered_vectors(3000)
+        store = self.make_store()
+        self.add(store, vectors[:400])
+        self.assertIsNone(store._snapshot.index)  # Too small, searched exhaustively
+
+        # Incremental inserts are assigned to the lists once trained
+        for start in range(400, 3000, 650):
+            self.add(store, vectors[start : start + 650], start)
+        index = store._snapshot.index
+        self.assertEqual(len(index.centroids), 32)
+        self.assertEqual(sorted(np.concatenate(index.lists).tolist()), list(range(3000)))
+
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.choice(3000, 50)] + 0.3 * rng.normal(size=(50, 32)).astype(np.float32)
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        recalls = []
+        for query in queries:
+            exact = set(np.argsort(-(normalized @ query))[:10].astype(str))
+            found = {doc.id for doc in store.similarity_search_by_vector(query.tolist(), k=10)}
+            recalls.append(len(exact & found) / 10)
+        self.assertGreater(np.mean(recalls), 0.9)
+
+    def test_delete_and_persist(self):
+        vectors = clustered_vectors(1000)
+        store = self.make_store(persist_directory=self.tmp_dir.name)
+        self.add(store, vectors)
+        store.delete(['0'])
+        self.assertNotIn('0', {doc.id for doc in store.similarity_search_by_vector(vectors[0].tolist(), k=5)})
+        store.persist()
+
+        reloaded = self.make_store(persist_directory=self.tmp_dir.name)
+        np.testing.assert_array_equal(reloaded._snapshot.index.centroids, store._snapshot.index.centroids)
+        query = vectors[1].tolist()
+        self.assertEqual(
+            [doc.id for doc in reloaded.similarity_search_by_vector(query, k=5)],
+            [doc.id for doc in store.similarity_search_by_vector(query, k=5)],
+        )
+        self.assertEqual(reloaded.similarity_search_by_vector(query, k=1)[0].id, '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from rag.common.hashing import hash_file
+from rag.ingestors.manifest import IngestionManifest
+
+
+class TestIngestionManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.tmp_dir.name
+        self.manifest_path = os.path.join(self.dir, 'cache', 'manifest.json')
+        self.notes_dir = os.path.join(self.dir, 'notes')
+        os.makedirs(self.notes_dir)
+        self.note = os.path.join(self.notes_dir, 'note.md')
+        with open(self.note, 'w') as f:
+            f.write('# Title\n\nSome text')
+        self.chunker_params = {'name': 'ByTitleChunking', 'max_characters': 250}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_is_current_after_reload(self):
+        manifest = IngestionManifest(self.manifest_path)
+        manifest.set(self.note, hash_file(self.note), self.chunker_params, ['a', 'b'])
+        manifest.save()
+
+        reloaded = IngestionManifest(self.manifest_path)
+        self.assertTrue(reloaded.is_current(self.note, hash_file(self.note), self.chunker_params))
+        self.assertEqual(reloaded.get(self.note)['chunk_ids'], ['a', 'b'])
+
+    def test_changed_content_or_params_is_not_current(self):
+        manifest = IngestionManifest(self.manifest_path)
+        manifest.set(self.note, hash_file(self.note), self.chunker_params, ['a'])
+
+        with open(self.note, 'a') as f:
+            f.write('\n\nMore text')
+        self.assertFalse(manifest.is_current(self.note, hash_file(self.note), self.chunker_params))
+
+        changed_params = {**self.chunker_params, 'max_characters': 500}
+        manifest.set(self.note, hash_file(self.note), self.chunker_params, ['a'])
+        self.assertFalse(manifest.is_current(self.note, hash_file(self.note), changed_params))
+
+    def test_files_under_and_remove(self):
+        manifest = IngestionManifest(self.manifest_path)
+        other = os.path.join(self.dir, 'notes_other', 'note.md')
+        manifest.set(self.note, 'hash1', self.chunker_params, ['a'])
+        manifest.set(other, 'hash2', self.chunker_params, ['b'])
+
+        # Sibling directories sharing a prefix should not be included
+        self.assertEqual(manifest.files_under([self.notes_dir]), [os.path.abspath(self.note)])
+        self.assertEqual(manifest.remove(self.note), ['a'])
+        self.assertEqual(manifest.remove(self.note), [])
+        self.assertEqual(manifest.files_under([self.notes_dir]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import importlib.util
+import tempfile
+import unittest
+
+import numpy as np
+
+from rag.vectorstores.filters import matches, to_chroma_where
+from test.test_numpy_store import KeywordEmbeddings
+
+
+class TestFilters(unittest.TestCase):
+
+    def test_matches(self):
+        metadata = {'filename': 'a.md', 'element_type': 'Title', 'page_number': 3}
+        self.assertTrue(matches(metadata, {'filename': 'a.md', 'page_number': (2, 3)}))
+        self.assertTrue(matches(metadata, {'element_type': ['Title', 'ListItem'], 'page_number': (3, None)}))
+        self.assertFalse(matches(metadata, {'page_number': (4, None)}))
+        self.assertFalse(matches({'filename': 'a.md'}, {'page_number': (1, 5)}))  # Missing metadata
+
+    def test_to_chroma_where(self):
+        self.assertIsNone(to_chroma_where({}))
+        self.assertEqual(to_chroma_where({'filename': 'a.md'}), {'filename': {'$eq': 'a.md'}})
+        self.assertEqual(
+            to_chroma_where({'element_type': ['Title'], 'page_number': (2, 4)}),
+            {'$and': [
+                {'element_type': {'$in': ['Title']}},
+                {'page_number': {'$gte': 2}},
+                {'page_number': {'$lte': 4}},
+            ]},
+        )
+        with self.assertRaises(ValueError):
+            to_chroma_where({'page_number': (1, 2, 3)})
+
+
+@unittest.skipUnless(importlib.util.find_spec('langchain_core'), 'langchain_core is not installed')
+class TestFilteredSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.texts = ['cat', 'cat dog', 'dog', 'fish', 'cat fish', 'bird cat']
+        self.metadatas = [
+            {'filename': f'{i % 3}.md', 'element_type': 'Title' if i % 2 else 'NarrativeText', 'page_number': i, 'lang': 'en'}
+            for i in range(len(self.texts))
+        ]
+        self.ids = [f'id{i}' for i in range(len(self.texts))]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_posting_lists_follow_updates(self):
+        from rag.vectorstores.numpy_store import NumpyVectorStore
+
+        store = NumpyVectorStore(KeywordEmbeddings(), persist_directory=self.tmp_dir.name)
+        store.add_texts(self.texts, metadatas=self.metadatas, ids=self.ids)
+
+        def search(filters):
+            return sorted(doc.id for doc in store.similarity_search('cat', k=10, filter=filters))
+
+        self.assertEqual(search({'filename': '1.md'}), ['id1', 'id4'])
+        self.assertEqual(search({'element_type': ['Title'], 'page_number': (2, None)}), ['id3', 'id5'])
+        # Conditions on metadata without posting lists are checked on the subset
+        self.assertEqual(search({'filename': '0.md', 'lang': 'en'}), ['id0', 'id3'])
+        self.assertEqual(search({'filename': 'missing.md'}), [])
+
+        store.delete(['id1'])
+        store.add_texts(['cat cat'], metadatas=[{'filename': '1.md', 'page_number': 9}], ids=['id6'])
+        self.assertEqual(search({'filename': '1.md'}), ['id4', 'id6'])
+        self.assertEqual(store.get(where={'filename': '1.md'})['ids'], ['id4', 'id6'])
+
+        store.persist()
+        reloaded = NumpyVectorStore(KeywordEmbeddings(), persist_directory=self.tmp_dir.name)
+        self.assertEqual(
+            [doc.id for doc in reloaded.similarity_search('cat', k=10, filter={'page_number': (4, 9)})],
+            ['id6', 'id4', 'id5'],
+        )
+
+    def test_ivf_scans_small_subsets_exactly(self):
+        from langchain_core.documents import Document
+        from rag.vectorstores.ivf_store import IVFVectorStore
+
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(2000, 16)).astype(np.float32)
+        store = IVFVectorStore(KeywordEmbeddings(), nlist=40, nprobe=2, min_train_size=1000)
+        store.add_embeddings(
+            [Document(page_content=str(i), id=str(i), metadata={'filename': f'{i % 100}.md'}) for i in range(2000)],
+            vectors,
+        )
+        self.assertIsNotNone(store._snapshot.index)
+
+        query = rng.normal(size=16).astype(np.float32)
+        results = store.similarity_search_by_vector(query.tolist(), k=5, filter={'filename': '7.md'})
+        subset = np.arange(7, 2000, 100)
+        cosine = vectors[subset] @ query / np.linalg.norm(vectors[subset], axis=1)
+        self.assertEqual([doc.id for doc in results], [str(i) for i in subset[np.argsort(-cosine)[:5]]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import importlib.util
+import unittest
+
+import numpy as np
+
+from rag.vectorstores.mmr import maximal_marginal_relevance
+
+
+class TestMaximalMarginalRelevance(unittest.TestCase):
+
+    def test_relevance_only_and_diversity(self):
+        query = [1.0, 0.0]
+        candidates = [[1.0, 0.0], [0.99, 0.01], [0.7, 0.7], [0.0, 1.0]]
+        self.assertEqual(maximal_marginal_relevance(query, candidates, k=3, lambda_mult=1.0), [0, 1, 2])
+        # The near duplicate of the first candidate is skipped in favour of a different one
+        self.assertEqual(maximal_marginal_relevance(query, candidates[:3], k=2, lambda_mult=0.3), [0, 2])
+        self.assertEqual(len(maximal_marginal_relevance(query, candidates, k=10)), 4)
+        self.assertEqual(maximal_marginal_relevance(query, np.zeros((0, 2)), k=3), [])
+
+    @unittest.skipUnless(importlib.util.find_spec('langchain_core'), 'langchain_core is not installed')
+    def test_matches_langchain(self):
+        from langchain_core.vectorstores.utils import maximal_marginal_relevance as reference
+
+        rng = np.random.default_rng(0)
+        for lambda_mult in (0.0, 0.3, 0.7):
+            query = rng.normal(size=24)
+            candidates = rng.normal(size=(200, 24))
+            self.assertEqual(
+                maximal_marginal_relevance(query, candidates, k=10, lambda_mult=lambda_mult),
+                reference(query, candidates, k=10, lambda_mult=lambda_mult),
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
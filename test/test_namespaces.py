@@ -0,0 +1,94 @@
+import importlib.util
+import io
+import os
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from test.test_embedding_executor import StubOllamaHandler
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('langchain_ollama') and importlib.util.find_spec('weave'),
+    'langchain_ollama or weave is not installed',
+)
+class TestNamespaces(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_namespaced_sources_and_warm_up(self):
+        from langchain_core.documents import Document
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.retriever import SimpleRetriever
+
+        chunker = NativeBasicChunking(max_characters=100, overlap=0)
+        for retriever in (
+            SimpleRetriever(model='stub', k=3, vector_store='numpy', chunker=chunker),
+            SimpleRetriever(model='stub', k=3, chunker=chunker, collection_name='namespaces'),
+        ):
+            self.server.batch_sizes.clear()
+            retriever.warm_up()
+            self.assertEqual(self.server.batch_sizes, [1])
+
+            # The same file uploaded in two namespaces
+            for namespace, note in (('a', 'alpha notes'), ('b', 'beta notes')):
+                retriever.add_docs([Document(page_content=note, metadata={'filename': 'notes.md', 'namespace': namespace})])
+            self.assertTrue(retriever.has_source('notes.md', {'namespace': 'a'}))
+            self.assertFalse(retriever.has_source('notes.md', {'namespace': 'c'}))
+            docs = retriever.query('notes', filters={'namespace': 'b', 'filename': 'notes.md'})
+            self.assertEqual([doc.page_content for doc in docs], ['beta notes'])
+            retriever.reset_index()
+
+    def test_uploads_reuse_the_namespace_of_their_content(self):
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.generators.generator import ResponseGenerator
+        from rag.ingestors.ingestor import FastIngestor
+        from rag.rag import RAG
+        from rag.retrievers.retriever import SimpleRetriever
+        from ui.init_rag import RAGService
+
+        def upload(name, text):
+            file = io.BytesIO(text.encode())
+            file.name = name
+            return file
+
+        retriever = SimpleRetriever(
+            model='stub', k=3, vector_store='numpy', chunker=NativeBasicChunking(max_characters=100, overlap=0)
+        )
+        service = RAGService(RAG(retriever, ResponseGenerator(model='stub'), FastIngestor(num_workers=1)))
+
+        session = [
+            service.ingest_upload(upload('alpha.md', 'alpha notes')),
+            service.ingest_upload(upload('beta.md', 'beta notes')),
+        ]
+        chunks = len(retriever.vector_db)
+        # Another session (or the same after a restart) uploading the same file reuses its chunks
+        other_session = [service.ingest_upload(upload('alpha.md', 'alpha notes'))]
+        self.assertEqual(other_session, session[:1])
+        self.assertEqual(len(retriever.vector_db), chunks)
+        other_session.append(service.ingest_upload(upload('beta.md', 'edited beta notes')))
+        self.assertNotEqual(other_session[1], session[1])
+
+        _, docs = service.stream_query('notes', other_session)
+        self.assertEqual(sorted(doc.page_content for doc in docs), ['alpha notes', 'edited beta notes'])
+        _, docs = service.stream_query('notes', session, filename='beta.md')
+        self.assertEqual([doc.page_content for doc in docs], ['beta notes'])
+        self.assertEqual(service.stream_query('notes', [])[1], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
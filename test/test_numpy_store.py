@@ -0,0 +1,94 @@
+import importlib.util
+import tempfile
+import unittest
+
+import numpy as np
+
+
+class KeywordEmbeddings:
+    """Embeds texts by counting a few keywords, so that similarities are predictable"""
+
+    KEYWORDS = ('cat', 'dog', 'fish', 'bird')
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.count(word)) + 0.01 for word in self.KEYWORDS]
+
+
+@unittest.skipUnless(importlib.util.find_spec('langchain_core'), 'langchain_core is not installed')
+class TestNumpyVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        from rag.vectorstores.numpy_store import NumpyVectorStore
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store_cls = NumpyVectorStore
+        self.store = NumpyVectorStore(KeywordEmbeddings(), persist_directory=self.tmp_dir.name, collection_name='notes')
+        self.texts = ['cat cat', 'dog', 'fish fish fish', 'cat dog', 'bird']
+        self.ids = self.store.add_texts(
+            self.texts, metadatas=[{'filename': f'{i % 2}.md'} for i in range(5)], ids=[f'id{i}' for i in range(5)]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_top_k_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(500, 16)).astype(np.float32)
+        query = rng.normal(size=16).astype(np.float32)
+        from langchain_core.documents import Document
+
+        store = self.store_cls(KeywordEmbeddings())
+        for start in range(0, 500, 64):  # Appended in batches, like the ingestion pipeline
+            batch = range(start, min(start + 64, 500))
+            store.add_embeddings([Document(page_content=str(i), id=str(i)) for i in batch], vectors[list(batch)])
+
+        results = store.similarity_search_with_score_by_vector(query.tolist(), k=10)
+        cosine = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+        self.assertEqual([doc.id for doc, _ in results], [str(i) for i in np.argsort(-cosine)[:10]])
+        np.testing.assert_allclose([score for _, score in results], np.sort(cosine)[::-1][:10], rtol=1e-5)
+
+    def test_search_filter_and_mmr(self):
+        self.assertEqual(self.store.similarity_search('cat', k=1)[0].page_content, 'cat cat')
+        filtered = self.store.similarity_search('cat', k=5, filter={'filename': '1.md'})
+        self.assertEqual([doc.id for doc in filtered], ['id3', 'id1'])
+        mmr = self.store.max_marginal_relevance_search('cat', k=2, fetch_k=5, lambda_mult=0.1)
+        self.assertEqual(len({doc.id for doc in mmr}), 2)
+
+    def test_snapshot_isolation(self):
+        snapshot = self.store._snapshot
+        self.store.add_texts(['more fish'], ids=['id5'])
+        self.store.add_texts(['cat only'], ids=['id0'])  # Replaces id0
+        self.store.delete(['id1'])
+        # A query holding the previous snapshot still sees it unchanged
+        self.assertEqual(snapshot.ids, tuple(self.ids))
+        self.assertEqual(snapshot.texts[0], 'cat cat')
+        self.assertEqual(len(snapshot.vectors), 5)
+
+        self.assertEqual(sorted(self.store.get()['ids']), ['id0', 'id2', 'id3', 'id4', 'id5'])
+        self.assertEqual(self.store.get_by_ids(['id0', 'id1'])[0].page_content, 'cat only')
+
+    def test_persist_and_mmap_reload(self):
+        self.store.delete(['id4'])
+        self.store.persist()
+        reloaded = self.store_cls(
+            KeywordEmbeddings(), persist_directory=self.tmp_dir.name, collection_name='notes', mmap=True
+        )
+        self.assertIsInstance(reloaded._snapshot.vectors, np.memmap)
+        self.assertEqual(reloaded.get()['ids'], ['id0', 'id1', 'id2', 'id3'])
+        self.assertEqual(reloaded.similarity_search('fish', k=1)[0].id, 'id2')
+        self.assertTrue(reloaded.get(where={'filename': '0.md'}, limit=1)['ids'])
+
+        # Writes copy the memory mapped matrix
+        reloaded.add_texts(['bird bird'], ids=['id6'])
+        self.assertEqual(reloaded.similarity_search('bird', k=1)[0].id, 'id6')
+
+        reloaded.reset_collection()
+        self.assertEqual(len(reloaded), 0)
+        self.assertEqual(reloaded.similarity_search('bird', k=1), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+import unittest
+
+from rag.ingestors.partition_cache import PartitionCache
+
+
+class TestPartitionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = PartitionCache(self.tmp_dir.name)
+        self.elements = [
+            {'type': 'Title', 'element_id': 'a', 'text': 'Intro', 'metadata': {'filename': 'x.md'}},
+            {'type': 'NarrativeText', 'element_id': 'b', 'text': 'Some text', 'metadata': {}},
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_key_depends_on_content_and_kwargs(self):
+        key = PartitionCache.key('hash', {'strategy': 'fast', 'languages': ['eng']})
+        self.assertEqual(key, PartitionCache.key('hash', {'languages': ['eng'], 'strategy': 'fast'}))
+        self.assertNotEqual(key, PartitionCache.key('other_hash', {'strategy': 'fast', 'languages': ['eng']}))
+        self.assertNotEqual(key, PartitionCache.key('hash', {'strategy': 'hi_res', 'languages': ['eng']}))
+
+    def test_put_get(self):
+        key = PartitionCache.key('hash')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, self.elements)
+        self.assertEqual(self.cache.get(key), self.elements)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_prune_evicts_least_recently_used(self):
+        keys = [PartitionCache.key(f'hash{i}') for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, self.elements * (i + 1))
+            path = self.cache._path(key)
+            os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+        self.cache.get(keys[0])  # Most recently used now
+
+        sizes = {key: os.path.getsize(self.cache._path(key)) for key in keys}
+        evicted = self.cache.prune(sizes[keys[0]] + sizes[keys[2]])
+        self.assertEqual(evicted, 1)
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+        self.cache.clear()
+        self.assertEqual(self.cache.stats(), {'entries': 0, 'bytes': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import glob
+import importlib.util
+import io
+import os
+import unittest
+
+from rag.ingestors.partitioners import partition_md, partition_txt
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), '..', 'corpus')
+
+MARKDOWN = """# Classifiers
+
+Some **bold** text with a [link](https://example.com) and `code`.
+
+## Preparation
+
+1. First step
+   continued
+2. Second step
+
+```python
+import pandas as pd
+```
+
+| a | b |
+| - | - |
+| 1 | 2 |
+
+# Next section
+"""
+
+
+class TestNativePartitioners(unittest.TestCase):
+
+    def test_markdown_elements(self):
+        elements = partition_md(file=io.BytesIO(MARKDOWN.encode()), metadata_filename='notes/x.md')
+        types = [el['type'] for el in elements]
+        texts = [el['text'] for el in elements]
+        self.assertEqual(
+            types,
+            ['Title', 'NarrativeText', 'Title', 'ListItem', 'ListItem', 'CodeSnippet', 'Table', 'Title'],
+        )
+        self.assertEqual(texts[1], 'Some bold text with a link and code.')
+        self.assertEqual(texts[3], 'First step continued')
+        self.assertEqual(texts[6], 'a b 1 2')
+        self.assertEqual(elements[0]['metadata']['filename'], 'x.md')
+        self.assertEqual(elements[0]['metadata']['file_directory'], 'notes')
+
+    def test_markdown_hierarchy(self):
+        elements = partition_md(file=io.StringIO(MARKDOWN))
+        title, text, subtitle, item = elements[:4]
+        next_title = elements[-1]
+        self.assertEqual(title['metadata']['category_depth'], 0)
+        self.assertEqual(subtitle['metadata']['category_depth'], 1)
+        self.assertNotIn('parent_id', title['metadata'])
+        self.assertEqual(text['metadata']['parent_id'], title['element_id'])
+        self.assertEqual(subtitle['metadata']['parent_id'], title['element_id'])
+        self.assertEqual(item['metadata']['parent_id'], subtitle['element_id'])
+        self.assertNotIn('parent_id', next_title['metadata'])
+
+    def test_text_elements(self):
+        text = "A Recipe for Training Neural Networks\n\nIt is easy to get started, right.\n- a bullet\n"
+        elements = partition_txt(file=io.StringIO(text))
+        self.assertEqual([el['type'] for el in elements], ['Title', 'NarrativeText', 'ListItem'])
+        self.assertEqual(elements[2]['text'], 'a bullet')
+        self.assertEqual(elements[1]['metadata']['parent_id'], elements[0]['element_id'])
+
+    @unittest.skipUnless(importlib.util.find_spec('unstructured'), 'unstructured is not installed')
+    def test_parity_with_unstructured(self):
+        from unstructured.partition.auto import partition
+        from unstructured.staging.base import convert_to_dict
+
+        for path in glob.glob(os.path.join(CORPUS_DIR, 'intro-to-ml-notes', '*.md')):
+            with self.subTest(path=path):
+                native = partition_md(filename=path)
+                reference = convert_to_dict(partition(filename=path))
+
+                # Headings are found as elements by unstructured as well
+                reference_texts = {el['text'] for el in reference}
+                native_titles = [el['text'] for el in native if el['type'] == 'Title']
+                missing = [title for title in native_titles if title not in reference_texts]
+                self.assertLessEqual(len(missing), 0.1 * len(native_titles))
+
+                # And the same text is extracted, regardless of minor classification differences
+                native_words = {w for el in native for w in el['text'].split()}
+                reference_words = {w for el in reference for w in el['text'].split()}
+                overlap = len(native_words & reference_words) / max(len(reference_words), 1)
+                self.assertGreater(overlap, 0.95)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import importlib.util
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from test.test_embedding_executor import StubOllamaHandler
+
+
+@unittest.skipUnless(
+    all(importlib.util.find_spec(name) for name in ('langchain_chroma', 'weave')),
+    'langchain_chroma or weave is not installed',
+)
+class TestPersistentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        # The retrievers' Ollama clients read the host from the environment
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmp_dir.name, 'index')
+        self.notes_dir = os.path.join(self.tmp_dir.name, 'notes')
+        os.makedirs(self.notes_dir)
+        for i in range(3):
+            with open(os.path.join(self.notes_dir, f'note{i}.md'), 'w') as f:
+                f.write(f'# Note {i}\n\nSome text about topic {i}.\n\n## Details\n\nMore details on {i}.')
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def ingest(self, max_characters=100, ingestor=None):
+        from rag.chunkers.native_chunker import NativeByTitleChunking
+        from rag.ingestors.ingestor import FastIngestor
+        from rag.ingestors.pipeline import IngestionPipeline
+        from rag.retrievers.retriever import SimpleRetriever
+
+        retriever = SimpleRetriever(
+            model='stub',
+            k=2,
+            chunker=NativeByTitleChunking(max_characters=max_characters),
+            persist_directory=self.index_dir,
+            collection_name='notes',
+        )
+        ingestor = ingestor or FastIngestor(num_workers=1)
+        ids = IngestionPipeline(ingestor, retriever).run(self.notes_dir)
+        return retriever, ids
+
+    def requests(self):
+        return len(self.server.batch_sizes)
+
+    def test_reopens_unchanged_index(self):
+        _, ids = self.ingest()
+        self.assertGreater(len(ids), 0)
+        requests = self.requests()
+
+        retriever, reopened_ids = self.ingest()
+        self.assertEqual(reopened_ids, [])
+        self.assertEqual(self.requests(), requests)  # Nothing embedded
+        self.assertEqual(len(retriever.vector_db.get()['ids']), len(ids))
+        self.assertEqual(len(retriever.query('topic')), 2)
+
+    def test_rebuilds_changed_index(self):
+        _, ids = self.ingest()
+        with open(os.path.join(self.notes_dir, 'note0.md'), 'a') as f:
+            f.write('\n\n## Appendix\n\nNew section.')
+        retriever, new_ids = self.ingest()
+        # Rebuilt from scratch, without duplicates of the previous chunks
+        self.assertGreater(len(new_ids), 0)
+        contents = retriever.vector_db.get()['documents']
+        self.assertEqual(len(contents), len(new_ids))
+        self.assertTrue(any('New section' in content for content in contents))
+
+        # Other chunker parameters invalidate the index too
+        _, rechunked_ids = self.ingest(max_characters=60)
+        self.assertGreater(len(rechunked_ids), 0)
+
+        # As do other partitioning parameters of the ingestor
+        from rag.ingestors.ingestor import FastIngestor
+
+        _, repartitioned_ids = self.ingest(
+            max_characters=60, ingestor=FastIngestor(num_workers=1, partition_kwargs={'languages': ['eng']})
+        )
+        self.assertGreater(len(repartitioned_ids), 0)
+        _, ids = self.ingest(
+            max_characters=60, ingestor=FastIngestor(num_workers=4, partition_kwargs={'languages': ['eng']})
+        )
+        self.assertEqual(ids, [])  # The number of workers does not change the documents
+
+    def test_changes_invalidate_fingerprint(self):
+        from langchain_core.documents import Document
+
+        retriever, _ = self.ingest()
+        retriever.add_docs([Document(page_content='Extra note', metadata={'filename': 'extra.md'})])
+        self.assertTrue(retriever.has_source('extra.md'))
+        _, ids = self.ingest()
+        self.assertGreater(len(ids), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
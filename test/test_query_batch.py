@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+import numpy as np
+
+from test.test_embedding_executor import StubOllamaHandler
+from test.test_numpy_store import KeywordEmbeddings
+
+NOTES = ['a', 'bb cc', 'ddd eee fff', 'g' * 12, 'h' * 20, 'i' * 33, 'j' * 50, 'k' * 80]
+QUERIES = ['x', 'yyyy', 'z' * 15, 'w' * 60]
+
+
+@unittest.skipUnless(importlib.util.find_spec('langchain_core'), 'langchain_core is not installed')
+class TestBatchSearch(unittest.TestCase):
+
+    def test_numpy_and_ivf_batches_match_single_queries(self):
+        from langchain_core.documents import Document
+        from rag.vectorstores.ivf_store import IVFVectorStore
+        from rag.vectorstores.numpy_store import NumpyVectorStore
+
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(3000, 16)).astype(np.float32)
+        queries = rng.normal(size=(10, 16)).astype(np.float32).tolist()
+        docs = [Document(page_content=str(i), id=str(i), metadata={'filename': f'{i % 3}.md'}) for i in range(3000)]
+        for store in (NumpyVectorStore(KeywordEmbeddings()), IVFVectorStore(KeywordEmbeddings(), nlist=20, min_train_size=1000)):
+            store.MAX_SCORES = 3000 * 4  # Several blocks of queries
+            store.add_embeddings(docs, vectors)
+            for filter in (None, {'filename': '1.md'}):
+                batch = store.similarity_search_batch_with_score_by_vectors(queries, k=5, filter=filter)
+                single = [store.similarity_search_with_score_by_vector(query, k=5, filter=filter) for query in queries]
+                self.assertEqual(
+                    [[doc.id for doc, _ in docs] for docs in batch], [[doc.id for doc, _ in docs] for docs in single]
+                )
+                np.testing.assert_allclose(
+                    [[score for _, score in docs] for docs in batch],
+                    [[score for _, score in docs] for docs in single],
+                    rtol=1e-5,
+                )
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('langchain_ollama') and importlib.util.find_spec('weave'),
+    'langchain_ollama or weave is not installed',
+)
+class TestQueryBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches_match_single_queries(self):
+        from langchain_core.documents import Document
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.mmr import MMR
+        from rag.retrievers.retriever import SimpleRetriever
+
+        docs = [Document(page_content=note, metadata={'filename': f'{i % 2}.md'}) for i, note in enumerate(NOTES)]
+        chunker = NativeBasicChunking(max_characters=100, overlap=0)
+        retrievers = [
+            SimpleRetriever(model='stub', k=3, vector_store='numpy', chunker=chunker),
+            SimpleRetriever(model='stub', k=3, chunker=chunker, collection_name='query_batch'),
+            MMR(model='stub', k=2, fetch_k=4, vector_store='numpy', chunker=chunker),
+        ]
+        for retriever in retrievers:
+            retriever.add_docs(docs)
+            for filters in (None, {'filename': '1.md'}):
+                self.server.batch_sizes.clear()
+                batch = retriever.query_batch(QUERIES, filters=filters)
+                # All the queries are embedded in a single request
+                self.assertEqual(self.server.batch_sizes, [len(QUERIES)])
+                single = [retriever.query(query, filters=filters) for query in QUERIES]
+                self.assertEqual(
+                    [[doc.page_content for doc in docs] for docs in batch],
+                    [[doc.page_content for doc in docs] for docs in single],
+                )
+            retriever.reset_index()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import importlib.util
+import os
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from langchain_core.documents import Document
+
+from rag.retrievers.query_cache import QueryCache
+from test.test_embedding_executor import StubOllamaHandler
+from test.test_query_batch import NOTES
+
+
+def docs(*texts):
+    return [Document(page_content=text, id=text) for text in texts]
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_exact_tier(self):
+        cache = QueryCache()
+        cache.put('What is  MMR?', None, docs('mmr'))
+        self.assertEqual(cache.get('what is mmr?'), docs('mmr'))
+        self.assertIsNone(cache.get('what is mmr?', {'filename': 'a.md'}))
+        self.assertIsNone(cache.get('what is bm25?'))
+        self.assertEqual(cache.stats()['exact_hits'], 1)
+
+    def test_semantic_tier(self):
+        cache = QueryCache(similarity_threshold=0.9)
+        cache.put('what is mmr', None, docs('mmr'), vector=[1.0, 0.0])
+        cache.put('what is bm25', {'filename': 'a.md'}, docs('bm25'), vector=[0.0, 1.0])
+        self.assertEqual(cache.get_similar([0.99, 0.1]), docs('mmr'))
+        # Only the queries with the same filters are candidates
+        self.assertIsNone(cache.get_similar([0.1, 0.99]))
+        self.assertEqual(cache.get_similar([0.1, 0.99], {'filename': 'a.md'}), docs('bm25'))
+        self.assertIsNone(cache.get_similar([0.7, 0.7]))
+        self.assertIsNone(QueryCache(similarity_threshold=None).get_similar(None))
+        self.assertEqual(cache.stats(), {'exact_hits': 0, 'semantic_hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_ttl_and_lru_eviction(self):
+        with mock.patch('rag.retrievers.query_cache.time.monotonic', return_value=0.0) as monotonic:
+            cache = QueryCache(max_size=2, ttl=10)
+            cache.put('a', None, docs('a'), vector=[1.0, 0.0])
+            cache.put('b', None, docs('b'))
+            cache.get('a')
+            cache.put('c', None, docs('c'))
+            # b was the least recently used
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual(len(cache), 2)
+
+            monotonic.return_value = 11.0
+            self.assertIsNone(cache.get('c'))
+            self.assertIsNone(cache.get_similar([1.0, 0.0]))
+            self.assertEqual(len(cache), 0)
+
+    def test_stale_results_are_not_cached(self):
+        cache = QueryCache()
+        generation = cache.generation
+        cache.clear()
+        cache.put('a', None, docs('a'), generation=generation)
+        self.assertIsNone(cache.get('a'))
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('langchain_ollama') and importlib.util.find_spec('weave'),
+    'langchain_ollama or weave is not installed',
+)
+class TestRetrieverQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_cached_queries_and_invalidation(self):
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.retrievers.hybrid import HybridRetriever
+        from rag.retrievers.retriever import SimpleRetriever
+
+        notes = [Document(page_content=note, metadata={'filename': 'notes.md'}) for note in NOTES]
+        chunker = NativeBasicChunking(max_characters=100, overlap=0)
+        for Retriever in (SimpleRetriever, HybridRetriever):
+            # The stub embeds a text by its length, queries of similar lengths are near-identical
+            retriever = Retriever(
+                model='stub', k=2, vector_store='numpy', chunker=chunker, query_cache={'similarity_threshold': 0.99}
+            )
+            retriever.add_docs(notes)
+            first = retriever.query('what is mmr')
+
+            self.server.batch_sizes.clear()
+            self.assertEqual(retriever.query('What is MMR '), first)
+            # Exact hits need no embedding
+            self.assertEqual(self.server.batch_sizes, [])
+
+            # Semantic hit, the query is embedded once
+            self.assertEqual(retriever.query('what is rrf?'), first)
+            self.assertEqual(self.server.batch_sizes, [1])
+            self.assertEqual(retriever._query_cache.stats()['semantic_hits'], 1)
+
+            # Misses of a batch are embedded once, for the cache and the retrieval
+            self.server.batch_sizes.clear()
+            retriever.query_batch(['x', 'yyy'])
+            self.assertEqual(self.server.batch_sizes, [2])
+
+            retriever.add_docs([Document(page_content='l' * 11, metadata={'filename': 'notes.md'})])
+            self.assertEqual(len(retriever._query_cache), 0)
+            self.assertEqual(retriever.query('what is mmr')[0].page_content, 'l' * 11)
+            retriever.reset_index()
+
+
+if __name__ == '__main__':
+    unittest.main()
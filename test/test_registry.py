@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from rag.common.component_index import ComponentIndex, registered_components
+from rag.common.registry import registry
+from rag.utils import get_callable_from_name
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+COMPONENT = '''from rag.common.registry import registry
+
+
+@registry.register_retriever('fake')
+class FakeRetriever:
+    pass
+
+
+registry.register_chunker('fake_chunking')(object)
+registry.register_chunker(NAME)(object)
+'''
+
+
+class TestComponentIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.package_dir = os.path.join(self.tmp_dir.name, 'pkg')
+        os.makedirs(os.path.join(self.package_dir, 'retrievers'))
+        self.module_path = os.path.join(self.package_dir, 'retrievers', 'fake.py')
+        with open(self.module_path, 'w') as f:
+            f.write(COMPONENT)
+        self.cache_path = os.path.join(self.tmp_dir.name, 'cache', 'index.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_registrations_are_read_from_the_source(self):
+        self.assertEqual(registered_components(COMPONENT), [('retrievers', 'fake'), ('chunkers', 'fake_chunking')])
+
+    def test_modules_are_scanned_again_only_once_changed(self):
+        index = ComponentIndex(self.package_dir, cache_path=self.cache_path)
+        self.assertEqual(index.module_of('retrievers', 'fake'), 'pkg.retrievers.fake')
+        self.assertEqual(index.module_of('chunkers', 'fake_chunking'), 'pkg.retrievers.fake')
+        self.assertIsNone(index.module_of('retrievers', 'missing'))
+        self.assertTrue(os.path.exists(self.cache_path))
+
+        with mock.patch.object(ComponentIndex, '_scan', side_effect=ComponentIndex._scan) as scan:
+            reloaded = ComponentIndex(self.package_dir, cache_path=self.cache_path)
+            self.assertEqual(reloaded.load(), index.load())
+            scan.assert_not_called()
+
+            with open(self.module_path, 'a') as f:
+                f.write("\n\n@registry.register_retriever('other')\nclass OtherRetriever:\n    pass\n")
+            reloaded.invalidate()
+            self.assertEqual(reloaded.module_of('retrievers', 'other'), 'pkg.retrievers.fake')
+            scan.assert_called_once()
+
+    def test_index_of_the_components(self):
+        index = registry.index.load()
+        self.assertEqual(index['retrievers']['hybrid'], 'rag.retrievers.hybrid')
+        self.assertEqual(index['chunkers']['native_by_title_chunking'], 'rag.chunkers.native_chunker')
+        self.assertEqual(index['vectorstores']['numpy'], 'rag.vectorstores.numpy_store')
+        self.assertEqual(index['scorers']['faithfulness'], 'rag.scorers.deepeval_scorers')
+        with self.assertRaises(KeyError):
+            registry.get_retriever('missing')
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_only_the_modules_of_the_requested_components_are_imported(self):
+        # In a new interpreter, as the other tests import the components
+        script = (
+            'import sys\n'
+            'from rag.common.registry import registry\n'
+            'assert "rag.chunkers.native_chunker" not in sys.modules\n'
+            'chunker = registry.get_chunker("native_basic_chunking")\n'
+            'assert chunker.__module__ == "rag.chunkers.native_chunker", chunker\n'
+            'assert registry.get_chunker("native_basic_chunking") is chunker\n'
+            'store = registry.get_vectorstore("numpy")\n'
+            'unused = ["rag.chunkers.unstructured_chunker", "rag.vectorstores.chroma_store", "rag.scorers.deepeval_scorers"]\n'
+            'assert not [module for module in unused if module in sys.modules]\n'
+        )
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT_DIR, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_get_callable_imports_only_its_module(self):
+        with tempfile.TemporaryDirectory() as search_dir:
+            with open(os.path.join(search_dir, 'broken.py'), 'w') as f:
+                f.write('raise RuntimeError("imported")\n')
+            with open(os.path.join(search_dir, 'tools.py'), 'w') as f:
+                f.write('def double(x):\n    return 2 * x\n\n\nclass Tool:\n    pass\n')
+
+            double = get_callable_from_name('double', [search_dir])
+            self.assertEqual(double(2), 4)
+            self.assertIs(get_callable_from_name('double', [search_dir]), double)
+            self.assertEqual(get_callable_from_name('Tool', [search_dir]).__name__, 'Tool')
+            self.assertIsNone(get_callable_from_name('missing', [search_dir]))
+
+            # Added after the directory was indexed
+            with open(os.path.join(search_dir, 'more.py'), 'w') as f:
+                f.write('def triple(x):\n    return 3 * x\n')
+            self.assertEqual(get_callable_from_name('triple', [search_dir])(2), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
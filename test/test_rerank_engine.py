@@ -0,0 +1,153 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.rerankers.engine import RerankEngine, get_rerank_engine
+
+WORD_WEIGHTS = {'cat': 2.0, 'dog': 1.0, 'fish': -1.0}
+
+
+class WordCountCrossEncoder:
+    """Scores a pair by the weights of the words of the document, recording the batches"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, pairs, batch_size):
+        self.batches.append(len(pairs))
+        return np.array([sum(WORD_WEIGHTS.get(word, 0.0) for word in doc.split()) for _, doc in pairs])
+
+
+def docs(*texts):
+    return [Document(page_content=text, id=text) for text in texts]
+
+
+class TestRerankEngine(unittest.TestCase):
+
+    def test_reranks_and_caches_scores(self):
+        cross_encoder = WordCountCrossEncoder()
+        engine = RerankEngine(cross_encoder, batch_size=8, cache_size=100)
+        candidates = docs('fish', 'cat dog', 'dog', 'cat cat')
+        self.assertEqual(
+            [doc.page_content for doc in engine.rerank('pets', candidates, k=3)], ['cat cat', 'cat dog', 'dog']
+        )
+        self.assertEqual(cross_encoder.batches, [4])
+
+        # Only the pairs of the new query and chunk are scored, the others are served from the cache
+        results = engine.rerank_batch(['pets ', 'other'], [candidates + docs('bird'), docs('dog')], k=2)
+        self.assertEqual([[doc.page_content for doc in result] for result in results], [['cat cat', 'cat dog'], ['dog']])
+        self.assertEqual(cross_encoder.batches, [4, 2])
+        self.assertEqual(engine.stats()['hits'], 4)
+        self.assertEqual(engine.stats()['misses'], 6)
+
+    def test_without_cache(self):
+        cross_encoder = WordCountCrossEncoder()
+        engine = RerankEngine(cross_encoder, cache_size=0)
+        engine.rerank('pets', docs('cat'), k=1)
+        engine.rerank('pets', docs('cat'), k=1)
+        self.assertEqual(cross_encoder.batches, [1, 1])
+
+    def test_adaptive_rerank_stops_once_stable(self):
+        cross_encoder = WordCountCrossEncoder()
+        engine = RerankEngine(cross_encoder, cache_size=0)
+        # In dense order, the best candidates come first
+        clear = docs('cat cat', 'cat dog', 'dog dog', 'dog', 'fish', 'fish fish', 'fish dog', 'fish cat')
+        # The best candidate is only found late
+        late = docs('dog', 'dog fish', 'cat', 'fish', 'cat cat cat', 'fish fish')
+        results = engine.rerank_adaptive_batch(['pets', 'more pets'], [clear, late], k=2, step=2, margin=0.5)
+        self.assertEqual([doc.page_content for doc in results[0]], ['cat cat', 'cat dog'])
+        self.assertEqual([doc.page_content for doc in results[1]], ['cat cat cat', 'cat'])
+        # Rounds of both queries are scored together, the first query stops after 2 rounds
+        self.assertEqual(cross_encoder.batches, [4, 4, 2])
+        self.assertEqual(engine.stats()['pairs_per_query'], 5)
+        self.assertEqual(
+            engine.rerank_batch(['pets'], [clear], k=2)[0], engine.rerank_adaptive_batch(['pets'], [clear], k=2, step=2)[0]
+        )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_rerank_engine('model', backend='tensorrt')
+
+
+def build_onnx_cross_encoder(model_dir):
+    """Tiny ONNX "cross-encoder" whose logit is the sum of the weights of the document's words,
+    with its tokenizer"""
+    import onnx
+    from onnx import TensorProto, helper
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    from tokenizers.processors import TemplateProcessing
+
+    vocab = {'[PAD]': 0, '[UNK]': 1, '[CLS]': 2, '[SEP]': 3, 'cat': 4, 'dog': 5, 'fish': 6}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token='[UNK]'))
+    tokenizer.pre_tokenizer = Whitespace()
+    tokenizer.post_processor = TemplateProcessing(
+        single='[CLS] $A [SEP]', pair='[CLS] $A [SEP] $B:1 [SEP]:1', special_tokens=[('[CLS]', 2), ('[SEP]', 3)]
+    )
+    tokenizer.save(os.path.join(model_dir, 'tokenizer.json'))
+
+    embeddings = np.zeros((len(vocab), 4), dtype=np.float32)
+    for word, weight in WORD_WEIGHTS.items():
+        embeddings[vocab[word], 0] = weight
+    projection = np.array([[1.0], [0.0], [0.0], [0.0]], dtype=np.float32)
+    nodes = [
+        helper.make_node('Gather', ['embeddings', 'input_ids'], ['embedded']),
+        helper.make_node('MatMul', ['embedded', 'projection'], ['token_logits']),  # (n, length, 1)
+        helper.make_node('Mul', ['attention_mask', 'token_type_ids'], ['document_mask']),
+        helper.make_node('Cast', ['document_mask'], ['document_mask_float'], to=TensorProto.FLOAT),
+        helper.make_node('Unsqueeze', ['document_mask_float', 'last_axis'], ['mask']),
+        helper.make_node('Mul', ['token_logits', 'mask'], ['masked']),
+        helper.make_node('ReduceSum', ['masked', 'length_axis'], ['summed'], keepdims=0),
+    ]
+    graph = helper.make_graph(
+        nodes,
+        'cross_encoder',
+        [
+            helper.make_tensor_value_info(name, TensorProto.INT64, ['batch', 'length'])
+            for name in ('input_ids', 'attention_mask', 'token_type_ids')
+        ],
+        [helper.make_tensor_value_info('summed', TensorProto.FLOAT, ['batch', 1])],
+        initializer=[
+            onnx.numpy_helper.from_array(embeddings, 'embeddings'),
+            onnx.numpy_helper.from_array(projection, 'projection'),
+            onnx.numpy_helper.from_array(np.array([2], dtype=np.int64), 'last_axis'),
+            onnx.numpy_helper.from_array(np.array([1], dtype=np.int64), 'length_axis'),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    os.makedirs(os.path.join(model_dir, 'onnx'))
+    onnx.save(model, os.path.join(model_dir, 'onnx', 'model.onnx'))
+
+
+@unittest.skipUnless(
+    all(importlib.util.find_spec(name) for name in ('onnx', 'onnxruntime', 'tokenizers')),
+    'onnx, onnxruntime or tokenizers is not installed',
+)
+class TestOnnxCrossEncoder(unittest.TestCase):
+
+    def test_scores_and_quantized_model(self):
+        from rag.rerankers.cross_encoder import OnnxCrossEncoder
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            build_onnx_cross_encoder(model_dir)
+            pairs = [('pets', 'fish'), ('pets', 'cat dog'), ('pets', 'dog'), ('pets', 'cat cat fish')]
+            expected = 1 / (1 + np.exp(-np.array([-1.0, 3.0, 1.0, 3.0])))
+            for quantize in (False, True):
+                cross_encoder = OnnxCrossEncoder(model_dir, num_threads=1, quantize=quantize)
+                # Batches smaller than the pairs, with pairs of different lengths padded together
+                np.testing.assert_allclose(cross_encoder.predict(pairs, batch_size=3), expected, atol=0.02)
+            self.assertTrue(os.path.exists(os.path.join(model_dir, 'onnx', 'model.int8.onnx')))
+
+            engine = get_rerank_engine(model_dir, backend='onnx', batch_size=2, num_threads=1)
+            ranked = engine.rerank('pets', docs('fish', 'cat dog', 'dog'), k=2)
+            self.assertEqual([doc.page_content for doc in ranked], ['cat dog', 'dog'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+WORDS = ['the', 'cat', 'sat', 'on', 'mat', 'dog', 'ran', 'notes', 'about', 'rag']
+
+
+def make_tiny_model(path: str):
+    """Save a small randomly initialized BERT sentence-transformers model, so that no download is needed"""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizer
+
+    torch.manual_seed(0)
+    bert_path = os.path.join(path, 'bert')
+    os.makedirs(bert_path)
+    vocab_path = os.path.join(bert_path, 'vocab.txt')
+    with open(vocab_path, 'w') as f:
+        f.write('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + WORDS))
+    BertTokenizer(vocab_path).save_pretrained(bert_path)
+    config = BertConfig(
+        vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=64
+    )
+    BertModel(config).save_pretrained(bert_path)
+
+    model_path = os.path.join(path, 'model')
+    transformer = models.Transformer(bert_path)
+    SentenceTransformer(modules=[transformer, models.Pooling(32)]).save(model_path)
+    return model_path
+
+
+@unittest.skipUnless(importlib.util.find_spec('sentence_transformers'), 'sentence-transformers is not installed')
+class TestSentenceTransformerEmbeddings(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.model_path = make_tiny_model(cls.tmp_dir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_batched_matches_single(self):
+        from rag.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+
+        embeddings = SentenceTransformerEmbeddings(self.model_path, batch_size=2, num_threads=1)
+        texts = ['the cat sat on the mat', 'dog ran', 'notes about rag', 'the dog']
+        batched = embeddings.embed_documents(texts)
+        single = [embeddings.embed_query(text) for text in texts]
+        self.assertEqual(np.array(batched).shape, (4, 32))
+        np.testing.assert_allclose(batched, single, atol=1e-5)
+
+    def test_quantized_is_close(self):
+        from rag.embeddings.sentence_transformer import SentenceTransformerEmbeddings
+
+        texts = ['the cat sat on the mat', 'notes about rag']
+        full = np.array(SentenceTransformerEmbeddings(self.model_path, normalize_embeddings=True).embed_documents(texts))
+        quantized = np.array(
+            SentenceTransformerEmbeddings(self.model_path, quantize=True, normalize_embeddings=True).embed_documents(texts)
+        )
+        self.assertEqual(quantized.shape, full.shape)
+        self.assertTrue(np.all(np.sum(full * quantized, axis=1) > 0.9))
+
+    def test_factory_shares_model(self):
+        from rag.embeddings.factory import get_embeddings
+
+        model = f'sentence-transformers:{self.model_path}'
+        embeddings = get_embeddings(model, params={'batch_size': 4})
+        self.assertIs(embeddings, get_embeddings(model, params={'batch_size': 4}))
+        self.assertEqual(len(embeddings.embed_query('the cat')), 32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from rag.server import MicroBatcher, Overloaded, RAGServer
+
+
+class RecordingRetriever:
+    """Returns a chunk echoing each query, recording the batches"""
+
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+
+    def query_batch(self, queries, filters=None):
+        if filters and 'filename' not in filters:
+            raise ValueError(f'Unknown metadata fields {list(filters)}')
+        self.batches.append(list(queries))
+        time.sleep(self.delay)
+        filename = (filters or {}).get('filename', 'notes.md')
+        return [[Document(page_content=f'about {query}', metadata={'filename': filename})] for query in queries]
+
+
+class EchoGenerator:
+    def query(self, query, context):
+        return f'{query}: {context[0].page_content}'
+
+
+class FakeRAG:
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.generator = EchoGenerator()
+
+
+class TestMicroBatcher(unittest.TestCase):
+
+    def test_batches_concurrent_items(self):
+        batches = []
+
+        def process(items):
+            batches.append(items)
+            time.sleep(0.05)
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(process, max_batch_size=4, max_wait=0.02, max_queue=100)
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            futures = list(pool.map(batcher.submit, range(10)))
+        results = [future.result() for future in futures]
+        batcher.close()
+        self.assertEqual([result.value for result in results], [i * 2 for i in range(10)])
+        self.assertTrue(all(len(batch) <= 4 for batch in batches))
+        self.assertLess(len(batches), 10)
+        self.assertEqual(batcher.stats()['items'], 10)
+
+    def test_rejects_beyond_max_queue_and_propagates_errors(self):
+        release = threading.Event()
+
+        def process(items):
+            release.wait()
+            return [ValueError(item) if item == 'bad' else item for item in items]
+
+        batcher = MicroBatcher(process, max_batch_size=1, max_wait=0, max_queue=2)
+        first = batcher.submit('in progress')
+        time.sleep(0.05)  # Picked up by the worker, no longer queued
+        queued = [batcher.submit('bad'), batcher.submit('ok')]
+        with self.assertRaises(Overloaded):
+            batcher.submit('rejected')
+        release.set()
+        self.assertEqual(first.result().value, 'in progress')
+        with self.assertRaises(ValueError):
+            queued[0].result()
+        self.assertEqual(queued[1].result().value, 'ok')
+        self.assertEqual(batcher.stats()['rejected'], 1)
+        batcher.close()
+
+
+class TestRAGServer(unittest.TestCase):
+
+    def setUp(self):
+        self.retriever = RecordingRetriever(delay=0.05)
+        self.server = RAGServer(('127.0.0.1', 0), FakeRAG(self.retriever), max_batch_size=8, max_wait=0.02)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, payload):
+        request = urllib.request.Request(
+            f'{self.url}/query', data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, dict(response.headers), json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers), json.loads(e.read())
+
+    def test_concurrent_queries_share_batches(self):
+        queries = [f'query {i}' for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(lambda query: self.post({'query': query}), queries))
+
+        for query, (status, headers, body) in zip(queries, responses):
+            self.assertEqual(status, 200)
+            self.assertEqual(body['answer'], f'{query}: about {query}')
+            self.assertEqual(body['sources'], [{'filename': 'notes.md', 'text': f'about {query}'}])
+            self.assertIn('retrieval;dur=', headers['Server-Timing'])
+            self.assertIn('generation;dur=', headers['Server-Timing'])
+        self.assertLess(len(self.retriever.batches), len(queries))
+        self.assertEqual(sorted(query for batch in self.retriever.batches for query in batch), sorted(queries))
+
+        status, _, body = self.post({'query': 'x', 'filters': {'filename': 'a.md'}, 'generate': False})
+        self.assertEqual((status, body['answer'], body['sources'][0]['filename']), (200, None, 'a.md'))
+
+        with urllib.request.urlopen(f'{self.url}/health') as response:
+            health = json.loads(response.read())
+        self.assertEqual(health['status'], 'ok')
+        self.assertEqual(health['items'], len(queries) + 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.post({'query': ''})[0], 400)
+        self.assertEqual(self.post({'query': 'x', 'filters': ['a.md']})[0], 400)
+        self.assertEqual(self.post({'query': 'x', 'filters': {'page': 1}})[0], 400)
+
+        for length in ('many', '-1'):
+            request = urllib.request.Request(
+                f'{self.url}/query', data=b'{"query": "x"}', headers={'Content-Length': length}
+            )
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request, timeout=5)
+            self.assertEqual(context.exception.code, 400)
+
+    def test_overloaded(self):
+        self.server.batcher.max_queue = 0
+        status, headers, _ = self.post({'query': 'x'})
+        self.assertEqual(status, 503)
+        self.assertEqual(headers['Retry-After'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
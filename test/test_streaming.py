@@ -0,0 +1,150 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+from test.test_embedding_executor import StubOllamaHandler
+
+ANSWER = ['Reciprocal', ' rank', ' fusion', ' merges', ' rankings.']
+
+
+class StubOllamaChatHandler(StubOllamaHandler):
+    """Emulates Ollama's /api/embed, /api/chat streaming the ANSWER a token every `token_delay`
+    seconds, recording the prompts, and /api/generate loading a model (recorded as `loaded`)"""
+
+    def do_POST(self):
+        if self.path == '/api/generate':
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            self.server.loaded = body['model']
+            response = json.dumps({'model': body['model'], 'response': '', 'done': True}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+            return
+        if self.path != '/api/chat':
+            return super().do_POST()
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.prompts.append(body['messages'][-1]['content'])
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        for token in ANSWER:
+            message = {'role': 'assistant', 'content': token}
+            self.wfile.write(json.dumps({'model': body['model'], 'message': message, 'done': False}).encode() + b'\n')
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+        message = {'role': 'assistant', 'content': ''}
+        self.wfile.write(json.dumps({'model': body['model'], 'message': message, 'done': True, 'done_reason': 'stop'}).encode() + b'\n')
+        self.close_connection = True
+
+
+@unittest.skipUnless(
+    importlib.util.find_spec('langchain_ollama') and importlib.util.find_spec('weave'),
+    'langchain_ollama or weave is not installed',
+)
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaChatHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = self.server.max_in_flight = self.server.failures = 0
+        self.server.batch_sizes = []
+        self.server.delay = 0
+        self.server.prompts = []
+        self.server.token_delay = 0.1
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.env = mock.patch.dict(os.environ, {'OLLAMA_HOST': f'127.0.0.1:{self.server.server_address[1]}'})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_generator_streams_tokens(self):
+        from rag.generators.generator import ResponseGenerator
+
+        generator = ResponseGenerator(model='stub')
+        start = time.perf_counter()
+        tokens = generator.stream('What is RRF?', ['RRF fuses rankings'])
+        first = next(tokens)
+        # The first token arrives before the rest of the response is generated
+        self.assertLess(time.perf_counter() - start, self.server.token_delay * (len(ANSWER) - 1))
+        self.assertEqual([first, *tokens], ANSWER)
+        self.assertIn('RRF fuses rankings', self.server.prompts[0])
+
+        # Warming up loads the model without generating a response
+        generator.warm_up()
+        self.assertEqual(self.server.loaded, 'stub')
+        self.assertEqual(len(self.server.prompts), 1)
+
+    def test_rag_stream_query_returns_sources_first(self):
+        from langchain_core.documents import Document
+        from rag.chunkers.native_chunker import NativeBasicChunking
+        from rag.generators.generator import ResponseGenerator
+        from rag.rag import RAG
+        from rag.retrievers.retriever import SimpleRetriever
+
+        retriever = SimpleRetriever(
+            model='stub', k=1, vector_store='numpy', chunker=NativeBasicChunking(max_characters=100, overlap=0)
+        )
+        retriever.add_docs([Document(page_content='RRF fuses rankings', metadata={'filename': 'notes.md'})])
+        rag = RAG(retriever, ResponseGenerator(model='stub'), ingestor=None)
+
+        tokens, sources = rag.stream_query('What is RRF?', return_documents=True)
+        # Nothing is generated until the tokens are consumed
+        self.assertEqual(self.server.prompts, [])
+        self.assertEqual([doc.metadata['filename'] for doc in sources], ['notes.md'])
+        self.assertEqual(''.join(tokens), ''.join(ANSWER))
+        self.assertIn('RRF fuses rankings', self.server.prompts[0])
+
+    def test_chat_streams_answers_from_the_notes(self):
+        import contextlib
+        import io
+        import tempfile
+
+        import yaml
+
+        import chat
+
+        self.server.token_delay = 0
+        config = {
+            'generator': {'name': 'ResponseGenerator', 'params': {'model': 'stub'}},
+            'ingestor': {'name': 'FastIngestor', 'params': {'num_workers': 1}},
+            'retriever': {
+                'name': 'SimpleRetriever',
+                'params': {
+                    'model': 'stub',
+                    'k': 1,
+                    'vector_store': 'numpy',
+                    'chunker': {'name': 'native_basic_chunking', 'params': {'max_characters': 100}},
+                },
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = os.path.join(tmp_dir, 'chat.yaml')
+            with open(config_path, 'w') as f:
+                yaml.safe_dump(config, f)
+            notes_dir = os.path.join(tmp_dir, 'notes')
+            os.makedirs(notes_dir)
+            with open(os.path.join(notes_dir, 'rrf.md'), 'w') as f:
+                f.write('RRF fuses rankings')
+
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                rag = chat.load_rag(config_path, notes_dir)
+                queries = iter(['What is RRF?', 'exit'])
+                chat.chat_with_model(rag, input=lambda prompt: next(queries))
+
+        self.assertIn(f"Assistant: {''.join(ANSWER)}\nSources: rrf.md", output.getvalue())
+        self.assertIn('RRF fuses rankings', self.server.prompts[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
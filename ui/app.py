@@ -8,13 +8,21 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(__file__, "../..")))
 
 
-from init_rag import initialize_rag
-
-rag = initialize_rag()
+from init_rag import create_rag_service
 
 # Set page configuration
 st.set_page_config(page_title="RAG Chat App", page_icon="📚", layout="wide")
 
+
+# Streamlit reruns this script on every interaction, the RAG is created (and its models loaded) once
+# per process and shared by all the sessions
+@st.cache_resource(show_spinner="Loading the models...")
+def get_rag_service():
+    return create_rag_service()
+
+
+rag_service = get_rag_service()
+
 # Initialize session state variables if they don't exist
 if "uploaded_docs" not in st.session_state:
     st.session_state.uploaded_docs = {}  # {filename: document_content}
@@ -22,6 +30,8 @@ if "focused_doc" not in st.session_state:
     st.session_state.focused_doc = None
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "namespaces" not in st.session_state:
+    st.session_state.namespaces = {}  # {filename: namespace of its chunks in the shared index}
 
 # Initialize DocumentHandler
 doc_handler = DocumentHandler()
@@ -51,7 +61,7 @@ with st.sidebar:
             # Check if file is already processed
             if uploaded_file.name not in st.session_state.uploaded_docs:
                 content = doc_handler.parse_document(uploaded_file)
-                rag.ingest(file=uploaded_file) # Uploaded file is a file not a filename
+                st.session_state.namespaces[uploaded_file.name] = rag_service.ingest_upload(uploaded_file)
                 if content:
                     st.session_state.uploaded_docs[uploaded_file.name] = content
                     st.success(f"Successfully uploaded: {uploaded_file.name}")
@@ -100,35 +110,25 @@ if prompt := st.chat_input("Ask about your documents..."):
     with st.chat_message("user"):
         st.write(prompt)
 
-    # Simulate assistant response with RAG sources
-    # response = f"This would be a RAG response about: {prompt}"
-    rag_response, rag_context = rag.query(prompt)
-    response = rag_response.content
-
-    # Generate simulated source references
-    sources = []
-    if st.session_state.uploaded_docs:
-        # Get documents to reference (preferring the focused one)
-        docs_to_reference = (
-            [st.session_state.focused_doc]
-            if st.session_state.focused_doc
-            else list(st.session_state.uploaded_docs.keys())
-        )
-
-        for context in rag_context:
-            sources.append({
-                "document": doc_name,
-                "text": context
-            })
+    # The sources are retrieved before the response is generated, which is streamed as it is produced.
+    # A focused document restricts the retrieval to its chunks
+    tokens, rag_docs = rag_service.stream_query(
+        prompt, list(st.session_state.namespaces.values()), filename=st.session_state.focused_doc
+    )
 
-    # Add assistant response with sources to chat history
-    assistant_msg = {"role": "assistant", "content": response, "sources": sources}
-    st.session_state.chat_history.append(assistant_msg)
+    sources = [
+        {"document": doc.metadata.get("filename", "Unknown"), "text": doc.page_content}
+        for doc in rag_docs
+    ]
 
     # Display assistant response with sources
     with st.chat_message("assistant"):
-        st.write(response)
+        response = st.write_stream(tokens)
         if sources:
             st.divider()
             st.markdown("**References:**")
             display_sources(sources)
+
+    # Add assistant response with sources to chat history
+    assistant_msg = {"role": "assistant", "content": response, "sources": sources}
+    st.session_state.chat_history.append(assistant_msg)
@@ -1,21 +1,72 @@
+import os
+import threading
+from typing import List
+
+from rag.common.hashing import hash_bytes
 from rag.rag import RAG
 from rag.generators.generator import ResponseGenerator
 from rag.ingestors.ingestor import SimpleIngestor
-from rag.retrievers.retriever import SimpleRetriever, MMR
-from rag.chunkers.base import ByTitleChunking
+from rag.chunkers.native_chunker import NativeByTitleChunking
 from rag.retrievers.reranker import Reranker
 
+# The index is persisted, so that reruns and restarts of the app open it instead of re-ingesting
+INDEX_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.cache/ui_index"))
+
 def initialize_rag():
     generator = ResponseGenerator(model="qwen2.5:3b")
     ingestor = SimpleIngestor()
     retriever = Reranker(
-        emedding_model="nomic-embed-text",
+        model="nomic-embed-text",
         cross_encoding_model='cross-encoder/ms-marco-MiniLM-L6-v2',
         fetch_k=6,
         k=3,
-        chunker=ByTitleChunking(
+        # Keeps the metadata of the documents as is, including their namespace
+        chunker=NativeByTitleChunking(
             max_characters=1500, new_after_n_chars=1000, combine_text_under_n_characters=300
         ),
+        persist_directory=INDEX_DIR,
+        collection_name="ui",
+        query_cache={},  # repeated questions of the chat skip the embedding and reranking
     )
     return RAG(retriever, generator, ingestor)
-    
+
+
+class RAGService:
+    """
+    RAG shared by all the sessions (and reruns) of the app, with its models loaded and warmed up
+    once per process. The index is shared: each upload is ingested in a namespace derived from its
+    content, and each session searches only the namespaces of its own uploads. A file uploaded
+    again, by any session or after a restart, reuses its chunks instead of adding new ones, so the
+    persisted index grows with the distinct files only.
+    """
+
+    def __init__(self, rag: RAG):
+        self.rag = rag
+        # Ingestion is CPU bound, so serializing it costs little, and makes checking whether the
+        # file is already ingested and ingesting it atomic
+        self._ingest_lock = threading.Lock()
+
+    def ingest_upload(self, uploaded_file) -> str:
+        """Ingest the uploaded file, unless already done. Returns its namespace"""
+        namespace = hash_bytes(uploaded_file.getvalue())
+        metadata = {"namespace": namespace}
+        with self._ingest_lock:
+            if not self.rag.retriever.has_source(uploaded_file.name, metadata):
+                self.rag.ingest(file=uploaded_file, metadata=metadata)  # Uploaded file is a file not a filename
+        return namespace
+
+    def stream_query(self, prompt: str, namespaces: List[str], filename: str = None):
+        """`RAG.stream_query` over the uploads of the namespaces, or only the file if given"""
+        if not namespaces:
+            # Nothing uploaded yet, none of the shared chunks belong to the session
+            return self.rag.generator.stream(prompt, context=[]), []
+        filters = {"namespace": list(namespaces)}
+        if filename:
+            filters["filename"] = filename
+        return self.rag.stream_query(prompt, filters=filters, return_documents=True)
+
+
+def create_rag_service() -> RAGService:
+    rag = initialize_rag()
+    rag.warm_up()
+    return RAGService(rag)